@@ -1,6 +1,7 @@
 import math
-import random
 from abc import ABC
+from collections import deque, namedtuple
+from typing import Optional
 
 from rlgym.envs.environment import Environment
 from rlgym.envs import Match
@@ -13,6 +14,12 @@ from rlgym.utils.common_values import CAR_MAX_SPEED, SIDE_WALL_X, BACK_WALL_Y, C
 import numpy as np
 from rlgym_tools.extra_state_setters.wall_state import DEG_TO_RAD
 
+from setters.kickoffs import generate_kickoffs
+from setters.registry import SCENARIO_WEIGHTS_PATH, ScenarioRegistry
+from setters.rng import EpisodeSeeder, randint, randrange, uniform
+from setters.spawn_validity import resample_invalid
+from setters.state_bank import BankedStateSetter, StateBank, apply_state, wrapper_team_sizes
+
 LIM_X = SIDE_WALL_X - 1152 / 2 - BALL_RADIUS * 2 ** 0.5
 LIM_Y = BACK_WALL_Y - 1152 / 2 - BALL_RADIUS * 2 ** 0.5
 LIM_Z = CEILING_Z - BALL_RADIUS
@@ -34,20 +41,58 @@ YAW_MAX = np.pi
 
 
 class ProbabilisticStateSetter(StateSetter):
+    """
+    Picks a scenario of SCENARIOS at each reset, the weights are read from setters/scenarios.json
+    (DEFAULT_SCENARIO_WEIGHTS if it is missing) and reloaded when the file changes.
+    With a StateBank, the scenarios it can generate take their states from it.
+    Every setter draws from the same Generator, reseeded at each reset. The last episodes are kept in history,
+    replay(episode, state_wrapper) sets the exact same state again.
+    """
+
+    def __init__(self, weights_path: Optional[str] = SCENARIO_WEIGHTS_PATH, bank: Optional[StateBank] = None,
+                 seed: Optional[int] = None, history_length: int = 1000, scenarios: Optional[dict] = None):
+        """
+        :param seed: Seed of the episode seeds, None for OS entropy
+        :param scenarios: Extra scenarios added to SCENARIOS, name -> factory taking the Generator, for instance
+        {"replay": lambda rng: ReplayStateSetter("replays", rng=rng)}
+        """
+        super().__init__()
+        self.seeder = EpisodeSeeder(seed)
+        self.registry = ScenarioRegistry(dict(SCENARIOS, **(scenarios or {})), DEFAULT_SCENARIO_WEIGHTS, weights_path,
+                                         rng=self.seeder.rng)
+        self.history = deque(maxlen=history_length)
+
+        if bank is not None:
+            for name, setter in self.registry.setters.items():
+                if name in bank:
+                    self.registry.setters[name] = BankedStateSetter(bank, name, setter)
+
     def reset(self, state_wrapper: StateWrapper):
-        all_states = [CustomStateSetter(), DefaultState(), ShotState(), SaveState()]
+        seed = self.seeder.next_episode()
+        scenario = self.registry.sample_name()
+        setter = self.registry.setters[scenario]
+        setter.reset(state_wrapper)
 
-        random_location_prob = 0.25
-        kickoff_prob = 0.50
-        shot_prob = 0.125
-        save_prob = 0.125
+        # Banked and batched states were drawn ahead of time, they are replayed from the applied row
+        state = getattr(setter, "last_state", None)
+        self.history.append(Episode(seed, scenario, state))
 
-        all_probs = [random_location_prob, kickoff_prob, shot_prob, save_prob]
-        check = np.sum(all_probs)
-        assert abs(1 - check) < 0.0001, f"Probability should add up to 1, currently adding up to {check}"
+    def replay(self, episode: "Episode", state_wrapper: StateWrapper):
+        if episode.state is not None:
+            apply_state(state_wrapper, episode.state)
+            return
 
-        selected_state = random.choices(all_states, weights=all_probs, k=1)[0]
-        selected_state.reset(state_wrapper)
+        self.seeder.reseed(episode.seed)
+        setter = self.registry.setters[episode.scenario]
+        if isinstance(setter, BankedStateSetter):
+            setter = setter.fallback
+        # Same draws as reset, the scenario pick included
+        self.registry.sample_name()
+        setter.reset(state_wrapper)
+
+
+# Seed and scenario of a ProbabilisticStateSetter reset, state is the StateBank row for banked scenarios
+Episode = namedtuple("Episode", ["seed", "scenario", "state"])
 
 
 class CustomStateSetter(StateSetter):
@@ -75,131 +120,140 @@ class CustomStateSetter(StateSetter):
         state_wrapper.ball.set_pos(random.randint(-3000, 3000), random.randint(-3000, 3000),
                                    random.randint(0 + int(BALL_RADIUS) * 2, int(CEILING_Z) - int(BALL_RADIUS) * 2))"""
 
-    def __init__(self):
+    def __init__(self, rng: Optional[np.random.Generator] = None):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     def reset(self, state_wrapper: StateWrapper):
         state_wrapper.ball.set_pos(
-            x=np.random.uniform(-LIM_X, LIM_X),
-            y=np.random.uniform(-LIM_Y, LIM_Y),
-            z=np.random.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z),
+            x=uniform(self.rng, -LIM_X, LIM_X),
+            y=uniform(self.rng, -LIM_Y, LIM_Y),
+            z=self.rng.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z),
         )
 
         # 99.9% chance of below ball max speed
-        ball_speed = np.random.exponential(-BALL_MAX_SPEED / np.log(1 - 0.999))
-        vel = rand_vec3(min(ball_speed, BALL_MAX_SPEED))
+        ball_speed = self.rng.exponential(-BALL_MAX_SPEED / np.log(1 - 0.999))
+        vel = rand_vec3(min(ball_speed, BALL_MAX_SPEED), self.rng)
         state_wrapper.ball.set_lin_vel(*vel)
 
-        ang_vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL + 0.5))
+        ang_vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL + 0.5), self.rng)
         state_wrapper.ball.set_ang_vel(*ang_vel)
 
         for car in state_wrapper.cars:
-            # On average 1 second at max speed away from ball
-            ball_dist = np.random.exponential(BALL_MAX_SPEED)
-            ball_car = rand_vec3(ball_dist)
-            car_pos = state_wrapper.ball.position + ball_car
-            if abs(car_pos[0]) < LIM_X \
-                    and abs(car_pos[1]) < LIM_Y \
-                    and 0 < car_pos[2] < LIM_Z:
-                car.set_pos(*car_pos)
-            else:  # Fallback on fully random
-                car.set_pos(
-                    x=np.random.uniform(-LIM_X, LIM_X),
-                    y=np.random.uniform(-LIM_Y, LIM_Y),
-                    z=np.random.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z),
-                )
+            self._place_car(state_wrapper, car)
 
-            vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
+            vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_SPEED), self.rng)
             car.set_lin_vel(*vel)
 
             car.set_rot(
-                pitch=np.random.triangular(-PITCH_LIM, 0, PITCH_LIM),
-                yaw=np.random.uniform(-YAW_LIM, YAW_LIM),
-                roll=np.random.triangular(-ROLL_LIM, 0, ROLL_LIM),
+                pitch=self.rng.triangular(-PITCH_LIM, 0, PITCH_LIM),
+                yaw=uniform(self.rng, -YAW_LIM, YAW_LIM),
+                roll=self.rng.triangular(-ROLL_LIM, 0, ROLL_LIM),
             )
 
-            ang_vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL))
+            ang_vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL), self.rng)
             car.set_ang_vel(*ang_vel)
-            car.boost = np.random.uniform(0, 1)
+            car.boost = uniform(self.rng, 0, 1)
+
+        # Overlapping cars get a new position, same draw as the first one
+        resample_invalid(state_wrapper, resample_car=lambda car: self._place_car(state_wrapper, car))
+
+    def _place_car(self, state_wrapper: StateWrapper, car):
+        # On average 1 second at max speed away from ball
+        ball_dist = self.rng.exponential(BALL_MAX_SPEED)
+        ball_car = rand_vec3(ball_dist, self.rng)
+        car_pos = state_wrapper.ball.position + ball_car
+        if abs(car_pos[0]) < LIM_X \
+                and abs(car_pos[1]) < LIM_Y \
+                and 0 < car_pos[2] < LIM_Z:
+            car.set_pos(*car_pos)
+        else:  # Fallback on fully random
+            car.set_pos(
+                x=uniform(self.rng, -LIM_X, LIM_X),
+                y=uniform(self.rng, -LIM_Y, LIM_Y),
+                z=self.rng.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z),
+            )
 
 
 class ShotState(StateSetter):
 
-    def __init__(self):
+    def __init__(self, rng: Optional[np.random.Generator] = None):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     def reset(self, state_wrapper: StateWrapper):
         for car in state_wrapper.cars:
             if car.team_num == BLUE_TEAM:
                 car.set_pos(
-                    random.uniform(-4096, 4096),
-                    random.uniform(0, 3000),
+                    uniform(self.rng, -4096, 4096),
+                    uniform(self.rng, 0, 3000),
                     17
                 )
 
-                vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
+                vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_SPEED), self.rng)
                 car.set_lin_vel(*vel)
 
                 car.set_rot(
-                    pitch=np.random.triangular(-PITCH_LIM, 0, PITCH_LIM),
-                    yaw=np.random.uniform(-YAW_LIM, YAW_LIM),
-                    roll=np.random.triangular(-ROLL_LIM, 0, ROLL_LIM),
+                    pitch=self.rng.triangular(-PITCH_LIM, 0, PITCH_LIM),
+                    yaw=uniform(self.rng, -YAW_LIM, YAW_LIM),
+                    roll=self.rng.triangular(-ROLL_LIM, 0, ROLL_LIM),
                 )
 
-                ang_vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL))
+                ang_vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL), self.rng)
                 car.set_ang_vel(*ang_vel)
-                car.boost = np.random.uniform(0, 1)
+                car.boost = uniform(self.rng, 0, 1)
 
                 state_wrapper.ball.set_pos(
-                    x=np.random.uniform(max(car.position.item(0) - 1000, -LIM_X),
+                    x=uniform(self.rng, max(car.position.item(0) - 1000, -LIM_X),
                                         min(car.position.item(0) + 1000, LIM_X)),
-                    y=np.random.uniform(car.position.item(1) + 1000, car.position.item(1) + 100),
-                    z=np.random.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z / 2),
+                    y=uniform(self.rng, car.position.item(1) + 1000, car.position.item(1) + 100),
+                    z=self.rng.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z / 2),
                 )
 
-                ball_speed = np.random.exponential(-(BALL_MAX_SPEED / 3) / np.log(1 - 0.999))
-                vel = rand_vec3(min(ball_speed, BALL_MAX_SPEED / 3))
+                ball_speed = self.rng.exponential(-(BALL_MAX_SPEED / 3) / np.log(1 - 0.999))
+                vel = rand_vec3(min(ball_speed, BALL_MAX_SPEED / 3), self.rng)
                 state_wrapper.ball.set_lin_vel(*vel)
 
-                ang_vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL + 0.5))
+                ang_vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL + 0.5), self.rng)
                 state_wrapper.ball.set_ang_vel(*ang_vel)
 
             if car.team_num == ORANGE_TEAM:
                 car.set_pos(
-                    random.randint(-2900, 2900),
-                    random.randint(3000, 5120),
+                    randint(self.rng, -2900, 2900),
+                    randint(self.rng, 3000, 5120),
                     17
                 )
 
-                vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
+                vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_SPEED), self.rng)
                 car.set_lin_vel(*vel)
 
                 car.set_rot(
-                    pitch=np.random.triangular(-PITCH_LIM, 0, PITCH_LIM),
-                    yaw=np.random.uniform(-YAW_LIM, YAW_LIM),
-                    roll=np.random.triangular(-ROLL_LIM, 0, ROLL_LIM),
+                    pitch=self.rng.triangular(-PITCH_LIM, 0, PITCH_LIM),
+                    yaw=uniform(self.rng, -YAW_LIM, YAW_LIM),
+                    roll=self.rng.triangular(-ROLL_LIM, 0, ROLL_LIM),
                 )
 
-                ang_vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL))
+                ang_vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL), self.rng)
                 car.set_ang_vel(*ang_vel)
-                car.boost = np.random.uniform(0, 1)
+                car.boost = uniform(self.rng, 0, 1)
 
 
 class JumpShotState(StateSetter):
 
-    def __init__(self):
+    def __init__(self, rng: Optional[np.random.Generator] = None):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     def reset(self, state_wrapper: StateWrapper):
         for car in state_wrapper.cars:
             if car.team_num == BLUE_TEAM:
                 car.set_pos(
-                    random.uniform(-4096, 4096),
-                    random.uniform(0, 2500),
+                    uniform(self.rng, -4096, 4096),
+                    uniform(self.rng, 0, 2500),
                     17
                 )
 
-                vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
+                vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_SPEED), self.rng)
                 car.set_lin_vel(*vel)
 
                 car.set_rot(
@@ -208,19 +262,19 @@ class JumpShotState(StateSetter):
                     roll=0
                 )
 
-                ang_vel = (0, 0, 0)  # rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL))
+                ang_vel = (0, 0, 0)  # rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL), self.rng)
                 car.set_ang_vel(*ang_vel)
-                car.boost = np.random.uniform(0, 1)
+                car.boost = uniform(self.rng, 0, 1)
 
                 state_wrapper.ball.set_pos(
-                    x=np.random.uniform(max(car.position.item(0) - 1000, -LIM_X),
+                    x=uniform(self.rng, max(car.position.item(0) - 1000, -LIM_X),
                                         min(car.position.item(0) + 1000, LIM_X)),
-                    y=np.random.uniform(car.position.item(1) + 1500, car.position.item(1) + 500),
+                    y=uniform(self.rng, car.position.item(1) + 1500, car.position.item(1) + 500),
                     z=CEILING_Z / 2
                 )
 
-                ball_speed = np.random.uniform(100, BALL_MAX_SPEED / 2)
-                vel = rand_vec3(min(ball_speed, BALL_MAX_SPEED / 2))
+                ball_speed = uniform(self.rng, 100, BALL_MAX_SPEED / 2)
+                vel = rand_vec3(min(ball_speed, BALL_MAX_SPEED / 2), self.rng)
                 state_wrapper.ball.set_lin_vel(*vel)
 
                 ang_vel = (0, 0, 0)
@@ -228,558 +282,232 @@ class JumpShotState(StateSetter):
 
             if car.team_num == ORANGE_TEAM:
                 car.set_pos(
-                    random.randint(-2900, 2900),
-                    random.randint(3000, 5120),
+                    randint(self.rng, -2900, 2900),
+                    randint(self.rng, 3000, 5120),
                     17
                 )
 
-                vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
+                vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_SPEED), self.rng)
                 car.set_lin_vel(*vel)
 
                 car.set_rot(
-                    pitch=np.random.triangular(-PITCH_LIM, 0, PITCH_LIM),
-                    yaw=np.random.uniform(-YAW_LIM, YAW_LIM),
-                    roll=np.random.triangular(-ROLL_LIM, 0, ROLL_LIM),
+                    pitch=self.rng.triangular(-PITCH_LIM, 0, PITCH_LIM),
+                    yaw=uniform(self.rng, -YAW_LIM, YAW_LIM),
+                    roll=self.rng.triangular(-ROLL_LIM, 0, ROLL_LIM),
                 )
 
-                ang_vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL))
+                ang_vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL), self.rng)
                 car.set_ang_vel(*ang_vel)
-                car.boost = np.random.uniform(0, 1)
+                car.boost = uniform(self.rng, 0, 1)
 
 
 class SaveState(StateSetter):
 
-    def __init__(self):
+    def __init__(self, rng: Optional[np.random.Generator] = None):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     def reset(self, state_wrapper: StateWrapper):
         for car in state_wrapper.cars:
             if car.team_num == ORANGE_TEAM:
                 car.set_pos(
-                    random.uniform(-4096, 4096),
-                    random.uniform(0, -3000),
+                    uniform(self.rng, -4096, 4096),
+                    uniform(self.rng, 0, -3000),
                     17
                 )
 
-                vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
+                vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_SPEED), self.rng)
                 car.set_lin_vel(*vel)
 
                 car.set_rot(
-                    pitch=np.random.triangular(-PITCH_LIM, 0, PITCH_LIM),
-                    yaw=np.random.uniform(-YAW_LIM, YAW_LIM),
-                    roll=np.random.triangular(-ROLL_LIM, 0, ROLL_LIM),
+                    pitch=self.rng.triangular(-PITCH_LIM, 0, PITCH_LIM),
+                    yaw=uniform(self.rng, -YAW_LIM, YAW_LIM),
+                    roll=self.rng.triangular(-ROLL_LIM, 0, ROLL_LIM),
                 )
 
-                ang_vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL))
+                ang_vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL), self.rng)
                 car.set_ang_vel(*ang_vel)
-                car.boost = np.random.uniform(0, 1)
+                car.boost = uniform(self.rng, 0, 1)
 
                 state_wrapper.ball.set_pos(
-                    x=np.random.uniform(max(car.position.item(0) - 1000, -LIM_X),
+                    x=uniform(self.rng, max(car.position.item(0) - 1000, -LIM_X),
                                         min(car.position.item(0) + 1000, LIM_X)),
-                    y=np.random.uniform(car.position.item(1) - 1000, car.position.item(1) - 100),
-                    z=np.random.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z / 2),
+                    y=uniform(self.rng, car.position.item(1) - 1000, car.position.item(1) - 100),
+                    z=self.rng.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z / 2),
                 )
 
-                ball_speed = np.random.exponential(-(BALL_MAX_SPEED / 3) / np.log(1 - 0.999))
-                vel = rand_vec3(min(ball_speed, BALL_MAX_SPEED / 3))
+                ball_speed = self.rng.exponential(-(BALL_MAX_SPEED / 3) / np.log(1 - 0.999))
+                vel = rand_vec3(min(ball_speed, BALL_MAX_SPEED / 3), self.rng)
                 state_wrapper.ball.set_lin_vel(*vel)
 
-                ang_vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL + 0.5))
+                ang_vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL + 0.5), self.rng)
                 state_wrapper.ball.set_ang_vel(*ang_vel)
 
             if car.team_num == BLUE_TEAM:
                 car.set_pos(
-                    random.randint(-2900, 2900),
-                    -random.randint(3000, 5120),
+                    randint(self.rng, -2900, 2900),
+                    -randint(self.rng, 3000, 5120),
                     17
                 )
 
-                vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
+                vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_SPEED), self.rng)
                 car.set_lin_vel(*vel)
 
                 car.set_rot(
-                    pitch=np.random.triangular(-PITCH_LIM, 0, PITCH_LIM),
-                    yaw=np.random.uniform(-YAW_LIM, YAW_LIM),
-                    roll=np.random.triangular(-ROLL_LIM, 0, ROLL_LIM),
+                    pitch=self.rng.triangular(-PITCH_LIM, 0, PITCH_LIM),
+                    yaw=uniform(self.rng, -YAW_LIM, YAW_LIM),
+                    roll=self.rng.triangular(-ROLL_LIM, 0, ROLL_LIM),
                 )
 
-                ang_vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL))
+                ang_vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL), self.rng)
                 car.set_ang_vel(*ang_vel)
-                car.boost = np.random.uniform(0, 1)
+                car.boost = uniform(self.rng, 0, 1)
 
 
 class AirDribble2Touch(StateSetter):
 
-    def __init__(self):
+    def __init__(self, rng: Optional[np.random.Generator] = None):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self._dribbler = None
 
     def reset(self, state_wrapper: StateWrapper):
 
         for car in state_wrapper.cars:
             if car.team_num == BLUE_TEAM:
+                self._place_dribbler(state_wrapper, car)
+            else:
+                self._place_defender(car)
+
+        # A ball spawned in the car hitbox is moved, not the car
+        resample_invalid(state_wrapper,
+                         resample_car=lambda car: self._place_dribbler(state_wrapper, car)
+                         if car.team_num == BLUE_TEAM else self._place_defender(car),
+                         resample_ball=lambda: self._resample_ball(state_wrapper),
+                         move_ball_on_overlap=True)
+
+    def _resample_ball(self, state_wrapper: StateWrapper):
+        # The ball is drawn above the dribbler, under the ceiling the dribbler has to move too
+        if state_wrapper.ball.position[2] > LIM_Z:
+            self._place_dribbler(state_wrapper, self._dribbler)
+        else:
+            self._place_ball(state_wrapper, self._dribbler)
 
-                car_x = random.randint(-3500, 3500)
-                car_y = random.randint(-2000, 4000)
-                car_z = np.random.uniform(500, LIM_Z)
+    def _place_dribbler(self, state_wrapper: StateWrapper, car):
+        car_x = randint(self.rng, -3500, 3500)
+        car_y = randint(self.rng, -2000, 4000)
+        car_z = uniform(self.rng, 500, LIM_Z)
 
-                car.set_pos(
-                    car_x,
-                    car_y,
-                    car_z
-                )
+        car.set_pos(
+            car_x,
+            car_y,
+            car_z
+        )
 
-                car_pitch_rot = random.uniform(-1, 1) * math.pi
-                car_yaw_rot = random.uniform(-1, 1) * math.pi
-                car_roll_rot = random.uniform(-1, 1) * math.pi
+        car_pitch_rot = uniform(self.rng, -1, 1) * math.pi
+        car_yaw_rot = uniform(self.rng, -1, 1) * math.pi
+        car_roll_rot = uniform(self.rng, -1, 1) * math.pi
 
-                car.set_rot(
-                    car_pitch_rot,
-                    car_yaw_rot,
-                    car_roll_rot
-                )
+        car.set_rot(
+            car_pitch_rot,
+            car_yaw_rot,
+            car_roll_rot
+        )
 
-                car_lin_y = np.random.uniform(300, CAR_MAX_SPEED)
+        car_lin_y = uniform(self.rng, 300, CAR_MAX_SPEED)
 
-                car.set_lin_vel(
-                    0 + random.uniform(-150, 150),
-                    car_lin_y,
-                    0 + random.uniform(-150, 150)
-                )
+        car.set_lin_vel(
+            0 + uniform(self.rng, -150, 150),
+            car_lin_y,
+            0 + uniform(self.rng, -150, 150)
+        )
 
-                state_wrapper.ball.set_pos(
-                    car_x + random.uniform(-150, 150),
-                    car_y + random.uniform(0, 150),
-                    car_z + random.uniform(0, 150)
-                )
+        self._place_ball(state_wrapper, car)
 
-                ball_lin_y = car_lin_y + random.uniform(-150, 150)
+        ball_lin_y = car_lin_y + uniform(self.rng, -150, 150)
 
-                state_wrapper.ball.set_lin_vel(
-                    0 + random.uniform(-150, 150),
-                    ball_lin_y,
-                    0 + random.uniform(-150, 150)
-                )
-                car.boost = np.random.uniform(0.4, 1)
+        state_wrapper.ball.set_lin_vel(
+            0 + uniform(self.rng, -150, 150),
+            ball_lin_y,
+            0 + uniform(self.rng, -150, 150)
+        )
+        car.boost = uniform(self.rng, 0.4, 1)
 
-            else:
-                car.set_pos(
-                    random.randint(-2900, 2900),
-                    random.randint(3000, 5120),
-                    17
-                )
+    def _place_ball(self, state_wrapper: StateWrapper, car):
+        car_x, car_y, car_z = car.position
+        state_wrapper.ball.set_pos(
+            car_x + uniform(self.rng, -150, 150),
+            car_y + uniform(self.rng, 0, 150),
+            car_z + uniform(self.rng, 0, 150)
+        )
+        self._dribbler = car
 
-                vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                car.set_lin_vel(*vel)
+    def _place_defender(self, car):
+        car.set_pos(
+            randint(self.rng, -2900, 2900),
+            randint(self.rng, 3000, 5120),
+            17
+        )
 
-                car.set_rot(
-                    pitch=np.random.triangular(-PITCH_LIM, 0, PITCH_LIM),
-                    yaw=np.random.uniform(-YAW_LIM, YAW_LIM),
-                    roll=np.random.triangular(-ROLL_LIM, 0, ROLL_LIM),
-                )
+        vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_SPEED), self.rng)
+        car.set_lin_vel(*vel)
 
-                ang_vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_ANG_VEL))
-                car.set_ang_vel(*ang_vel)
-                car.boost = np.random.uniform(0, 1)
+        car.set_rot(
+            pitch=self.rng.triangular(-PITCH_LIM, 0, PITCH_LIM),
+            yaw=uniform(self.rng, -YAW_LIM, YAW_LIM),
+            roll=self.rng.triangular(-ROLL_LIM, 0, ROLL_LIM),
+        )
+
+        ang_vel = rand_vec3(self.rng.triangular(0, 0, CAR_MAX_ANG_VEL), self.rng)
+        car.set_ang_vel(*ang_vel)
+        car.boost = uniform(self.rng, 0, 1)
 
 
 class DefaultState(StateSetter):
-    SPAWN_BLUE_POS = [[-2048, -2560, 17], [2048, -2560, 17],
-                      [-256, -3840, 17], [256, -3840, 17], [0, -4608, 17]]
-    SPAWN_BLUE_YAW = [0.25 * np.pi, 0.75 * np.pi,
-                      0.5 * np.pi, 0.5 * np.pi, 0.5 * np.pi]
-    SPAWN_ORANGE_POS = [[2048, 2560, 17], [-2048, 2560, 17],
-                        [256, 3840, 17], [-256, 3840, 17], [0, 4608, 17]]
-    SPAWN_ORANGE_YAW = [-0.75 * np.pi, -0.25 *
-                        np.pi, -0.5 * np.pi, -0.5 * np.pi, -0.5 * np.pi]
-
-    def __init__(self):
+    """
+    Regular and randomized kickoffs, see setters/kickoffs.py.
+    The kickoffs are drawn in batches, a reset only applies the next one.
+    """
+
+    def __init__(self, rng: Optional[np.random.Generator] = None, batch_size: int = 256):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.batch_size = batch_size
+        self._kickoffs = []
+        self._team_sizes = None
+        # Row applied by the last reset
+        self.last_state = None
 
     def reset(self, state_wrapper: StateWrapper):
-        rand_default_or_diff = random.randint(0, 3)
-        # rand_default_or_diff = 0
-        # DEFAULT KICKOFFS POSITIONS
-        if rand_default_or_diff == 0:
-
-            # possible kickoff indices are shuffled
-            spawn_inds = [0, 1, 2, 3, 4]
-            random.shuffle(spawn_inds)
-
-            blue_count = 0
-            orange_count = 0
-            for car in state_wrapper.cars:
-                pos = [0, 0, 0]
-                yaw = 0
-                # team_num = 0 = blue team
-                if car.team_num == 0:
-                    # select a unique spawn state from pre-determined values
-                    pos = self.SPAWN_BLUE_POS[spawn_inds[blue_count]]
-                    yaw = self.SPAWN_BLUE_YAW[spawn_inds[blue_count]]
-                    blue_count += 1
-                # team_num = 1 = orange team
-                elif car.team_num == 1:
-                    # select a unique spawn state from pre-determined values
-                    pos = self.SPAWN_ORANGE_POS[spawn_inds[orange_count]]
-                    yaw = self.SPAWN_ORANGE_YAW[spawn_inds[orange_count]]
-                    orange_count += 1
-                # set car state values
-                car.set_pos(*pos)
-                car.set_rot(yaw=yaw)
-                car.boost = 0.33
-        else:
-            """SPAWN POS RANGE
-            Y = CENTER BACK KICKOFF [-4608, 0], [4608, 0]; BACK LEFT/RIGHT KICKOFFS [-3000, 0], [3000,0]"""
-
-            # print("Advanced Kickoffs")
-            # SPAWN POSITION
-            spawn_inds = [0, 1, 2, 3, 4]
-            spawn_pos = np.random.choice(spawn_inds)
-
-            same_pos = random.randint(0, 1)
-            # print(f"Same position = {same_pos}")
-
-            # RIGHT CORNER
-            if spawn_pos == 0:
-                # print("Right Corner")
-                # SAME POS
-                if same_pos == 1:
-                    slope = -2560 / -2048
-                    posX = np.random.uniform(-2048, 0)
-                    posY = slope * posX
-                    posZ = np.random.uniform(17, 200)
-                    blue_spawn_pos = (posX, posY, posZ)
-                    orange_spawn_pos = (abs(posX), abs(posY), posZ)
-                    # print(f"Blue Spawn: {blue_spawn_pos} | Orange Spawn {orange_spawn_pos}")
-
-                    for car in state_wrapper.cars:
-                        final_pos = [0, 0, 0]
-                        final_yaw = 0
-                        if car.team_num == BLUE_TEAM:
-                            final_pos = blue_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                            # print(f"Blue Final Spawn: {final_pos} | Yaw: {final_yaw}")
-                        elif car.team_num == ORANGE_TEAM:
-                            final_pos = orange_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                            # print(f"Orange Final Spawn: {final_pos} | Yaw: {final_yaw}")
-
-                        car.set_pos(*final_pos)
-                        car.set_rot(final_yaw)
-                        car.boost = np.random.uniform(0, 0.4)
-                        vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                        car.set_lin_vel(*vel)
-                else:
-                    for car in state_wrapper.cars:
-                        final_pos = [0, 0, 0]
-                        final_yaw = 0
-
-                        slope = -2560 / -2048
-                        blue_posX = np.random.uniform(-2048, 0)
-                        blue_posY = slope * blue_posX
-                        posZ = np.random.uniform(17, 500)
-                        blue_spawn_pos = (blue_posX, blue_posY, posZ)
-
-                        slope = 2560 / 2048
-                        orange_posX = np.random.uniform(2048, 0)
-                        orange_posY = slope * orange_posX
-                        posZ = np.random.uniform(17, 500)
-                        orange_spawn_pos = (orange_posX, orange_posY, posZ)
-
-                        if car.team_num == BLUE_TEAM:
-                            final_pos = blue_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Blue Final Spawn: {final_pos} | Yaw: {final_yaw}")
-                        elif car.team_num == ORANGE_TEAM:
-                            final_pos = orange_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Orange Final Spawn: {final_pos} | Yaw: {final_yaw}")
-
-                        car.set_pos(*final_pos)
-                        car.set_rot(final_yaw)
-                        car.boost = np.random.uniform(0, 0.4)
-                        vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                        car.set_lin_vel(*vel)
-            # LEFT CORNER
-            elif spawn_pos == 1:
-                # print("Left Corner")
-                # SAME POS
-                if same_pos == 1:
-                    slope = -2560 / 2048
-                    posX = np.random.uniform(2048, 0)
-                    posY = slope * posX
-                    posZ = np.random.uniform(17, 500)
-                    blue_spawn_pos = (posX, posY, posZ)
-                    orange_spawn_pos = (-abs(posX), abs(posY), posZ)
-                    # print(f"Blue Spawn: {blue_spawn_pos} | Orange Spawn {orange_spawn_pos}")
-
-                    for car in state_wrapper.cars:
-                        final_pos = [0, 0, 0]
-                        final_yaw = 0
-                        if car.team_num == BLUE_TEAM:
-                            final_pos = blue_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Blue Final Spawn: {final_pos} | Yaw: {final_yaw}")
-                        elif car.team_num == ORANGE_TEAM:
-                            final_pos = orange_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Orange Final Spawn: {final_pos} | Yaw: {final_yaw}")
-
-                        car.set_pos(*final_pos)
-                        car.set_rot(final_yaw)
-                        car.boost = np.random.uniform(0, 0.4)
-                        vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                        car.set_lin_vel(*vel)
-                else:
-                    for car in state_wrapper.cars:
-                        final_pos = [0, 0, 0]
-                        final_yaw = 0
-
-                        slope = -2560 / 2048
-                        blue_posX = np.random.uniform(2048, 0)
-                        blue_posY = slope * blue_posX
-                        posZ = np.random.uniform(17, 500)
-                        blue_spawn_pos = (blue_posX, blue_posY, posZ)
-
-                        slope = 2560 / -2048
-                        orange_posX = np.random.uniform(-2048, 0)
-                        orange_posY = slope * orange_posX
-                        posZ = np.random.uniform(17, 500)
-                        orange_spawn_pos = (orange_posX, orange_posY, posZ)
-
-                        if car.team_num == BLUE_TEAM:
-                            final_pos = blue_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        #  print(f"Blue Final Spawn: {final_pos} | Yaw: {final_yaw}")
-                        elif car.team_num == ORANGE_TEAM:
-                            final_pos = orange_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Orange Final Spawn: {final_pos} | Yaw: {final_yaw}")
-
-                        car.set_pos(*final_pos)
-                        car.set_rot(final_yaw)
-                        car.boost = np.random.uniform(0, 0.4)
-                        vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                        car.set_lin_vel(*vel)
-            elif spawn_pos == 2:
-                # print("Back Right")
-                # SAME POS
-                if same_pos == 1:
-                    slope = -3840 / -256
-                    posX = np.random.uniform(-256, 0)
-                    posY = slope * posX
-                    posZ = np.random.uniform(17, 500)
-
-                    if posY < -3000:
-                        blue_spawn_pos = (posX, posY, posZ)
-                        orange_spawn_pos = (abs(posX), abs(posY), posZ)
-                    else:
-                        blue_spawn_pos = (0, posY, posZ)
-                        orange_spawn_pos = (0, abs(posY), posZ)
-                    # print(f"Blue Spawn: {blue_spawn_pos} | Orange Spawn {orange_spawn_pos}")
-
-                    for car in state_wrapper.cars:
-                        final_pos = [0, 0, 0]
-                        final_yaw = 0
-                        if car.team_num == BLUE_TEAM:
-                            final_pos = blue_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Blue Final Spawn: {final_pos} | Yaw: {final_yaw}")
-                        elif car.team_num == ORANGE_TEAM:
-                            final_pos = orange_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Orange Final Spawn: {final_pos} | Yaw: {final_yaw}")
-
-                        car.set_pos(*final_pos)
-                        car.set_rot(final_yaw)
-                        car.boost = np.random.uniform(0, 0.4)
-                        vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                        car.set_lin_vel(*vel)
-                else:
-                    for car in state_wrapper.cars:
-                        final_pos = [0, 0, 0]
-                        final_yaw = 0
-
-                        slope = -3840 / -256
-                        blue_posX = np.random.uniform(-256, 0)
-                        blue_posY = slope * blue_posX
-                        posZ = np.random.uniform(17, 500)
-                        if blue_posY < -3000:
-                            blue_spawn_pos = (blue_posX, blue_posY, posZ)
-                        else:
-                            blue_spawn_pos = (0, blue_posY, posZ)
-
-                        slope = 3840 / 256
-                        orange_posX = np.random.uniform(256, 0)
-                        orange_posY = slope * orange_posX
-                        if orange_posX > 3000:
-                            orange_spawn_pos = (orange_posX, orange_posY, posZ)
-                        else:
-                            orange_spawn_pos = (0, orange_posY, posZ)
-
-                        if car.team_num == BLUE_TEAM:
-                            final_pos = blue_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Blue Final Spawn: {final_pos} | Yaw: {final_yaw}")
-                        elif car.team_num == ORANGE_TEAM:
-                            final_pos = orange_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Orange Final Spawn: {final_pos} | Yaw: {final_yaw}")
-
-                        car.set_pos(*final_pos)
-                        car.set_rot(final_yaw)
-                        car.boost = np.random.uniform(0, 0.4)
-                        vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                        car.set_lin_vel(*vel)
-            elif spawn_pos == 3:
-                # print("Back Left")
-                # SAME POS
-                if same_pos == 1:
-                    slope = -3840 / 256
-                    posX = np.random.uniform(256, 0)
-                    posY = slope * posX
-                    posZ = np.random.uniform(17, 500)
-
-                    if posY < -3000:
-                        blue_spawn_pos = (posX, posY, posZ)
-                        orange_spawn_pos = (-abs(posX), abs(posY), posZ)
-                    else:
-                        blue_spawn_pos = (posX, 0, 17)
-                        orange_spawn_pos = (0, abs(posY), posZ)
-                    # print(f"Blue Spawn: {blue_spawn_pos} | Orange Spawn {orange_spawn_pos}")
-
-                    for car in state_wrapper.cars:
-                        final_pos = [0, 0, 0]
-                        final_yaw = 0
-                        if car.team_num == BLUE_TEAM:
-                            final_pos = blue_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Blue Final Spawn: {final_pos} | Yaw: {final_yaw}")
-                        elif car.team_num == ORANGE_TEAM:
-                            final_pos = orange_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Orange Final Spawn: {final_pos} | Yaw: {final_yaw}")
-
-                        car.set_pos(*final_pos)
-                        car.set_rot(final_yaw)
-                        car.boost = np.random.uniform(0, 0.4)
-                        vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                        car.set_lin_vel(*vel)
-                else:
-                    for car in state_wrapper.cars:
-                        final_pos = [0, 0, 0]
-                        final_yaw = 0
-
-                        slope = -3840 / 256
-                        blue_posX = np.random.uniform(256, 0)
-                        blue_posY = slope * blue_posX
-                        posZ = np.random.uniform(17, 500)
-                        if blue_posY < -3000:
-                            blue_spawn_pos = (blue_posX, blue_posY, posZ)
-                        else:
-                            blue_spawn_pos = (0, blue_posY, posZ)
-
-                        slope = 3840 / -256
-                        orange_posX = np.random.uniform(-256, 0)
-                        orange_posY = slope * orange_posX
-                        posZ = np.random.uniform(17, 500)
-                        if orange_posX > 3000:
-                            orange_spawn_pos = (orange_posX, orange_posY, posZ)
-                        else:
-                            orange_spawn_pos = (0, orange_posY, posZ)
-
-                        if car.team_num == BLUE_TEAM:
-                            final_pos = blue_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Blue Final Spawn: {final_pos} | Yaw: {final_yaw}")
-                        elif car.team_num == ORANGE_TEAM:
-                            final_pos = orange_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        #  print(f"Orange Final Spawn: {final_pos} | Yaw: {final_yaw}")
-
-                        car.set_pos(*final_pos)
-                        car.set_rot(final_yaw)
-                        car.boost = np.random.uniform(0, 0.4)
-                        vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                        car.set_lin_vel(*vel)
-            elif spawn_pos == 4:
-                # print("Far Back Center")
-                # SAME POS
-                if same_pos == 1:
-                    posX = 0
-                    posY = np.random.uniform(-4608, 0)
-                    posZ = np.random.uniform(17, 500)
-                    blue_spawn_pos = (posX, posY, posZ)
-                    orange_spawn_pos = (posX, abs(posY), posZ)
-                    # print(f"Blue Spawn: {blue_spawn_pos} | Orange Spawn {orange_spawn_pos}")
-
-                    for car in state_wrapper.cars:
-                        final_pos = [0, 0, 0]
-                        final_yaw = 0
-                        if car.team_num == BLUE_TEAM:
-                            final_pos = blue_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Blue Final Spawn: {final_pos} | Yaw: {final_yaw}")
-                        elif car.team_num == ORANGE_TEAM:
-                            final_pos = orange_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                        # print(f"Orange Final Spawn: {final_pos} | Yaw: {final_yaw}")
-
-                        car.set_pos(*final_pos)
-                        car.set_rot(final_yaw)
-                        car.boost = np.random.uniform(0, 0.4)
-                        vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                        car.set_lin_vel(*vel)
-                else:
-                    for car in state_wrapper.cars:
-                        final_pos = [0, 0, 0]
-                        final_yaw = 0
-
-                        blue_posX = 0
-                        blue_posY = np.random.uniform(-4608, 0)
-                        posZ = np.random.uniform(17, 500)
-                        blue_spawn_pos = (blue_posX, blue_posY, posZ)
-
-                        orange_posX = 0
-                        orange_posY = np.random.uniform(4608, 0)
-                        posZ = np.random.uniform(17, 500)
-                        orange_spawn_pos = (orange_posX, orange_posY, posZ)
-
-                        if car.team_num == BLUE_TEAM:
-                            final_pos = blue_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                            # print(f"Blue Final Spawn: {final_pos} | Yaw: {final_yaw}")
-                        elif car.team_num == ORANGE_TEAM:
-                            final_pos = orange_spawn_pos
-                            final_yaw = random.uniform(-1, 1)
-                            # print(f"Orange Final Spawn: {final_pos} | Yaw: {final_yaw}")
-
-                        car.set_pos(*final_pos)
-                        car.set_rot(final_yaw)
-                        car.boost = np.random.uniform(0, 0.4)
-                        vel = rand_vec3(np.random.triangular(0, 0, CAR_MAX_SPEED))
-                        car.set_lin_vel(*vel)
+        team_sizes = wrapper_team_sizes(state_wrapper)
+        if not self._kickoffs or team_sizes != self._team_sizes:
+            self._kickoffs = list(generate_kickoffs(self.rng, team_sizes, self.batch_size))
+            self._team_sizes = team_sizes
+
+        self.last_state = self._kickoffs.pop()
+        apply_state(state_wrapper, self.last_state)
 
 
 class AirDribbleSetup(StateSetter):
 
-    def __init__(self):
+    def __init__(self, rng: Optional[np.random.Generator] = None):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     def reset(self, state_wrapper: StateWrapper):
-        axis_inverter = 1 if random.randrange(2) == 1 else -1
-        team_side = 0 if random.randrange(2) == 1 else 1
+        axis_inverter = 1 if randrange(self.rng, 2) == 1 else -1
+        team_side = 0 if randrange(self.rng, 2) == 1 else 1
         team_inverter = 1 if team_side == 0 else -1
 
         # if only 1 play, team is always 0
 
         ball_x_pos = 3000 * axis_inverter
-        ball_y_pos = random.randrange(7600) - 3800
+        ball_y_pos = randrange(self.rng, 7600) - 3800
         ball_z_pos = BALL_RADIUS
         state_wrapper.ball.set_pos(ball_x_pos, ball_y_pos, ball_z_pos)
 
-        ball_x_vel = (2000 + (random.randrange(1000) - 500)) * axis_inverter
-        ball_y_vel = random.randrange(1000) * team_inverter
+        ball_x_vel = (2000 + (randrange(self.rng, 1000) - 500)) * axis_inverter
+        ball_y_vel = randrange(self.rng, 1000) * team_inverter
         ball_z_vel = 0
         state_wrapper.ball.set_lin_vel(ball_x_vel, ball_y_vel, ball_z_vel)
 
@@ -792,7 +520,7 @@ class AirDribbleSetup(StateSetter):
 
         yaw = 0 if axis_inverter == 1 else 180
         car_pitch_rot = 0 * DEG_TO_RAD
-        car_yaw_rot = (yaw + (random.randrange(40) - 20)) * DEG_TO_RAD
+        car_yaw_rot = (yaw + (randrange(self.rng, 40) - 20)) * DEG_TO_RAD
         car_roll_rot = 0 * DEG_TO_RAD
 
         chosen_car.set_pos(car_x_pos, car_y_pos, car_z_pos)
@@ -804,17 +532,18 @@ class AirDribbleSetup(StateSetter):
                 continue
 
             # set all other cars randomly in the field
-            car.set_pos(random.randrange(2944) - 1472, random.randrange(3968) - 1984, 0)
-            car.set_rot(0, (random.randrange(360) - 180) * (3.1415927 / 180), 0)
+            car.set_pos(randrange(self.rng, 2944) - 1472, randrange(self.rng, 3968) - 1984, 0)
+            car.set_rot(0, (randrange(self.rng, 360) - 180) * (3.1415927 / 180), 0)
 
 
 class SideHighRoll(StateSetter):
 
-    def __init__(self):
+    def __init__(self, rng: Optional[np.random.Generator] = None):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     def reset(self, state_wrapper: StateWrapper):
-        sidepick = random.randrange(2)
+        sidepick = randrange(self.rng, 2)
 
         side_inverter = 1
         if sidepick == 1:
@@ -824,13 +553,13 @@ class SideHighRoll(StateSetter):
         # MAGIC NUMBERS ARE FROM MANUAL CALIBRATION AND WHAT FEELS RIGHT
 
         ball_x_pos = 3000 * side_inverter
-        ball_y_pos = random.randrange(1500) - 750
+        ball_y_pos = randrange(self.rng, 1500) - 750
         ball_z_pos = BALL_RADIUS
         state_wrapper.ball.set_pos(ball_x_pos, ball_y_pos, ball_z_pos)
 
-        ball_x_vel = (2000 + random.randrange(1000) - 500) * side_inverter
-        ball_y_vel = random.randrange(1500) - 750
-        ball_z_vel = random.randrange(300)
+        ball_x_vel = (2000 + randrange(self.rng, 1000) - 500) * side_inverter
+        ball_y_vel = randrange(self.rng, 1500) - 750
+        ball_z_vel = randrange(self.rng, 300)
         state_wrapper.ball.set_lin_vel(ball_x_vel, ball_y_vel, ball_z_vel)
 
         wall_car_blue = [car for car in state_wrapper.cars if car.team_num == 0][0]
@@ -842,8 +571,8 @@ class SideHighRoll(StateSetter):
         wall_car_blue.set_rot(blue_pitch_rot, blue_yaw_rot, blue_roll_rot)
 
         blue_x = 4096 * side_inverter
-        blue_y = -2500 + (random.randrange(500) - 250)
-        blue_z = 600 + (random.randrange(400) - 200)
+        blue_y = -2500 + (randrange(self.rng, 500) - 250)
+        blue_z = 600 + (randrange(self.rng, 400) - 200)
         wall_car_blue.set_pos(blue_x, blue_y, blue_z)
         wall_car_blue.boost = 100
 
@@ -858,8 +587,8 @@ class SideHighRoll(StateSetter):
             wall_car_orange.set_rot(orange_pitch_rot, orange_yaw_rot, orange_roll_rot)
 
             orange_x = 4096 * side_inverter
-            orange_y = 2500 + (random.randrange(500) - 250)
-            orange_z = 400 + (random.randrange(400) - 200)
+            orange_y = 2500 + (randrange(self.rng, 500) - 250)
+            orange_z = 400 + (randrange(self.rng, 400) - 200)
             wall_car_orange.set_pos(orange_x, orange_y, orange_z)
             wall_car_orange.boost = 100
 
@@ -868,21 +597,22 @@ class SideHighRoll(StateSetter):
                 continue
 
             # set all other cars randomly in the field
-            car.set_pos(random.randrange(2944) - 1472, random.randrange(3968) - 1984, 0)
-            car.set_rot(0, (random.randrange(360) - 180) * (3.1415927 / 180), 0)
+            car.set_pos(randrange(self.rng, 2944) - 1472, randrange(self.rng, 3968) - 1984, 0)
+            car.set_rot(0, (randrange(self.rng, 360) - 180) * (3.1415927 / 180), 0)
 
 
 class ShortGoalRoll(StateSetter):
 
-    def __init__(self):
+    def __init__(self, rng: Optional[np.random.Generator] = None):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     def reset(self, state_wrapper: StateWrapper):
         if len(state_wrapper.cars) > 1:
-            defense_team = random.randrange(2)
+            defense_team = randrange(self.rng, 2)
         else:
             defense_team = 0
-        sidepick = random.randrange(2)
+        sidepick = randrange(self.rng, 2)
 
         defense_inverter = 1
         if defense_team == 0:
@@ -896,22 +626,22 @@ class ShortGoalRoll(StateSetter):
 
         # MAGIC NUMBERS ARE FROM MANUAL CALIBRATION AND WHAT FEELS RIGHT
 
-        x_random = random.randrange(446)
+        x_random = randrange(self.rng, 446)
         ball_x_pos = (-2850 + x_random) * side_inverter
         ball_y_pos = (5120 - BALL_RADIUS) * defense_inverter
-        ball_z_pos = 1400 + random.randrange(400) - 200
+        ball_z_pos = 1400 + randrange(self.rng, 400) - 200
         state_wrapper.ball.set_pos(ball_x_pos, ball_y_pos, ball_z_pos)
 
-        ball_x_vel = (1000 + random.randrange(400) - 200) * side_inverter
+        ball_x_vel = (1000 + randrange(self.rng, 400) - 200) * side_inverter
         ball_y_vel = 0
         ball_z_vel = 550
         state_wrapper.ball.set_lin_vel(ball_x_vel, ball_y_vel, ball_z_vel)
 
         wall_car = [car for car in state_wrapper.cars if car.team_num == defense_team][0]
 
-        wall_car_x = (2000 - random.randrange(500)) * side_inverter
+        wall_car_x = (2000 - randrange(self.rng, 500)) * side_inverter
         wall_car_y = 5120 * defense_inverter
-        wall_car_z = 1000 + (random.randrange(500) - 500)
+        wall_car_z = 1000 + (randrange(self.rng, 500) - 500)
         wall_car.set_pos(wall_car_x, wall_car_y, wall_car_z)
 
         wall_pitch_rot = (0 if side_inverter == -1 else 180) * DEG_TO_RAD
@@ -934,88 +664,81 @@ class ShortGoalRoll(StateSetter):
             if len(state_wrapper.cars) == 1 or car is wall_car or car is challenge_car:
                 continue
 
-            car.set_pos(random.randrange(2944) - 1472, (-4500 + random.randrange(500) - 250) * defense_inverter, 0)
-            car.set_rot(0, (random.randrange(360) - 180) * DEG_TO_RAD, 0)
+            car.set_pos(randrange(self.rng, 2944) - 1472, (-4500 + randrange(self.rng, 500) - 250) * defense_inverter, 0)
+            car.set_rot(0, (randrange(self.rng, 360) - 180) * DEG_TO_RAD, 0)
 
 
 class StandingBallState(StateSetter):
 
+    def __init__(self, rng: Optional[np.random.Generator] = None):
+        super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
+
     def reset(self, state_wrapper: StateWrapper):
-        state_wrapper.ball.set_pos(x=random.Random().randint(-SIDE_WALL_X + 500, SIDE_WALL_X - 500),
+        state_wrapper.ball.set_pos(x=randint(self.rng, -SIDE_WALL_X + 500, SIDE_WALL_X - 500),
                                    y=0,
-                                   z=random.Random().randint(1000, 1300))
+                                   z=randint(self.rng, 1000, 1300))
 
-        state_wrapper.ball.set_lin_vel(x=random.uniform(-1000, 1000),
-                                       y=random.uniform(-1000, 1000),
-                                       z=random.uniform(400, 800)
+        state_wrapper.ball.set_lin_vel(x=uniform(self.rng, -1000, 1000),
+                                       y=uniform(self.rng, -1000, 1000),
+                                       z=uniform(self.rng, 400, 800)
                                        )
 
         blue_team = []
         orange_team = []
 
         for player in state_wrapper.cars:
-
-            x = 0
-            y = 0
-            yaw = 0
             if player.team_num == ORANGE_TEAM:
-
-                y = random.uniform(1000, 2000)
-                yaw = -0.5 * np.pi
-
-                if len(orange_team) >= 1:
-                    choice = random.choice(orange_team)
-
-                    if choice.position.item(0) > 3000:
-                        x = random.Random().randint(choice.position.item(0) - 500,
-                                                    choice.position.item(0) - 200)
-
-                    elif choice.position.item(0) < -3000:
-                        x = random.Random().randint(choice.position.item(0) + 200,
-                                                    choice.position.item(0) + 500)
-                    else:
-                        x = random.Random().randint(choice.position.item(0) - 500,
-                                                    choice.position.item(0) + 500)
-
-                else:
-                    x = random.Random().randint(state_wrapper.ball.position.item(0) - 300,
-                                                state_wrapper.ball.position.item(0) + 300)
-
+                self._place_car(state_wrapper, player, orange_team)
                 orange_team.append(player)
             else:
-                y = random.uniform(-2000, -1000)
-                yaw = 0.5 * np.pi
+                self._place_car(state_wrapper, player, blue_team)
+
+        # Teammates spawned on top of each other are placed again next to another teammate
+        resample_invalid(state_wrapper, resample_car=lambda player: self._place_car(
+            state_wrapper, player,
+            [mate for mate in (orange_team if player.team_num == ORANGE_TEAM else blue_team) if mate is not player]
+        ))
+
+    def _place_car(self, state_wrapper: StateWrapper, player, teammates):
+        if player.team_num == ORANGE_TEAM:
+            y = uniform(self.rng, 1000, 2000)
+            yaw = -0.5 * np.pi
+        else:
+            y = uniform(self.rng, -2000, -1000)
+            yaw = 0.5 * np.pi
 
-                if len(blue_team) >= 1:
-                    choice = random.choice(blue_team)
+        if len(teammates) >= 1:
+            choice = teammates[self.rng.integers(len(teammates))]
 
-                    if choice.position.item(0) > 3000:
-                        x = random.Random().randint(choice.position.item(0) - 500,
-                                                    choice.position.item(0) - 200)
+            if choice.position.item(0) > 3000:
+                x = randint(self.rng, choice.position.item(0) - 500,
+                            choice.position.item(0) - 200)
 
-                    elif choice.position.item(0) < -3000:
-                        x = random.Random().randint(choice.position.item(0) + 200,
-                                                    choice.position.item(0) + 500)
-                    else:
-                        x = random.Random().randint(choice.position.item(0) - 500,
-                                                    choice.position.item(0) + 500)
+            elif choice.position.item(0) < -3000:
+                x = randint(self.rng, choice.position.item(0) + 200,
+                            choice.position.item(0) + 500)
+            else:
+                x = randint(self.rng, choice.position.item(0) - 500,
+                            choice.position.item(0) + 500)
 
-                else:
-                    x = random.Random().randint(
+        else:
+            x = randint(self.rng,
                         state_wrapper.ball.position.item(0) - 300,
                         state_wrapper.ball.position.item(0) + 300)
 
-            player.set_pos(
-                x=x,
-                y=y,
-                z=30)
-            player.set_rot(yaw=yaw)
-            player.boost = 100
+        player.set_pos(
+            x=x,
+            y=y,
+            z=30)
+        player.set_rot(yaw=yaw)
+        player.boost = 100
 
 
 class AerialBallState(StateSetter):
-    def __init__(self):
+    def __init__(self, rng: Optional[np.random.Generator] = None):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.observators = []
 
     def reset(self, state_wrapper: StateWrapper):
@@ -1038,26 +761,26 @@ class AerialBallState(StateSetter):
         zthreshold = 500
 
         # Ball position
-        state_wrapper.ball.set_pos(x=np.random.randint(-SIDE_WALL_X + xthreshold,
+        state_wrapper.ball.set_pos(x=self.rng.integers(-SIDE_WALL_X + xthreshold,
                                                        SIDE_WALL_X - xthreshold),
 
-                                   y=np.random.randint(-BACK_WALL_Y + ythreshold,
+                                   y=self.rng.integers(-BACK_WALL_Y + ythreshold,
                                                        BACK_WALL_Y - ythreshold),
 
-                                   z=np.random.randint(zthreshold,
+                                   z=self.rng.integers(zthreshold,
                                                        CEILING_Z - 2 * zthreshold)
                                    )
 
         # Ball speed
-        state_wrapper.ball.set_lin_vel(x=np.random.randint(500, 1000),
-                                       y=np.random.randint(500, 1000),
-                                       z=np.random.randint(500, 1000)
+        state_wrapper.ball.set_lin_vel(x=self.rng.integers(500, 1000),
+                                       y=self.rng.integers(500, 1000),
+                                       z=self.rng.integers(500, 1000)
                                        )
 
         for player in state_wrapper.cars:
-            player.set_pos(x=np.random.randint(-SIDE_WALL_X + xthreshold,
+            player.set_pos(x=self.rng.integers(-SIDE_WALL_X + xthreshold,
                                                SIDE_WALL_X - xthreshold),
-                           y=np.random.randint(-BACK_WALL_Y + ythreshold,
+                           y=self.rng.integers(-BACK_WALL_Y + ythreshold,
                                                BACK_WALL_Y - ythreshold),
                            z=30)
 
@@ -1075,3 +798,26 @@ class AerialBallState(StateSetter):
 
     '''def bind_to(self, ball_register: BallDistRegisterer):
         self.observators.append(ball_register)'''
+
+
+# Scenarios of ProbabilisticStateSetter, the names are the keys of setters/scenarios.json
+SCENARIOS = {
+    "random": CustomStateSetter,
+    "kickoff": DefaultState,
+    "shot": ShotState,
+    "jump_shot": JumpShotState,
+    "save": SaveState,
+    "air_dribble_2_touch": AirDribble2Touch,
+    "air_dribble_setup": AirDribbleSetup,
+    "side_high_roll": SideHighRoll,
+    "short_goal_roll": ShortGoalRoll,
+    "standing_ball": StandingBallState,
+    "aerial_ball": AerialBallState,
+}
+
+DEFAULT_SCENARIO_WEIGHTS = {
+    "random": 0.25,
+    "kickoff": 0.50,
+    "shot": 0.125,
+    "save": 0.125,
+}
@@ -82,7 +82,8 @@ class Astra:
             action_parser=action_parser,
             rewards=rewards,
             rewards_weights=rewards_weights,
-            stats_trackers=[]
+            stats_trackers=[],
+            ui_pipe=ui_pipe
         )
         self.worker = Worker(
             team_size=3,
@@ -0,0 +1,110 @@
+"""
+Times the eager DiscretePolicy and the frozen actor of models/frozen_actor.py for the batch sizes of a worker step
+(one observation per player, 1 to 6). Their parity is checked in tests/test_frozen_actor.py.
+
+    python -m benchmarks.inference_benchmark --save benchmarks/baselines/inference.json
+    python -m benchmarks.inference_benchmark --compare benchmarks/baselines/inference.json
+
+A call is what a worker runs per step: the action distribution and a sampled action. Exits with 1 if --compare
+finds a slowdown above the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+import numpy as np
+import torch
+
+from benchmarks.obs_benchmark import compare, git_commit, summarize
+from learner import create_agent
+from models.frozen_actor import freeze_policy
+from obs.layout import ASTRA_LAYOUT
+
+
+def bench_policy(policy, batch_size: int, calls: int, warmup: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    # Numpy observations like the ones of the obs builder
+    observations = rng.standard_normal((calls + warmup, batch_size, ASTRA_LAYOUT.size)).astype(np.float32)
+
+    durations = []
+    with torch.no_grad():
+        for i, obs in enumerate(observations):
+            start = time.perf_counter_ns()
+            distribution = policy.get_action_distribution(obs)
+            policy.sample_action(distribution)
+            if i >= warmup:
+                durations.append(time.perf_counter_ns() - start)
+
+    result = summarize(durations)
+    result["steps_per_sec"] = float(1e9 / np.mean(durations))
+    return result
+
+
+def run(policies: dict, batch_sizes: List[int], calls: int, warmup: int, seed: int) -> dict:
+    results = {}
+    for batch_size in batch_sizes:
+        for name, policy in policies.items():
+            results[f"{name}/batch={batch_size}"] = bench_policy(policy, batch_size, calls, warmup, seed)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "machine": platform.machine(),
+            "threads": torch.get_num_threads(),
+            "calls": calls,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def print_results(report: dict):
+    print(f"{'policy':<20}{'p50 us':>9}{'p90 us':>9}{'p99 us':>9}{'steps/s':>10}")
+    for name, result in report["results"].items():
+        print(f"{name:<20}{result['p50_us']:>9.1f}{result['p90_us']:>9.1f}{result['p99_us']:>9.1f}"
+              f"{result['steps_per_sec']:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eager and frozen actor latency")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 2, 3, 4, 5, 6])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threads", type=int, default=1, help="torch threads, the workers use 1")
+    parser.add_argument("--no-fuse", action="store_true", help="Freezes without the oneDNN fuser")
+    parser.add_argument("--save", help="Writes the results to this JSON file")
+    parser.add_argument("--compare", help="JSON baseline saved with --save")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed median slowdown in %%")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(args.seed)
+    eager = create_agent(pretrained=False).actor.eval()
+    frozen = freeze_policy(eager, fuse=not args.no_fuse)
+
+    report = run({"eager": eager, "frozen": frozen}, args.batch_sizes, args.calls, args.warmup, args.seed)
+    print_results(report)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Times the physics cache of AstraObs with and without mirror_frames, which derives the orange frame from the blue one
+instead of reading the inverted data of the state. The equivalence of the observations is in tests/test_astra_obs.py.
+
+    python -m benchmarks.mirror_benchmark
+"""
+import argparse
+import time
+
+from benchmarks.synthetic_state import make_states
+from obs.AstraObs import AstraObs
+
+
+def time_physics_cache(builder: AstraObs, states: list) -> float:
+    start = time.perf_counter()
+    for state in states:
+        builder._update_physics_cache(state)
+    return (time.perf_counter() - start) / len(states) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AstraObs mirror_frames physics cache timings")
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for team_size in (1, 2, 3):
+        states = make_states(team_size, args.steps, args.seed)
+        default = time_physics_cache(AstraObs(), states)
+        mirrored = time_physics_cache(AstraObs(mirror_frames=True), states)
+        print(f"{team_size}v{team_size} physics cache {default:.1f}us -> {mirrored:.1f}us with mirror_frames")
+
+
+if __name__ == "__main__":
+    main()
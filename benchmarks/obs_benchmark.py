@@ -0,0 +1,241 @@
+"""
+Micro-benchmark of the observation builders on synthetic states, runs headless (no game client).
+
+    python -m benchmarks.obs_benchmark --save benchmarks/baselines/obs.json
+    python -m benchmarks.obs_benchmark --compare benchmarks/baselines/obs.json
+
+Everything runs in this process, so steps/sec is per core. A step is pre_step + build_obs for every player.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+from rlgym.utils.obs_builders import AdvancedObs
+
+from benchmarks.synthetic_state import make_states
+from obs.AstraObs import AstraObs
+
+
+def astra_obs(team_size: int):
+    # Same builder as the workers, always sized for 3v3
+    return AstraObs(team_size=3)
+
+
+def rlgym_advanced_obs(team_size: int):
+    return AdvancedObs()
+
+
+def compat_advanced_obs(team_size: int):
+    from obs.advanced_obs import AdvancedObs as CompatAdvancedObs
+    return CompatAdvancedObs()
+
+
+def compat_default_obs(team_size: int):
+    from obs.default_obs import DefaultObs
+    return DefaultObs()
+
+
+BUILDERS: Dict[str, Callable] = {
+    "AstraObs": astra_obs,
+    "AdvancedObs": rlgym_advanced_obs,
+    "compat.AdvancedObs": compat_advanced_obs,
+    "compat.DefaultObs": compat_default_obs,
+}
+
+
+def summarize(durations_ns: List[int]) -> dict:
+    durations = np.asarray(durations_ns) / 1e3
+    return {
+        "calls": len(durations),
+        "mean_us": float(durations.mean()),
+        "p50_us": float(np.percentile(durations, 50)),
+        "p90_us": float(np.percentile(durations, 90)),
+        "p99_us": float(np.percentile(durations, 99)),
+        "max_us": float(durations.max()),
+    }
+
+
+def measure_allocations(calls: List[Callable]) -> dict:
+    """
+    Bytes allocated by each call, peak is everything alive at once during the call
+    and retained is what is still alive afterwards (the returned obs included)
+    """
+    peaks = []
+    retained = []
+    results = []
+
+    tracemalloc.start()
+    for call in calls:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        results.append(call())
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        retained.append(current - before)
+    tracemalloc.stop()
+
+    return {
+        "alloc_peak_bytes": float(np.median(peaks)),
+        "alloc_retained_bytes": float(np.median(retained)),
+    }
+
+
+def bench_build_obs(factory: Callable, team_size: int, steps: int, warmup: int, seed: int) -> dict:
+    builder = factory(team_size)
+    states = make_states(team_size, steps + warmup, seed)
+    previous_action = np.zeros(8)
+
+    builder.reset(states[0])
+    for state in states[:warmup]:
+        builder.pre_step(state)
+        for player in state.players:
+            builder.build_obs(player, state, previous_action)
+
+    calls = []
+    step_times = []
+    for state in states[warmup:]:
+        start = time.perf_counter_ns()
+        builder.pre_step(state)
+        for player in state.players:
+            call_start = time.perf_counter_ns()
+            builder.build_obs(player, state, previous_action)
+            calls.append(time.perf_counter_ns() - call_start)
+        step_times.append(time.perf_counter_ns() - start)
+
+    # Allocations on a fresh pass, tracemalloc slows everything down
+    allocation_calls = []
+    for state in states[warmup:warmup + min(steps, 200)]:
+        builder.pre_step(state)
+        allocation_calls += [lambda p=player, s=state: builder.build_obs(p, s, previous_action)
+                             for player in state.players]
+
+    result = summarize(calls)
+    result.update(measure_allocations(allocation_calls))
+    result["steps_per_sec"] = float(1e9 / np.mean(step_times))
+    return result
+
+
+def bench_update_timers(team_size: int, steps: int, warmup: int, seed: int) -> dict:
+    builder = AstraObs(team_size=3, include_timers=True)
+    states = make_states(team_size, steps + warmup, seed)
+
+    for state in states[:warmup]:
+        builder._update_timers(state)
+
+    calls = []
+    for state in states[warmup:]:
+        start = time.perf_counter_ns()
+        builder._update_timers(state)
+        calls.append(time.perf_counter_ns() - start)
+
+    result = summarize(calls)
+    result.update(measure_allocations([lambda s=state: builder._update_timers(s)
+                                       for state in states[warmup:warmup + min(steps, 200)]]))
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run(builders: List[str], team_sizes: List[int], steps: int, warmup: int, seed: int) -> dict:
+    results = {}
+
+    for team_size in team_sizes:
+        mode = f"{team_size}v{team_size}"
+
+        for name in builders:
+            try:
+                results[f"{name}.build_obs/{mode}"] = bench_build_obs(BUILDERS[name], team_size, steps, warmup,
+                                                                      seed)
+            except ImportError as e:
+                print(f"Skipping {name} : {e}")
+
+        results[f"AstraObs._update_timers/{mode}"] = bench_update_timers(team_size, steps, warmup, seed)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "steps": steps,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def print_results(report: dict):
+    print(f"{'benchmark':<36}{'p50 us':>9}{'p90 us':>9}{'p99 us':>9}{'peak B':>10}{'kept B':>9}{'steps/s':>10}")
+    for name, result in report["results"].items():
+        steps_per_sec = f"{result['steps_per_sec']:.0f}" if "steps_per_sec" in result else "-"
+        print(f"{name:<36}{result['p50_us']:>9.1f}{result['p90_us']:>9.1f}{result['p99_us']:>9.1f}"
+              f"{result['alloc_peak_bytes']:>10.0f}{result['alloc_retained_bytes']:>9.0f}{steps_per_sec:>10}")
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> bool:
+    """
+    Compares the medians with the baseline, returns False if anything got slower than the threshold (in %)
+    """
+    print(f"\nCompared to {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta'].get('date')})")
+    ok = True
+
+    for name, result in report["results"].items():
+        if name not in baseline["results"]:
+            print(f"{name:<36} new")
+            continue
+
+        before = baseline["results"][name]["p50_us"]
+        change = (result["p50_us"] - before) / before * 100
+        regression = change > threshold
+        ok &= not regression
+        print(f"{name:<36}{before:>9.1f} -> {result['p50_us']:>7.1f} us  {change:+6.1f}%"
+              f"{'  REGRESSION' if regression else ''}")
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Observation builders micro-benchmark")
+    parser.add_argument("--builders", nargs="+", default=list(BUILDERS), choices=list(BUILDERS))
+    parser.add_argument("--team-sizes", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Writes the results to this JSON file")
+    parser.add_argument("--compare", help="JSON baseline saved with --save")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed median slowdown in %%")
+    args = parser.parse_args()
+
+    report = run(args.builders, args.team_sizes, args.steps, args.warmup, args.seed)
+    print_results(report)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Benchmark of a PPO iteration of the learner across torch thread counts, on synthetic rollouts (no Redis, no workers).
+
+    python -m benchmarks.ppo_benchmark --threads 1 2 4 8 --save benchmarks/baselines/ppo.json
+    python -m benchmarks.ppo_benchmark --compare benchmarks/baselines/ppo.json
+    python -m benchmarks.ppo_benchmark --agents separate shared --threads 4
+
+An iteration is the update of rocket_learn's PPO: epochs passes over n_steps samples, an optimizer step per batch and
+a backward pass per minibatch, on the agent of learner.create_agent (separate networks or shared trunk). The sizes
+default to learner_config.json. Each configuration runs in its own process, so the inter-op threads can be set and
+the peak memory (max RSS, not measured on Windows) is its own.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+import torch
+from torch.nn.utils import clip_grad_norm_
+
+from benchmarks.obs_benchmark import compare, git_commit, summarize
+from learner import TrainingConfig, create_agent, load_training_config
+from obs.layout import ASTRA_LAYOUT
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+AGENTS = {
+    "separate": False,
+    "shared": True,
+}
+
+# Same as Learner.run
+CLIP_RANGE = 0.2
+ENT_COEF = 0.01
+VF_COEF = 1
+MAX_GRAD_NORM = 0.5
+
+
+def make_rollouts(samples: int, seed: int, agent) -> dict:
+    """
+    Random observations and the values PPO reads from a rollout, actions drawn from the policy itself
+    """
+    generator = torch.Generator().manual_seed(seed)
+    obs = torch.randn([samples, ASTRA_LAYOUT.size], generator=generator)
+
+    with torch.no_grad():
+        distribution = agent.actor.get_action_distribution(obs)
+        actions = agent.actor.sample_action(distribution)
+        log_probs = agent.actor.log_prob(distribution, actions)
+
+    return {
+        "obs": obs,
+        "actions": actions,
+        "log_probs": log_probs,
+        "advantages": torch.randn([samples], generator=generator),
+        "returns": torch.randn([samples], generator=generator),
+    }
+
+
+def ppo_iteration(agent, rollouts: dict, config: TrainingConfig):
+    samples = len(rollouts["obs"])
+
+    for _ in range(config.epochs):
+        indices = torch.randperm(samples)
+        for batch_start in range(0, samples, config.batch_size):
+            batch = indices[batch_start:batch_start + config.batch_size]
+            agent.optimizer.zero_grad()
+
+            # Gradients of the minibatches accumulated, one step per batch
+            for start in range(0, len(batch), config.minibatch_size):
+                minibatch = batch[start:start + config.minibatch_size]
+                advantages = rollouts["advantages"][minibatch]
+                # One tensor for both networks like rocket_learn, the shared trunk runs once
+                obs = rollouts["obs"][minibatch]
+
+                distribution = agent.actor.get_action_distribution(obs)
+                log_prob = agent.actor.log_prob(distribution, rollouts["actions"][minibatch])
+                entropy = agent.actor.entropy(distribution, rollouts["actions"][minibatch]).mean()
+                values = agent.critic(obs).view(-1)
+
+                ratio = torch.exp(log_prob - rollouts["log_probs"][minibatch])
+                policy_loss = -torch.min(ratio * advantages,
+                                         torch.clamp(ratio, 1 - CLIP_RANGE, 1 + CLIP_RANGE) * advantages).mean()
+                value_loss = torch.nn.functional.mse_loss(values, rollouts["returns"][minibatch])
+                loss = policy_loss - ENT_COEF * entropy + VF_COEF * value_loss
+
+                (loss * len(minibatch) / len(batch)).backward()
+
+            # Clipped per network like rocket_learn, a shared trunk by both
+            clip_grad_norm_(agent.actor.parameters(), MAX_GRAD_NORM)
+            clip_grad_norm_(agent.critic.parameters(), MAX_GRAD_NORM)
+            agent.optimizer.step()
+
+
+def bench_agent(shared_trunk: bool, threads: int, interop_threads: Optional[int], config: TrainingConfig,
+                iterations: int, warmup: int, seed: int) -> dict:
+    torch.set_num_threads(threads)
+    if interop_threads is not None:
+        torch.set_num_interop_threads(interop_threads)
+    torch.manual_seed(seed)
+    agent = create_agent(pretrained=False, shared_trunk=shared_trunk)
+    rollouts = make_rollouts(config.n_steps, seed, agent)
+
+    for _ in range(warmup):
+        ppo_iteration(agent, rollouts, config)
+
+    calls = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        ppo_iteration(agent, rollouts, config)
+        calls.append(time.perf_counter_ns() - start)
+
+    result = summarize(calls)
+    result["samples_per_sec"] = float(config.n_steps * config.epochs * 1e9 / np.mean(calls))
+    result["parameters"] = sum(parameter.numel() for group in agent.optimizer.param_groups
+                               for parameter in group["params"])
+    # Linux reports kB
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    return result
+
+
+def run(agents: List[str], thread_counts: List[int], interop_threads: Optional[int], config: TrainingConfig,
+        iterations: int, warmup: int, seed: int) -> dict:
+    results = {}
+    context = multiprocessing.get_context("spawn")
+
+    for agent in agents:
+        for threads in thread_counts:
+            # A fresh process per configuration, for the inter-op threads and the peak memory
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[f"{agent}/threads={threads}"] = executor.submit(
+                    bench_agent, AGENTS[agent], threads, interop_threads, config, iterations, warmup, seed).result()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "interop_threads": interop_threads,
+            "training": config._asdict(),
+            "iterations": iterations,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def print_results(report: dict):
+    print(f"{'agent':<22}{'p50 s':>9}{'p90 s':>9}{'samples/s':>12}{'speedup':>9}{'params':>10}{'peak MB':>9}")
+    for name, result in report["results"].items():
+        # Against the same agent on one thread
+        single = report["results"].get(f"{name.split('/')[0]}/threads=1")
+        speedup = single["p50_us"] / result["p50_us"] if single else float("nan")
+        peak = f"{result['peak_rss_mb']:.0f}" if result["peak_rss_mb"] is not None else "-"
+        print(f"{name:<22}{result['p50_us'] / 1e6:>9.2f}{result['p90_us'] / 1e6:>9.2f}"
+              f"{result['samples_per_sec']:>12.0f}{speedup:>9.2f}{result['parameters']:>10}{peak:>9}")
+
+
+def main():
+    defaults = load_training_config()
+    parser = argparse.ArgumentParser(description="PPO update benchmark across thread counts")
+    parser.add_argument("--agents", nargs="+", default=["shared" if defaults.shared_trunk else "separate"],
+                        choices=list(AGENTS))
+    parser.add_argument("--threads", nargs="+", type=int,
+                        default=[threads for threads in (1, 2, 4, 8, 16) if threads <= (os.cpu_count() or 1)])
+    parser.add_argument("--interop-threads", type=int, help="torch inter-op threads")
+    parser.add_argument("--n-steps", type=int, default=defaults.n_steps, help="Samples per iteration")
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size)
+    parser.add_argument("--minibatch-size", type=int, default=defaults.minibatch_size)
+    parser.add_argument("--epochs", type=int, default=defaults.epochs)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Writes the results to this JSON file")
+    parser.add_argument("--compare", help="JSON baseline saved with --save")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed median slowdown in %%")
+    args = parser.parse_args()
+
+    config = defaults._replace(n_steps=args.n_steps, batch_size=args.batch_size, minibatch_size=args.minibatch_size,
+                               epochs=args.epochs)
+    report = run(args.agents, args.threads, args.interop_threads, config, args.iterations, args.warmup, args.seed)
+    print_results(report)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmark of the state setters of CustomStateSetter.py, runs headless on StateWrappers (no game client).
+
+    python -m benchmarks.setter_benchmark --save benchmarks/baselines/setters.json
+    python -m benchmarks.setter_benchmark --compare benchmarks/baselines/setters.json
+
+Besides the reset times, it summarizes what the setters produce (ball height and speed, car speed, car-ball distance,
+boost) so a faster setter can be shown to draw the same states. --compare flags the medians slower than the threshold
+and the distributions whose mean moved by more than --max-z standard errors.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+from rlgym.utils.state_setters import StateWrapper
+
+from benchmarks.obs_benchmark import compare, git_commit, summarize
+from CustomStateSetter import SCENARIOS, ProbabilisticStateSetter
+from setters.state_bank import wrapper_car_order
+
+
+def probabilistic_state_setter(rng: np.random.Generator):
+    # Weights of setters/scenarios.json, without a bank
+    return ProbabilisticStateSetter(seed=int(rng.integers(2 ** 63)))
+
+
+SETTERS: Dict[str, Callable[[np.random.Generator], object]] = dict(SCENARIOS, probabilistic=probabilistic_state_setter)
+
+METRICS = ("ball_height", "ball_speed", "car_speed", "car_ball_distance", "car_boost")
+
+
+def measure(state_wrapper: StateWrapper, samples: Dict[str, list]):
+    ball = state_wrapper.ball
+    cars = wrapper_car_order(state_wrapper)
+
+    samples["ball_height"].append(ball.position[2])
+    samples["ball_speed"].append(np.linalg.norm(ball.linear_velocity))
+    for car in cars:
+        samples["car_speed"].append(np.linalg.norm(car.linear_velocity))
+        samples["car_ball_distance"].append(np.linalg.norm(car.position - ball.position))
+        samples["car_boost"].append(car.boost)
+
+
+def describe(values: list) -> dict:
+    values = np.asarray(values, dtype=float)
+    return {
+        "count": len(values),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "p5": float(np.percentile(values, 5)),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+    }
+
+
+def bench_setter(factory: Callable, team_size: int, resets: int, warmup: int, seed: int) -> dict:
+    setter = factory(np.random.default_rng(seed))
+    # A fresh wrapper per reset like the environment, some setters only set part of the state
+    wrappers = [StateWrapper(team_size, team_size) for _ in range(resets + warmup)]
+
+    for state_wrapper in wrappers[:warmup]:
+        setter.reset(state_wrapper)
+
+    calls = []
+    samples = {metric: [] for metric in METRICS}
+    for state_wrapper in wrappers[warmup:]:
+        start = time.perf_counter_ns()
+        setter.reset(state_wrapper)
+        calls.append(time.perf_counter_ns() - start)
+        measure(state_wrapper, samples)
+
+    result = summarize(calls)
+    result["resets_per_sec"] = float(1e9 / np.mean(calls))
+    result["distributions"] = {metric: describe(values) for metric, values in samples.items()}
+    return result
+
+
+def run(setters: List[str], team_sizes: List[int], resets: int, warmup: int, seed: int) -> dict:
+    results = {}
+
+    for team_size in team_sizes:
+        mode = f"{team_size}v{team_size}"
+        for name in setters:
+            results[f"{name}/{mode}"] = bench_setter(SETTERS[name], team_size, resets, warmup, seed)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "resets": resets,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def print_results(report: dict):
+    print(f"{'setter':<28}{'p50 us':>9}{'p90 us':>9}{'p99 us':>9}{'resets/s':>10}"
+          f"{'ball z':>9}{'ball v':>9}{'car v':>9}{'car-ball':>10}")
+    for name, result in report["results"].items():
+        distributions = result["distributions"]
+        print(f"{name:<28}{result['p50_us']:>9.1f}{result['p90_us']:>9.1f}{result['p99_us']:>9.1f}"
+              f"{result['resets_per_sec']:>10.0f}"
+              f"{distributions['ball_height']['mean']:>9.0f}{distributions['ball_speed']['mean']:>9.0f}"
+              f"{distributions['car_speed']['mean']:>9.0f}{distributions['car_ball_distance']['mean']:>10.0f}")
+
+
+def compare_distributions(report: dict, baseline: dict, max_z: float) -> bool:
+    """
+    Two sample z-test on the mean of every metric, returns False if any moved by more than max_z standard errors
+    """
+    print(f"\nDistributions compared to {baseline['meta'].get('commit') or 'baseline'}")
+    ok = True
+
+    for name, result in report["results"].items():
+        if name not in baseline["results"]:
+            continue
+
+        for metric, now in result["distributions"].items():
+            before = baseline["results"][name]["distributions"].get(metric)
+            if before is None:
+                continue
+
+            error = np.sqrt(now["std"] ** 2 / now["count"] + before["std"] ** 2 / before["count"])
+            if error == 0:
+                z = 0.0 if now["mean"] == before["mean"] else np.inf
+            else:
+                z = abs(now["mean"] - before["mean"]) / error
+
+            if z > max_z:
+                ok = False
+                print(f"{name:<28}{metric:<20}{before['mean']:>10.1f} -> {now['mean']:>10.1f}  z={z:.1f}  CHANGED")
+
+    if ok:
+        print("No distribution changed")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="State setters benchmark")
+    parser.add_argument("--setters", nargs="+", default=list(SETTERS), choices=list(SETTERS))
+    parser.add_argument("--team-sizes", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--resets", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Writes the results to this JSON file")
+    parser.add_argument("--compare", help="JSON baseline saved with --save")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed median slowdown in %%")
+    parser.add_argument("--max-z", type=float, default=4, help="Allowed shift of a mean, in standard errors")
+    args = parser.parse_args()
+
+    report = run(args.setters, args.team_sizes, args.resets, args.warmup, args.seed)
+    print_results(report)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        faster = compare(report, baseline, args.threshold)
+        same = compare_distributions(report, baseline, args.max_z)
+        if not (faster and same):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
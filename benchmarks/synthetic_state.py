@@ -0,0 +1,60 @@
+"""
+Synthetic GameStates for the benchmarks, no game client needed.
+The states are packed like the Bakkesmod plugin packets and decoded by rlgym, mirrored data included.
+"""
+import numpy as np
+from rlgym.utils.gamestates import GameState
+
+import rlgym.utils.common_values as constants
+
+# Mirroring of the orange perspective, 180 degrees around z
+INVERT = np.array([-1, -1, 1])
+
+
+def invert_quaternion(quaternion: np.ndarray) -> np.ndarray:
+    w, x, y, z = quaternion
+    return np.array([-z, -y, x, w])
+
+
+def random_physics(rng: np.random.Generator, with_rotation: bool):
+    position = rng.uniform(-1, 1, 3) * [constants.SIDE_WALL_X, constants.BACK_WALL_Y, 0] + \
+        [0, 0, rng.uniform(17, constants.CEILING_Z)]
+    linear_velocity = rng.uniform(-2000, 2000, 3)
+    angular_velocity = rng.uniform(-5.5, 5.5, 3)
+
+    if not with_rotation:
+        return np.concatenate((position, linear_velocity, angular_velocity,
+                               position * INVERT, linear_velocity * INVERT, angular_velocity * INVERT))
+
+    quaternion = rng.normal(size=4)
+    quaternion /= np.linalg.norm(quaternion)
+    return np.concatenate((position, quaternion, linear_velocity, angular_velocity,
+                           position * INVERT, invert_quaternion(quaternion), linear_velocity * INVERT,
+                           angular_velocity * INVERT))
+
+
+def pack_state(team_size: int, rng: np.random.Generator) -> list:
+    """
+    Random state floats for team_size players per team, blue cars first
+    """
+    pads = rng.integers(0, 2, GameState.BOOST_PADS_LENGTH)
+    values = [0, 0, 0] + list(pads) + list(random_physics(rng, with_rotation=False))
+
+    for i in range(team_size * 2):
+        team = constants.BLUE_TEAM if i < team_size else constants.ORANGE_TEAM
+        # goals, saves, shots, demos, pickups, demo'd, on ground, ball touched, has jump, has flip, boost
+        tertiary = [0, 0, 0, 0, 0,
+                    rng.random() < 0.05, rng.random() < 0.6, 0, rng.random() < 0.6, rng.random() < 0.8,
+                    rng.uniform(0, 1)]
+        values += [i + 1, team] + list(random_physics(rng, with_rotation=True)) + tertiary
+
+    return [float(value) for value in values]
+
+
+def make_state(team_size: int, rng: np.random.Generator) -> GameState:
+    return GameState(pack_state(team_size, rng))
+
+
+def make_states(team_size: int, count: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [make_state(team_size, rng) for _ in range(count)]
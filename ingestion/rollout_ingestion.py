@@ -0,0 +1,191 @@
+"""
+Rollouts pulled and decoded in the background while the learner runs its SGD epochs.
+
+rocket_learn's RedisRolloutGenerator pulls each rollout from Redis, unpickles it and rebuilds its buffers (and the
+rewards when the workers don't send them) in the learner's main thread, between two optimizations.
+RolloutIngestion runs one copy of its generate_rollouts per thread, each copy sends the decoding to a process pool,
+and the decoded rollouts wait in a bounded queue that PPO reads from. While the epochs run, the threads mostly wait
+on Redis and on the pool, they hold the GIL for little.
+
+The copies share the generator (ratings, versions, stats), a thread only steps its copy with the generator lock held
+and releases it while it waits on Redis (blpop) and while its decoding runs in the pool, so the generator state is
+never updated from two threads.
+
+The generator drops the rollouts older than its max_age when it pulls them, a rollout can then wait in the ready
+queue while new models are published: they are checked again against the latest version when PPO takes them.
+The rollouts pulled during the epochs are taken after the next update_parameters, a version behind: with the
+default max_age of 0 they are all dropped, set max_age (learner_config.json) to at least 1.
+"""
+import functools
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from queue import Queue
+from typing import Callable, Optional
+
+QUEUE_SIZE = 256
+
+# decode_buffers of the learner before RolloutIngestion replaced it, forked pool processes inherit it
+_local_decode = None
+
+
+def _decode_in_pool(*args, **kwargs):
+    from rocket_learn.rollout_generator.redis import redis_rollout_generator
+
+    decode = _local_decode if _local_decode is not None else redis_rollout_generator.decode_buffers
+    decoded = decode(*args, **kwargs)
+    # A generator can't be sent back, anything else is returned as decode_buffers gave it
+    return list(decoded) if isinstance(decoded, Iterator) else decoded
+
+
+def agent_version(versions) -> Optional[int]:
+    """
+    Version of the learning agent in the versions of a rollout, negative in rocket_learn, None if there is none
+    """
+    try:
+        agent = [-version for version in versions if version < 0]
+    except TypeError:
+        return None
+    return min(agent) if agent else None
+
+
+class _Failure:
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+class RolloutIngestion:
+    def __init__(self, rollout_generator, processes: int = 2, queue_size: int = QUEUE_SIZE,
+                 initializer: Optional[Callable] = None):
+        """
+        :param rollout_generator: RedisRolloutGenerator, its factories must be picklable (no closures)
+        :param processes: Decoding processes, with as many threads pulling from Redis
+        :param queue_size: Decoded rollouts kept ready at most
+        :param initializer: Run in each decoding process, for instance obs.delta_stream.install_learner_decoding
+        """
+        self.rollout_generator = rollout_generator
+        self.processes = processes
+        self.queue = Queue(maxsize=queue_size)
+        self.pool = ProcessPoolExecutor(max_workers=processes, initializer=initializer)
+        self.max_age = getattr(rollout_generator, "max_age", 0)
+
+        # Held by the thread stepping its copy of generate_rollouts
+        self.lock = threading.Lock()
+        self._pulling = threading.local()
+        self._generate_rollouts = rollout_generator.generate_rollouts
+        self._threads = []
+
+        # Latest model version, from the versions of the rollouts and the publications
+        self.latest_version = None
+        self.dropped = 0
+
+    def install(self):
+        """
+        Makes the rollout generator read the ready queue and decode in the pool, before PPO.run
+        """
+        global _local_decode
+        from rocket_learn.rollout_generator.redis import redis_rollout_generator
+
+        decode_buffers = redis_rollout_generator.decode_buffers
+        if not getattr(decode_buffers, "parallel", False):
+            _local_decode = decode_buffers
+
+            @functools.wraps(decode_buffers)
+            def parallel_decode_buffers(*args, **kwargs):
+                return self._decode(*args, **kwargs)
+
+            parallel_decode_buffers.parallel = True
+            redis_rollout_generator.decode_buffers = parallel_decode_buffers
+
+        # Waiting for the next rollout doesn't block the threads with a decoded one
+        redis = getattr(self.rollout_generator, "redis", None)
+        if redis is not None and not getattr(redis.blpop, "unlocked", False):
+            redis.blpop = self._unlocked(redis.blpop)
+
+        update_parameters = self.rollout_generator.update_parameters
+
+        @functools.wraps(update_parameters)
+        def versioned_update_parameters(*args, **kwargs):
+            result = update_parameters(*args, **kwargs)
+            if self.latest_version is not None:
+                self.latest_version += 1
+            return result
+
+        self.rollout_generator.update_parameters = versioned_update_parameters
+        self.rollout_generator.generate_rollouts = self.ready_rollouts
+
+    def _unlocked(self, function: Callable) -> Callable:
+        """
+        Runs function without the generator lock when called by a thread holding it, the other threads step their
+        copy of the generator meanwhile
+        """
+
+        @functools.wraps(function)
+        def unlocked(*args, **kwargs):
+            if not getattr(self._pulling, "holding", False):
+                return function(*args, **kwargs)
+
+            self.lock.release()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.lock.acquire()
+
+        unlocked.unlocked = True
+        return unlocked
+
+    def _decode(self, enc_buffers, versions, *args, **kwargs):
+        future = self.pool.submit(_decode_in_pool, enc_buffers, versions, *args, **kwargs)
+        self._pulling.version = agent_version(versions)
+        return self._unlocked(future.result)()
+
+    def start(self):
+        for i in range(self.processes):
+            thread = threading.Thread(target=self._pull, name=f"rollout-ingestion-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _pull(self):
+        # Version of the last decoding of this thread, its buffers are yielded one by one
+        self._pulling.version = None
+        try:
+            rollouts = self._generate_rollouts()
+            while True:
+                with self.lock:
+                    self._pulling.holding = True
+                    try:
+                        rollout = next(rollouts, None)
+                    finally:
+                        self._pulling.holding = False
+                    version = self._pulling.version
+                    if version is not None and (self.latest_version is None or version > self.latest_version):
+                        self.latest_version = version
+
+                if rollout is None:
+                    return
+                self.queue.put((version, rollout))
+        except BaseException as e:
+            self.queue.put((None, _Failure(e)))
+
+    def stale(self, version: Optional[int]) -> bool:
+        return version is not None and self.latest_version is not None and \
+            self.latest_version - version > self.max_age
+
+    def ready_rollouts(self):
+        """
+        Replaces generate_rollouts, the decoded rollouts in the order they are ready, without the stale ones
+        """
+        if not self._threads:
+            self.start()
+
+        while True:
+            version, rollout = self.queue.get()
+            if isinstance(rollout, _Failure):
+                raise rollout.exception
+            if self.stale(version):
+                self.dropped += 1
+                continue
+            yield rollout
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
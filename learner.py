@@ -1,5 +1,8 @@
+import functools
+import json
 import os
-from typing import Any, Type, Union, Tuple, List
+from collections import namedtuple
+from typing import Any, Optional, Type, Union, Tuple, List
 
 import numpy
 import torch.jit
@@ -10,16 +13,75 @@ from rlgym.utils.action_parsers import ActionParser
 from rlgym_compat import PlayerData, GameState
 from rlgym_tools.sb3_utils.sb3_log_reward import SB3CombinedLogReward
 from rocket_learn.agent.actor_critic_agent import ActorCriticAgent
-from rocket_learn.agent.discrete_policy import DiscretePolicy
-from rocket_learn.ppo import PPO
 from rocket_learn.rollout_generator.redis.redis_rollout_generator import RedisRolloutGenerator
 from rocket_learn.utils.stat_trackers.stat_tracker import StatTracker
-from rocket_learn.utils.util import SplitLayer
-from torch import Tensor
-from torch.nn import Linear, Sequential, Tanh
 
 import wandb
+from ingestion.rollout_ingestion import QUEUE_SIZE, RolloutIngestion
+from models.checkpoints import AsyncCheckpointPPO, CheckpointWriter
+from models.compact_publish import CompactPublisher
+from models.networks import create_networks
+from models.sb3_conversion import SB3_TO_ROCKET_LEARN, SB3_TO_SHARED_TRUNK, load_converted
 from obs.AstraObs import AstraObs
+from obs.delta_stream import install_learner_decoding
+from profiling.learner_profile import PROFILE_PATH, LearnerProfiler
+
+
+TRAINING_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "learner_config.json")
+
+# threads / interop_threads: torch intra-op and inter-op thread counts, None keeps the torch defaults
+# batch_size / minibatch_size / epochs / n_steps: PPO settings, see benchmarks/ppo_benchmark.py to pick them
+# shared_trunk: actor and critic sharing their first layers, see create_agent
+# iterations_per_save / keep_last / keep_every: checkpoints, the last keep_last and every keep_every-th save are kept
+# latest_interval: iterations between two saves of the <project>_latest checkpoint, 0 never saves it
+# profile_path: JSON lines file of the time per phase of each iteration, None to not write it
+# ingestion_processes / ingestion_queue: rollouts decoded in processes during the epochs, 0 decodes them in the loop
+# max_age: model versions a rollout can be behind the latest one and still be learned from, the rollouts ingested
+# during the epochs are a version behind when PPO takes them, so ingestion_processes needs max_age >= 1
+# publish_dtype / publish_delta / publish_keyframe_interval: models sent to the workers in fp16 or int8, deltas
+# between keyframes (see models/compact_publish.py), None sends them as pickled fp32 modules
+TrainingConfig = namedtuple("TrainingConfig", ["threads", "interop_threads", "n_steps", "batch_size",
+                                               "minibatch_size", "epochs", "device", "shared_trunk",
+                                               "iterations_per_save", "keep_last", "keep_every", "profile_path",
+                                               "ingestion_processes", "ingestion_queue", "publish_dtype",
+                                               "publish_delta", "publish_keyframe_interval", "latest_interval",
+                                               "max_age"],
+                            defaults=(None, None, 100_000, 50_000, 10_000, 10, "cpu", False, 100, 5, 10,
+                                      PROFILE_PATH, 0, QUEUE_SIZE, None, False, 10, 10, 0))
+
+
+def load_training_config(path: Optional[str] = TRAINING_CONFIG_PATH) -> TrainingConfig:
+    """
+    TrainingConfig of a JSON object of its fields, the missing ones keep their defaults
+    """
+    if path is None or not os.path.exists(path):
+        return TrainingConfig()
+
+    with open(path) as f:
+        values = json.load(f)
+
+    unknown = set(values) - set(TrainingConfig._fields)
+    if unknown:
+        raise ValueError(f"Unknown training settings {sorted(unknown)} in {path}")
+    return TrainingConfig(**values)
+
+
+def set_torch_threads(config: TrainingConfig):
+    if config.threads is not None:
+        torch.set_num_threads(config.threads)
+    if config.interop_threads is not None:
+        # Only possible before the first inter-op parallel work of the process
+        try:
+            torch.set_num_interop_threads(config.interop_threads)
+        except RuntimeError as e:
+            print_learner(f"Inter-op threads left to {torch.get_num_interop_threads()} : {e}")
+
+
+def build_reward(rewards, rewards_weights) -> SB3CombinedLogReward:
+    return SB3CombinedLogReward(
+        reward_functions=tuple(reward() for reward in rewards),
+        reward_weights=rewards_weights
+    )
 
 
 def print_learner(data):
@@ -27,94 +89,30 @@ def print_learner(data):
     print(data)
 
 
-def create_agent():
-    # ROCKET-LEARN EXPECTS A SET OF DISTRIBUTIONS FOR EACH ACTION FROM THE NETWORK, NOT
-    # THE ACTIONS THEMSELVES. SEE network_setup.readme.txt FOR MORE INFORMATION
-    split = (3, 3, 3, 3, 3, 2, 2, 2)
-    total_output = sum(split)
-
-    # TOTAL SIZE OF THE INPUT DATA
-    state_dim = 231
-
-    critic = Sequential(
-        Linear(state_dim, 512),
-        Tanh(),
-        Linear(512, 512),
-        Tanh(),
-        Linear(512, 256),
-        Tanh(),
-        Linear(256, 256),
-        Tanh(),
-        Linear(256, 256),
-        Tanh(),
-        Linear(256, 1)
-    )
+def create_agent(pretrained: bool = True, shared_trunk: bool = False):
+    """
+    :param pretrained: Loads the weights converted from exit_save/policy.pth, otherwise keeps the random init
+    :param shared_trunk: The actor and the critic share their first two layers
+    """
+    actor, critic = create_networks(shared_trunk)
 
-    actor = DiscretePolicy(Sequential(
-        Linear(state_dim, 512),
-        Tanh(),
-        Linear(512, 512),
-        Tanh(),
-        Linear(512, 256),
-        Tanh(),
-        Linear(256, 256),
-        Tanh(),
-        Linear(256, 256),
-        Tanh(),
-        Linear(256, total_output),
-        SplitLayer(splits=split)
-    ), split)
-
-    # CREATE THE OPTIMIZER
+    # CREATE THE OPTIMIZER, THE SHARED TRUNK ONLY IN THE ACTOR GROUP
+    actor_parameters = set(actor.parameters())
     optim = torch.optim.Adam([
         {"params": actor.parameters(), "lr": 5e-5},
-        {"params": critic.parameters(), "lr": 5e-5}
+        {"params": [parameter for parameter in critic.parameters() if parameter not in actor_parameters], "lr": 5e-5}
     ])
 
     # PPO REQUIRES AN ACTOR/CRITIC AGENT
     agent = ActorCriticAgent(actor=actor, critic=critic, optimizer=optim)
-    state_dict = agent.state_dict()
-
-    params: Tensor = torch.load("exit_save/policy.pth", map_location=torch.device("cpu"))
-
-    new_params = torch.cat((params["mlp_extractor.shared_net.0.weight"], torch.rand([512, 62]),
-                            params["mlp_extractor.shared_net.0.weight"][:, 76:107].repeat(1, 2)), dim=1)
-
-    state_dict["actor.net.0.weight"] = new_params
-    state_dict["critic.0.weight"] = new_params
-
-    state_dict["actor.net.0.bias"] = params["mlp_extractor.shared_net.0.bias"]
-    state_dict["critic.0.bias"] = params["mlp_extractor.shared_net.0.bias"]
-
-    state_dict["actor.net.2.weight"] = params["mlp_extractor.shared_net.2.weight"]
-    state_dict["critic.2.weight"] = params["mlp_extractor.shared_net.2.weight"]
-
-    state_dict["actor.net.2.bias"] = params["mlp_extractor.shared_net.2.bias"]
-    state_dict["critic.2.bias"] = params["mlp_extractor.shared_net.2.bias"]
-
-    state_dict["actor.net.4.weight"] = params["mlp_extractor.policy_net.0.weight"]
-    state_dict["critic.4.weight"] = params["mlp_extractor.value_net.0.weight"]
-
-    state_dict["actor.net.4.bias"] = params["mlp_extractor.policy_net.0.bias"]
-    state_dict["critic.4.bias"] = params["mlp_extractor.value_net.0.bias"]
+    if not pretrained:
+        return agent
 
-    state_dict["actor.net.6.weight"] = params["mlp_extractor.policy_net.2.weight"]
-    state_dict["critic.6.weight"] = params["mlp_extractor.value_net.2.weight"]
-
-    state_dict["actor.net.6.bias"] = params["mlp_extractor.policy_net.2.bias"]
-    state_dict["critic.6.bias"] = params["mlp_extractor.value_net.2.bias"]
-
-    state_dict["actor.net.8.weight"] = params["mlp_extractor.policy_net.4.weight"]
-    state_dict["critic.8.weight"] = params["mlp_extractor.value_net.4.weight"]
-
-    state_dict["actor.net.8.bias"] = params["mlp_extractor.policy_net.4.bias"]
-    state_dict["critic.8.bias"] = params["mlp_extractor.value_net.4.bias"]
-
-    state_dict["actor.net.10.weight"] = params["action_net.weight"]
-    state_dict["critic.10.weight"] = params["value_net.weight"]
+    state_dict = agent.state_dict()
 
-    state_dict["actor.net.10.bias"] = params["action_net.bias"]
-    state_dict["critic.10.bias"] = params["value_net.bias"]
+    # SB3 WEIGHTS CONVERTED ONCE, THEN LOADED FROM exit_save/converted
+    converter = SB3_TO_SHARED_TRUNK if shared_trunk else SB3_TO_ROCKET_LEARN
+    state_dict.update(load_converted("exit_save/policy.pth", converter))
 
     agent.load_state_dict(state_dict)
     return agent
@@ -127,12 +125,20 @@ class Learner:
             action_parser: Type[ActionParser],
             rewards: Union[Tuple[Type[RewardFunction]], List[Type[RewardFunction]]],
             rewards_weights: Union[Tuple[float], List[float]],
-            stats_trackers: Union[Tuple[StatTracker], List[StatTracker]]
+            stats_trackers: Union[Tuple[StatTracker], List[StatTracker]],
+            training: Optional[TrainingConfig] = None,
+            ui_pipe=None
     ):
+        """
+        :param training: Threads and PPO settings, read from learner_config.json when not given
+        :param ui_pipe: Receives the time per phase of each iteration, as lProfile messages
+        """
+        self.training = training if training is not None else load_training_config()
+        self.ui_pipe = ui_pipe
         self.stats_trackers = stats_trackers
         self.rewards_weights = rewards_weights
         self.rewards = rewards
-        self.agent = create_agent()
+        self.agent = create_agent(shared_trunk=self.training.shared_trunk)
 
         if len(rewards_weights) != len(rewards):
             raise Exception(
@@ -144,6 +150,9 @@ class Learner:
         self.obs_builder = obs_builder
 
     def run(self, logger_name, redis_logger_name: str = ""):
+        # Set in the learner process, the workers keep a single thread each
+        set_torch_threads(self.training)
+
         wandb.login(key=os.environ["WANDB_KEY"])
         logger = wandb.init(project="demo", entity="cryy_salt")
         logger.name = logger_name
@@ -153,47 +162,81 @@ class Learner:
 
         redis = Redis(host="127.0.0.1", password=os.environ["REDIS_PASSWORD"], username="test-bot", port=6379, db=5)
 
-        def obs():
-            return self.obs_builder()
-
-        def rew():
-            return SB3CombinedLogReward(
-                reward_functions=tuple(reward() for reward in self.rewards),
-                reward_weights=self.rewards_weights
-            )
+        # Picklable factories, the ingestion processes build their own
+        obs = self.obs_builder
+        rew = functools.partial(build_reward, self.rewards, self.rewards_weights)
+        act = self.action_parser
 
-        def act():
-            return self.action_parser()
+        # Workers can send delta encoded observations
+        install_learner_decoding()
 
+        # Past versions played by the workers
+        save_every = 100
         rollout_gen = RedisRolloutGenerator(redis_logger_name, redis, obs, rew, act,
                                             logger=logger,
-                                            save_every=100,
+                                            save_every=save_every,
                                             model_every=100,
+                                            max_age=self.training.max_age,
                                             stat_trackers=self.stats_trackers,
                                             clear=False)
 
-        # INSTANTIATE THE PPO TRAINING ALGORITHM
-        alg = PPO(
+        # MODELS SENT TO THE WORKERS IN A COMPACT FORMAT, THEY NEED compact_models
+        if self.training.publish_dtype is not None:
+            CompactPublisher(redis, dtype=self.training.publish_dtype, delta=self.training.publish_delta,
+                             keyframe_interval=self.training.publish_keyframe_interval,
+                             save_every=save_every).install(rollout_gen)
+
+        # ROLLOUTS PULLED AND DECODED DURING THE EPOCHS, SEE ingestion/rollout_ingestion.py
+        ingestion = None
+        if self.training.ingestion_processes > 0:
+            if self.training.max_age < 1:
+                print_learner("max_age is 0, the rollouts ingested during the epochs will be dropped as too old")
+            ingestion = RolloutIngestion(rollout_gen, processes=self.training.ingestion_processes,
+                                         queue_size=self.training.ingestion_queue,
+                                         initializer=install_learner_decoding)
+            ingestion.install()
+
+        # INSTANTIATE THE PPO TRAINING ALGORITHM, CHECKPOINTS ARE WRITTEN IN A THREAD
+        alg = AsyncCheckpointPPO(
             rollout_gen,
             self.agent,
             ent_coef=0.01,
-            n_steps=100_000,
-            batch_size=50_000,
-            minibatch_size=10_000,
-            epochs=10,
+            n_steps=self.training.n_steps,
+            batch_size=self.training.batch_size,
+            minibatch_size=self.training.minibatch_size,
+            epochs=self.training.epochs,
             gamma=599 / 600,
             clip_range=0.2,
             gae_lambda=0.95,
             vf_coef=1,
             max_grad_norm=0.5,
             logger=logger,
-            device="cpu",
+            device=self.training.device,
+            checkpoint_writer=CheckpointWriter(keep_last=self.training.keep_last,
+                                               keep_every=self.training.keep_every,
+                                               save_interval=self.training.iterations_per_save),
+            latest_interval=self.training.latest_interval,
         )
 
+        # TIME PER PHASE OF EACH ITERATION, TO THE PROFILE FILE AND THE UI
+        LearnerProfiler(self.training.profile_path, self.send_profile).install(alg)
+
         # BEGIN TRAINING. IT WILL CONTINUE UNTIL MANUALLY STOPPED
         # -iterations_per_save SPECIFIES HOW OFTEN CHECKPOINTS ARE SAVED
         # -save_dir SPECIFIES WHERE
-        alg.run(iterations_per_save=100, save_dir="checkpoint_save_directory")
+        try:
+            alg.run(iterations_per_save=self.training.iterations_per_save, save_dir="checkpoint_save_directory")
+        finally:
+            alg.checkpoint_writer.flush()
+            if ingestion is not None:
+                ingestion.close()
+
+    def send_profile(self, record: dict):
+        if self.ui_pipe:
+            self.ui_pipe.send({
+                "type": "lProfile",
+                "data": record
+            })
 
 
 class ExpandAdvancedObs(AstraObs):
@@ -201,6 +244,10 @@ class ExpandAdvancedObs(AstraObs):
         obs = super(ExpandAdvancedObs, self).build_obs(player, state, previous_action)
         return numpy.expand_dims(obs, 0)
 
+    def build_obs_batch(self, state: GameState, previous_actions: numpy.ndarray) -> numpy.ndarray:
+        obs = super(ExpandAdvancedObs, self).build_obs_batch(state, previous_actions)
+        return numpy.expand_dims(obs, 1)
+
 
 if __name__ == "__main__":
     print("We don't do that here, execute Astra.py file")
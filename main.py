@@ -28,6 +28,10 @@ class ExpandAdvancedObs(AstraObs):
         obs = super(ExpandAdvancedObs, self).build_obs(player, state, previous_action)
         return numpy.expand_dims(obs, 0)
 
+    def build_obs_batch(self, state: GameState, previous_actions: numpy.ndarray) -> numpy.ndarray:
+        obs = super(ExpandAdvancedObs, self).build_obs_batch(state, previous_actions)
+        return numpy.expand_dims(obs, 1)
+
 
 rewards = (
     AerialTouchReward(),
@@ -125,6 +129,10 @@ def handle_astra_communication():
             if data["type"] == "wOutput":
                 socketio.emit("wOutput", new_log=data["data"])
 
+            # Learner time per phase of an iteration
+            if data["type"] == "lProfile":
+                socketio.emit("lProfile", data["data"])
+
 
 @app.route("/logs", methods=["GET", "POST"])
 def logs():
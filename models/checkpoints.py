@@ -0,0 +1,182 @@
+"""
+Checkpoints of the learner written in the background.
+
+AsyncCheckpointPPO.save only copies the state dicts in memory, a thread writes them next to a temporary name and
+renames it, so a checkpoint file is always complete. The files and the folders are the ones of rocket_learn's
+PPO.save, PPO.load reads them as before. With save_actor_jit, a copy of the actor is traced to jit_policy.jit by the
+thread as well. After each write the old checkpoints are removed, the last keep_last ones and every keep_every-th save
+are kept.
+
+PPO.run also saves a <project>_latest checkpoint at every iteration, overwritten each time. Copying the whole model
+at every iteration is what the background writer avoids, so only every latest_interval-th of these saves is taken.
+
+The time the training loop waited in save is recorded (blocked), it only grows when a write is still running at the
+next save.
+"""
+import copy
+import os
+import re
+import shutil
+import time
+from queue import Queue
+from threading import Thread
+from typing import Optional
+
+import torch
+from rocket_learn.ppo import PPO
+
+CHECKPOINT_FILE = "checkpoint.pt"
+JIT_FILE = "jit_policy.jit"
+
+
+def snapshot(value):
+    """
+    Copy of the tensors of a (nested) state dict, on the CPU
+    """
+    if isinstance(value, torch.Tensor):
+        return value.detach().to("cpu", copy=True)
+    if isinstance(value, dict):
+        return {key: snapshot(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [snapshot(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(snapshot(item) for item in value)
+    return value
+
+
+class CheckpointWriter:
+    def __init__(self, keep_last: int = 5, keep_every: int = 10, save_interval: int = 100):
+        """
+        :param keep_last: Number of recent checkpoints kept
+        :param keep_every: Every keep_every-th save is kept for good, 0 keeps none of them
+        :param save_interval: Iterations between two saves, to number the saves from their iteration
+        """
+        self.keep_last = keep_last
+        self.keep_every = keep_every
+        self.save_interval = save_interval
+
+        # One checkpoint waiting while another one is written, at most
+        self.queue = Queue(maxsize=1)
+        # Seconds per save, waited by the training loop / spent writing
+        self.blocked = []
+        self.write_times = []
+
+        self.thread = Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, folder: str, step: int, checkpoint: dict, prune: bool = True, jit: Optional[tuple] = None):
+        """
+        :param jit: (actor, example input) traced and saved next to the checkpoint, copies the writer can use
+        """
+        self.queue.put((folder, step, checkpoint, prune, jit))
+
+    def flush(self):
+        """
+        Waits for the submitted checkpoints to be written
+        """
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            folder, step, checkpoint, prune, jit = self.queue.get()
+            try:
+                start = time.perf_counter()
+                self.write(folder, checkpoint)
+                if jit is not None:
+                    self.write_jit(folder, *jit)
+                self.write_times.append(time.perf_counter() - start)
+                if prune:
+                    self.prune(os.path.dirname(folder))
+            except Exception as e:
+                print(f"Checkpoint {step} not saved : {e}")
+            finally:
+                self.queue.task_done()
+
+    @staticmethod
+    def write(folder: str, checkpoint: dict):
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, CHECKPOINT_FILE)
+        temporary = f"{path}.tmp"
+        torch.save(checkpoint, temporary)
+        os.replace(temporary, path)
+
+    @staticmethod
+    def write_jit(folder: str, actor, example):
+        path = os.path.join(folder, JIT_FILE)
+        temporary = f"{path}.tmp"
+        torch.jit.save(torch.jit.trace(actor, example), temporary)
+        os.replace(temporary, path)
+
+    def kept(self, step: int) -> bool:
+        return self.keep_every > 0 and (step // self.save_interval) % self.keep_every == 0
+
+    def prune(self, save_location: str):
+        """
+        Removes the checkpoints of save_location that are neither recent nor a keep_every-th one
+        """
+        checkpoints = []
+        for name in os.listdir(save_location):
+            # Folders of PPO.save, <project>_<step>, never <project>_latest or the <project>_-1 inside it
+            match = re.fullmatch(r".*_(\d+)", name)
+            if match and os.path.exists(os.path.join(save_location, name, CHECKPOINT_FILE)):
+                checkpoints.append((int(match.group(1)), name))
+
+        checkpoints.sort()
+        old = checkpoints[:-self.keep_last] if self.keep_last > 0 else checkpoints
+        for step, name in old:
+            if not self.kept(step):
+                shutil.rmtree(os.path.join(save_location, name), ignore_errors=True)
+
+
+class AsyncCheckpointPPO(PPO):
+    """
+    PPO saving its checkpoints with a CheckpointWriter
+    """
+
+    def __init__(self, *args, checkpoint_writer: Optional[CheckpointWriter] = None, latest_interval: int = 10,
+                 **kwargs):
+        """
+        :param latest_interval: Iterations between two saves of the <project>_latest checkpoint, 0 never saves it
+        """
+        super().__init__(*args, **kwargs)
+        self.checkpoint_writer = checkpoint_writer if checkpoint_writer is not None else CheckpointWriter()
+        self.latest_interval = latest_interval
+        self._latest_calls = 0
+
+    @staticmethod
+    def is_latest(save_location, current_step) -> bool:
+        # PPO.run saves the latest checkpoint with step -1 in <save_dir>/<project>_latest
+        return current_step < 0 or os.path.basename(os.path.normpath(str(save_location))).endswith("_latest")
+
+    def save(self, save_location, current_step, save_actor_jit=False):
+        latest = self.is_latest(save_location, current_step)
+        if latest:
+            self._latest_calls += 1
+            if self.latest_interval <= 0 or (self._latest_calls - 1) % self.latest_interval != 0:
+                return
+
+        start = time.perf_counter()
+
+        # Same folder and content as PPO.save
+        folder = os.path.join(save_location, str(self.logger.project) + "_" + str(current_step))
+        checkpoint = snapshot({
+            "epoch": current_step,
+            "total_steps": self.total_steps,
+            "actor_state_dict": self.agent.actor.state_dict(),
+            "critic_state_dict": self.agent.critic.state_dict(),
+            "optimizer_state_dict": self.agent.optimizer.state_dict(),
+        })
+
+        # Traced in the writer thread, from a copy the optimizer doesn't update
+        jit = None
+        if save_actor_jit:
+            jit = (copy.deepcopy(self.agent.actor).to("cpu"), snapshot(self.jit_tracer))
+
+        self.checkpoint_writer.submit(folder, current_step, checkpoint, prune=not latest, jit=jit)
+
+        blocked = time.perf_counter() - start
+        self.checkpoint_writer.blocked.append(blocked)
+        stats = {"checkpoint/blocked_ms": blocked * 1000}
+        if self.checkpoint_writer.write_times:
+            stats["checkpoint/write_ms"] = self.checkpoint_writer.write_times[-1] * 1000
+        self.logger.log(stats, commit=False)
@@ -0,0 +1,289 @@
+"""
+Compact format of the models the learner publishes to the workers.
+
+rocket_learn publishes the actor as a pickled fp32 module, in Redis and in the SQLite cache of every worker.
+The compact format only holds the actor weights, in fp16 or int8 (one scale per tensor), the workers rebuild the
+actor with models/networks.py. Every keyframe_interval-th publish is a keyframe, the others can be deltas against
+it: the difference with the keyframe as the workers rebuild it, so quantization errors don't add up over versions.
+
+rocket_learn keeps every save_every-th published model as a past version the workers play against, these publishes
+are always keyframes. Only the latest model can then be a delta, the Redis hash of keyframes only holds the current
+one.
+
+    MAGIC | header length (4 bytes) | header (JSON) | body (zlib)
+
+The header lists the tensors (name, shape, scale) and the sha256 of the body, checked before decoding. Payloads
+without the magic are plain rocket_learn models, the workers decode both.
+"""
+import functools
+import hashlib
+import json
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+import torch
+from redis import Redis
+
+from models.networks import create_networks
+from models.shared_trunk import SharedTrunk
+
+MAGIC = b"ASTRA-CM"
+FORMAT_VERSION = 1
+KEYFRAMES_KEY = "compact-model-keyframes"
+
+DTYPES = {
+    "fp16": np.float16,
+    "int8": np.int8,
+}
+
+
+def encode_tensor(values: np.ndarray, dtype: str):
+    """
+    Bytes and scale of a tensor, the scale is None in fp16
+    """
+    if dtype == "fp16":
+        return values.astype(np.float16).tobytes(), None
+
+    largest = float(np.abs(values).max()) if values.size else 0.0
+    scale = largest / 127 if largest > 0 else 1.0
+    return np.clip(np.round(values / scale), -127, 127).astype(np.int8).tobytes(), scale
+
+
+def decode_tensor(data: bytes, shape, dtype: str, scale: Optional[float]) -> np.ndarray:
+    values = np.frombuffer(data, dtype=DTYPES[dtype]).astype(np.float32).reshape(shape)
+    return values * scale if scale is not None else values
+
+
+def encode_payload(state_dict: Dict[str, np.ndarray], dtype: str, architecture: dict,
+                   base: Optional[str] = None, actor_type: Optional[str] = None) -> bytes:
+    """
+    :param base: Checksum of the keyframe the values are a difference with, None for a keyframe
+    :param actor_type: Class of the published actor, the workers check they rebuild the same one
+    """
+    tensors = []
+    parts = []
+    for name, values in state_dict.items():
+        data, scale = encode_tensor(values, dtype)
+        tensors.append([name, list(values.shape), scale])
+        parts.append(data)
+
+    body = zlib.compress(b"".join(parts), 1)
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "dtype": dtype,
+        "architecture": architecture,
+        "actor": actor_type,
+        "base": base,
+        "tensors": tensors,
+        "checksum": hashlib.sha256(body).hexdigest(),
+    }).encode()
+
+    return MAGIC + struct.pack("<I", len(header)) + header + body
+
+
+def is_compact(payload: bytes) -> bool:
+    return payload[:len(MAGIC)] == MAGIC
+
+
+def read_payload(payload: bytes):
+    """
+    Header and state dict of a payload, a delta is returned as such
+    """
+    start = len(MAGIC)
+    (length,) = struct.unpack("<I", payload[start:start + 4])
+    header = json.loads(payload[start + 4:start + 4 + length])
+    body = payload[start + 4 + length:]
+
+    if header["format"] != FORMAT_VERSION:
+        raise ValueError(f"Compact model format {header['format']}, expected {FORMAT_VERSION}")
+    if hashlib.sha256(body).hexdigest() != header["checksum"]:
+        raise ValueError(f"Corrupted compact model {header['checksum'][:12]}")
+
+    data = zlib.decompress(body)
+    itemsize = np.dtype(DTYPES[header["dtype"]]).itemsize
+    state_dict = {}
+    offset = 0
+    for name, shape, scale in header["tensors"]:
+        size = int(np.prod(shape)) * itemsize
+        state_dict[name] = decode_tensor(data[offset:offset + size], shape, header["dtype"], scale)
+        offset += size
+
+    return header, state_dict
+
+
+def architecture_of(actor: torch.nn.Module) -> dict:
+    return {"shared_trunk": any(isinstance(module, SharedTrunk) for module in actor.modules())}
+
+
+def type_name(value) -> str:
+    return f"{type(value).__module__}.{type(value).__qualname__}"
+
+
+class CompactPublisher:
+    def __init__(self, redis: Redis, dtype: str = "fp16", delta: bool = False, keyframe_interval: int = 10,
+                 save_every: int = 100):
+        """
+        :param dtype: fp16 or int8
+        :param delta: Publishes the versions between two keyframes as differences with the last keyframe
+        :param keyframe_interval: Publishes between two keyframes, with delta
+        :param save_every: save_every of the RedisRolloutGenerator, its saved versions are keyframes
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown compact model dtype {dtype}, expected one of {list(DTYPES)}")
+
+        self.redis = redis
+        self.dtype = dtype
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.save_every = save_every
+
+        self.published = 0
+        # Keyframe as the workers rebuild it, and its checksum
+        self._keyframe = None
+        self._keyframe_checksum = None
+
+        # The running update_parameters saves the model as a past version
+        self.saving = False
+        self._updates = 0
+
+    def encode(self, actor: torch.nn.Module) -> bytes:
+        state_dict = OrderedDict((name, tensor.detach().cpu().float().numpy())
+                                 for name, tensor in actor.state_dict().items())
+        architecture = architecture_of(actor)
+        actor_type = type_name(actor)
+
+        keyframe = not self.delta or self.saving or self._keyframe is None or \
+            self.published % self.keyframe_interval == 0
+        self.published += 1
+
+        if keyframe:
+            payload = encode_payload(state_dict, self.dtype, architecture, actor_type=actor_type)
+            header, self._keyframe = read_payload(payload)
+            if self.delta:
+                # The saved versions are keyframes, no other payload needs the previous one (or those of a
+                # previous run)
+                if self._keyframe_checksum is None:
+                    self.redis.delete(KEYFRAMES_KEY)
+                self.redis.hset(KEYFRAMES_KEY, header["checksum"], payload)
+                if self._keyframe_checksum not in (None, header["checksum"]):
+                    self.redis.hdel(KEYFRAMES_KEY, self._keyframe_checksum)
+            self._keyframe_checksum = header["checksum"]
+            return payload
+
+        difference = OrderedDict((name, values - self._keyframe[name]) for name, values in state_dict.items())
+        return encode_payload(difference, self.dtype, architecture, base=self._keyframe_checksum,
+                              actor_type=actor_type)
+
+    def update_count(self) -> int:
+        """
+        Updates of the rollout generator before the running one, from its counter in Redis when there is one
+        """
+        from rocket_learn.rollout_generator.redis import utils
+
+        counter = getattr(utils, "N_UPDATES", None)
+        count = self.redis.get(counter) if counter is not None else None
+        return int(count) if count is not None else self._updates
+
+    def install(self, rollout_generator=None):
+        """
+        Makes RedisRolloutGenerator publish compact models, the workers must call CompactModelDecoder.install
+
+        :param rollout_generator: Needed with delta, the models it saves as past versions are published as keyframes
+        """
+        from rocket_learn.rollout_generator.redis import redis_rollout_generator, utils
+
+        if self.delta:
+            if rollout_generator is None:
+                raise ValueError("Delta compact models need the rollout generator, its saved versions are keyframes")
+            self._install_saving(rollout_generator)
+
+        for module in (redis_rollout_generator, utils):
+            serialize_model = getattr(module, "_serialize_model", None)
+            if serialize_model is None or getattr(serialize_model, "compact", False):
+                continue
+
+            def compact_serialize_model(mdl, *args, **kwargs):
+                return self.encode(mdl)
+
+            compact_serialize_model.compact = True
+            module._serialize_model = compact_serialize_model
+
+    def _install_saving(self, rollout_generator):
+        update_parameters = rollout_generator.update_parameters
+        if getattr(update_parameters, "compact", False):
+            return
+
+        @functools.wraps(update_parameters)
+        def saving_update_parameters(*args, **kwargs):
+            # rocket_learn saves the model when the count before the update is a multiple of save_every
+            self.saving = self.update_count() % self.save_every == 0
+            self._updates += 1
+            try:
+                return update_parameters(*args, **kwargs)
+            finally:
+                self.saving = False
+
+        saving_update_parameters.compact = True
+        rollout_generator.update_parameters = saving_update_parameters
+
+
+class CompactModelDecoder:
+    def __init__(self, redis: Redis, cache_size: int = 4):
+        """
+        :param cache_size: Keyframes kept rebuilt in memory
+        """
+        self.redis = redis
+        self.cache_size = cache_size
+        self._keyframes = OrderedDict()
+
+    def keyframe(self, checksum: str) -> Dict[str, np.ndarray]:
+        if checksum in self._keyframes:
+            self._keyframes.move_to_end(checksum)
+            return self._keyframes[checksum]
+
+        payload = self.redis.hget(KEYFRAMES_KEY, checksum)
+        if payload is None:
+            raise KeyError(f"Keyframe {checksum[:12]} of a compact model is not in Redis")
+        _, state_dict = read_payload(payload)
+
+        self._keyframes[checksum] = state_dict
+        if len(self._keyframes) > self.cache_size:
+            self._keyframes.popitem(last=False)
+        return state_dict
+
+    def decode(self, payload: bytes) -> torch.nn.Module:
+        header, state_dict = read_payload(payload)
+        if header["base"] is not None:
+            keyframe = self.keyframe(header["base"])
+            state_dict = {name: keyframe[name] + values for name, values in state_dict.items()}
+
+        actor, _ = create_networks(**header["architecture"])
+        # _unserialize_model must give the worker the same object as the pickled actor
+        if header.get("actor") is not None and type_name(actor) != header["actor"]:
+            raise TypeError(f"Compact model of a {header['actor']}, models/networks.py builds a {type_name(actor)}")
+        actor.load_state_dict({name: torch.from_numpy(np.ascontiguousarray(values))
+                               for name, values in state_dict.items()})
+        return actor.eval()
+
+    def install(self):
+        """
+        Makes RedisRolloutWorker decode compact models, the other ones go through unchanged.
+        Call it before models.frozen_actor.install_worker_inference so the rebuilt actors are frozen.
+        """
+        from rocket_learn.rollout_generator.redis import redis_rollout_worker, utils
+
+        for module in (redis_rollout_worker, utils):
+            unserialize_model = getattr(module, "_unserialize_model", None)
+            if unserialize_model is None or getattr(unserialize_model, "compact", False):
+                continue
+
+            def compact_unserialize_model(buf, *args, _unserialize_model=unserialize_model, **kwargs):
+                if is_compact(buf):
+                    return self.decode(buf)
+                return _unserialize_model(buf, *args, **kwargs)
+
+            compact_unserialize_model.compact = True
+            module._unserialize_model = compact_unserialize_model
@@ -0,0 +1,111 @@
+"""
+Inference only actor for the rollout workers.
+
+freeze_policy traces the network of a DiscretePolicy (the Linear/Tanh stack and the SplitLayer heads) and freezes it:
+the weights become constants of the graph, nothing is recorded for autograd, and with the oneDNN fuser each Linear is
+fused with the Tanh after it. The policy keeps its methods (distribution, sampling, log probs), only its net changes,
+so rocket_learn uses it like the eager one.
+
+install_worker_inference makes RedisRolloutWorker freeze every model it receives from the learner.
+"""
+import copy
+from typing import Iterable
+
+import torch
+from torch import nn
+
+FROZEN_BATCH = 6
+
+
+class FrozenNet(nn.Module):
+    """
+    Runs a frozen TorchScript module without autograd
+    """
+
+    def __init__(self, scripted: torch.jit.ScriptModule):
+        super().__init__()
+        self.scripted = scripted
+
+    def forward(self, obs):
+        with torch.no_grad():
+            return self.scripted(obs)
+
+
+def freeze_net(net: nn.Module, input_size: int, example_batch: int = FROZEN_BATCH,
+               fuse: bool = True) -> torch.jit.ScriptModule:
+    net = copy.deepcopy(net).eval()
+    for parameter in net.parameters():
+        parameter.requires_grad_(False)
+
+    if fuse:
+        # Linear + Tanh fusion, needs a traced and frozen graph
+        torch.jit.enable_onednn_fusion(True)
+
+    example = torch.zeros([example_batch, input_size])
+    with torch.no_grad():
+        traced = torch.jit.trace(net, example)
+    frozen = torch.jit.freeze(traced)
+
+    # The fuser specializes the graph over the first calls
+    with torch.no_grad():
+        for _ in range(3):
+            frozen(example)
+
+    return frozen
+
+
+def freeze_policy(policy: nn.Module, input_size: int = None, example_batch: int = FROZEN_BATCH,
+                  fuse: bool = True) -> nn.Module:
+    """
+    Copy of a DiscretePolicy with a frozen net
+
+    :param input_size: Observation size, the in_features of the first Linear when not given
+    """
+    if input_size is None:
+        input_size = next(module.in_features for module in policy.net.modules() if isinstance(module, nn.Linear))
+
+    frozen = copy.copy(policy)
+    # Own module dict so the eager policy keeps its net
+    frozen._modules = dict(policy._modules)
+    frozen.net = FrozenNet(freeze_net(policy.net, input_size, example_batch, fuse))
+    return frozen
+
+
+def max_difference(policy: nn.Module, frozen: nn.Module, input_size: int, batch_sizes: Iterable[int] = range(1, 7),
+                   samples: int = 100, seed: int = 0) -> float:
+    """
+    Largest difference between the logits of the eager and frozen policies on random observations
+    """
+    generator = torch.Generator().manual_seed(seed)
+    difference = 0.0
+
+    with torch.no_grad():
+        for batch_size in batch_sizes:
+            for _ in range(samples):
+                obs = torch.randn([batch_size, input_size], generator=generator)
+                expected = policy.get_action_distribution(obs).logits
+                logits = frozen.get_action_distribution(obs).logits
+                finite = torch.isfinite(expected)
+                if not torch.equal(finite, torch.isfinite(logits)):
+                    return float("inf")
+                difference = max(difference, float((logits[finite] - expected[finite]).abs().max()))
+
+    return difference
+
+
+def install_worker_inference(example_batch: int = FROZEN_BATCH, fuse: bool = True):
+    """
+    Makes RedisRolloutWorker freeze the models it loads, the latest one and the past versions it plays against
+    """
+    from rocket_learn.rollout_generator.redis import redis_rollout_worker, utils
+
+    for module in (redis_rollout_worker, utils):
+        unserialize_model = getattr(module, "_unserialize_model", None)
+        if unserialize_model is None or getattr(unserialize_model, "frozen", False):
+            continue
+
+        def frozen_unserialize_model(*args, _unserialize_model=unserialize_model, **kwargs):
+            return freeze_policy(_unserialize_model(*args, **kwargs), example_batch=example_batch, fuse=fuse)
+
+        frozen_unserialize_model.frozen = True
+        module._unserialize_model = frozen_unserialize_model
@@ -0,0 +1,89 @@
+"""
+Networks of the agent, built by the learner (learner.create_agent) and by the workers rebuilding a published actor.
+"""
+from typing import Tuple
+
+from rocket_learn.agent.discrete_policy import DiscretePolicy
+from rocket_learn.utils.util import SplitLayer
+from torch.nn import Linear, Sequential, Tanh
+
+from models.shared_trunk import SharedTrunk
+from obs.layout import ASTRA_LAYOUT
+
+
+def create_networks(shared_trunk: bool = False) -> Tuple[DiscretePolicy, Sequential]:
+    """
+    Actor and critic
+
+    :param shared_trunk: The actor and the critic share their first two layers
+    """
+    # ROCKET-LEARN EXPECTS A SET OF DISTRIBUTIONS FOR EACH ACTION FROM THE NETWORK, NOT
+    # THE ACTIONS THEMSELVES. SEE network_setup.readme.txt FOR MORE INFORMATION
+    split = (3, 3, 3, 3, 3, 2, 2, 2)
+    total_output = sum(split)
+
+    # TOTAL SIZE OF THE INPUT DATA
+    state_dim = ASTRA_LAYOUT.size
+
+    if shared_trunk:
+        # FIRST TWO LAYERS COMPUTED ONCE FOR BOTH NETWORKS, SEE models/shared_trunk.py
+        trunk = SharedTrunk(Sequential(
+            Linear(state_dim, 512),
+            Tanh(),
+            Linear(512, 512),
+            Tanh()
+        ))
+
+        critic = Sequential(
+            trunk,
+            Linear(512, 256),
+            Tanh(),
+            Linear(256, 256),
+            Tanh(),
+            Linear(256, 256),
+            Tanh(),
+            Linear(256, 1)
+        )
+
+        actor = DiscretePolicy(Sequential(
+            trunk,
+            Linear(512, 256),
+            Tanh(),
+            Linear(256, 256),
+            Tanh(),
+            Linear(256, 256),
+            Tanh(),
+            Linear(256, total_output),
+            SplitLayer(splits=split)
+        ), split)
+    else:
+        critic = Sequential(
+            Linear(state_dim, 512),
+            Tanh(),
+            Linear(512, 512),
+            Tanh(),
+            Linear(512, 256),
+            Tanh(),
+            Linear(256, 256),
+            Tanh(),
+            Linear(256, 256),
+            Tanh(),
+            Linear(256, 1)
+        )
+
+        actor = DiscretePolicy(Sequential(
+            Linear(state_dim, 512),
+            Tanh(),
+            Linear(512, 512),
+            Tanh(),
+            Linear(512, 256),
+            Tanh(),
+            Linear(256, 256),
+            Tanh(),
+            Linear(256, 256),
+            Tanh(),
+            Linear(256, total_output),
+            SplitLayer(splits=split)
+        ), split)
+
+    return actor, critic
@@ -0,0 +1,189 @@
+"""
+Conversion of the Stable Baselines 3 policy of exit_save to the rocket_learn agent of learner.py.
+
+The mapping is data: the tensors copied as they are, and the input layers assembled column by column because the
+observation grew from the 1v1 obs (107 values) to the 3v3 AstraObs. The random columns come from a seeded generator
+so a conversion always gives the same weights.
+
+The converted state dict is cached next to the source, the cache file name holds a hash of the source file and of the
+conversion, so a new policy or a new mapping gives a new file. Cached files are memory-mapped when torch supports it.
+"""
+import hashlib
+import json
+import os
+from collections import namedtuple
+from typing import Dict, Optional, Sequence, Tuple
+
+import torch
+from torch import Tensor
+
+# Bump when convert changes in a way the mapping doesn't show
+CONVERSION_VERSION = 1
+CACHE_DIRECTORY = os.path.join("exit_save", "converted")
+
+# Columns start:stop of a source weight, repeat times
+SourceColumns = namedtuple("SourceColumns", ["key", "start", "stop", "repeat"], defaults=(1,))
+# Uniform [0, 1) columns
+RandomColumns = namedtuple("RandomColumns", ["width"])
+
+# Source key -> target keys
+Copies = Sequence[Tuple[str, Sequence[str]]]
+# Target keys -> columns they are built from, in order
+Inputs = Sequence[Tuple[Sequence[str], Sequence]]
+
+
+class StateDictConverter:
+    def __init__(self, copies: Copies, inputs: Inputs = (), seed: int = 0):
+        """
+        :param copies: (source key, target keys) of the tensors copied as they are
+        :param inputs: (target keys, columns) of the weights assembled from SourceColumns and RandomColumns
+        :param seed: Seed of the random columns
+        """
+        self.copies = copies
+        self.inputs = inputs
+        self.seed = seed
+
+    def convert(self, params: Dict[str, Tensor]) -> Dict[str, Tensor]:
+        generator = torch.Generator().manual_seed(self.seed)
+        state_dict = {}
+
+        for targets, columns in self.inputs:
+            parts = []
+            for column in columns:
+                if isinstance(column, RandomColumns):
+                    rows = params[self._source_of(columns)].shape[0]
+                    parts.append(torch.rand([rows, column.width], generator=generator))
+                else:
+                    parts.append(params[column.key][:, column.start:column.stop].repeat(1, column.repeat))
+
+            weight = torch.cat(parts, dim=1)
+            for target in targets:
+                state_dict[target] = weight
+
+        for source, targets in self.copies:
+            for target in targets:
+                state_dict[target] = params[source]
+
+        return state_dict
+
+    @staticmethod
+    def _source_of(columns) -> str:
+        # The random columns have as many rows as the source weight they pad
+        return next(column.key for column in columns if isinstance(column, SourceColumns))
+
+    def fingerprint(self) -> str:
+        return json.dumps({
+            "version": CONVERSION_VERSION,
+            "copies": [[source, list(targets)] for source, targets in self.copies],
+            "inputs": [[list(targets), [[type(column).__name__] + list(column) for column in columns]]
+                       for targets, columns in self.inputs],
+            "seed": self.seed,
+        }, sort_keys=True)
+
+
+def file_hash(path: str, extra: str = "") -> str:
+    digest = hashlib.sha256(extra.encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_state_dict(path: str) -> Dict[str, Tensor]:
+    """
+    Memory-mapped torch.load, plain torch.load on versions without mmap (before 2.1)
+    """
+    try:
+        return torch.load(path, map_location=torch.device("cpu"), mmap=True, weights_only=True)
+    except TypeError:
+        return torch.load(path, map_location=torch.device("cpu"))
+
+
+def load_converted(source: str, converter: StateDictConverter,
+                   cache_directory: Optional[str] = CACHE_DIRECTORY) -> Dict[str, Tensor]:
+    """
+    Converted state dict of source, from the cache when this source was already converted this way
+    """
+    if cache_directory is None:
+        return converter.convert(torch.load(source, map_location=torch.device("cpu")))
+
+    name = os.path.splitext(os.path.basename(source))[0]
+    path = os.path.join(cache_directory, f"{name}-{file_hash(source, converter.fingerprint())[:16]}.pt")
+    if os.path.exists(path):
+        return load_state_dict(path)
+
+    state_dict = converter.convert(torch.load(source, map_location=torch.device("cpu")))
+
+    # Written aside and renamed, a learner starting meanwhile never reads half a file
+    os.makedirs(cache_directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    torch.save(state_dict, temporary)
+    os.replace(temporary, path)
+
+    return state_dict
+
+
+_SHARED_WEIGHT = "mlp_extractor.shared_net.0.weight"
+
+# The first layer keeps the 1v1 columns (ball, previous action, pads, player and the opponent block), pads 62 columns
+# at random and repeats the opponent block twice
+_SB3_INPUT_COLUMNS = (
+    SourceColumns(_SHARED_WEIGHT, 0, 107),
+    RandomColumns(62),
+    SourceColumns(_SHARED_WEIGHT, 76, 107, repeat=2),
+)
+
+# exit_save/policy.pth to the agent of learner.create_agent
+SB3_TO_ROCKET_LEARN = StateDictConverter(
+    copies=(
+        ("mlp_extractor.shared_net.0.bias", ("actor.net.0.bias", "critic.0.bias")),
+        ("mlp_extractor.shared_net.2.weight", ("actor.net.2.weight", "critic.2.weight")),
+        ("mlp_extractor.shared_net.2.bias", ("actor.net.2.bias", "critic.2.bias")),
+        ("mlp_extractor.policy_net.0.weight", ("actor.net.4.weight",)),
+        ("mlp_extractor.policy_net.0.bias", ("actor.net.4.bias",)),
+        ("mlp_extractor.policy_net.2.weight", ("actor.net.6.weight",)),
+        ("mlp_extractor.policy_net.2.bias", ("actor.net.6.bias",)),
+        ("mlp_extractor.policy_net.4.weight", ("actor.net.8.weight",)),
+        ("mlp_extractor.policy_net.4.bias", ("actor.net.8.bias",)),
+        ("mlp_extractor.value_net.0.weight", ("critic.4.weight",)),
+        ("mlp_extractor.value_net.0.bias", ("critic.4.bias",)),
+        ("mlp_extractor.value_net.2.weight", ("critic.6.weight",)),
+        ("mlp_extractor.value_net.2.bias", ("critic.6.bias",)),
+        ("mlp_extractor.value_net.4.weight", ("critic.8.weight",)),
+        ("mlp_extractor.value_net.4.bias", ("critic.8.bias",)),
+        ("action_net.weight", ("actor.net.10.weight",)),
+        ("action_net.bias", ("actor.net.10.bias",)),
+        ("value_net.weight", ("critic.10.weight",)),
+        ("value_net.bias", ("critic.10.bias",)),
+    ),
+    inputs=(
+        (("actor.net.0.weight", "critic.0.weight"), _SB3_INPUT_COLUMNS),
+    ),
+)
+
+
+def _linear(source: str, *targets: str) -> Copies:
+    return tuple((f"{source}.{name}", tuple(f"{target}.{name}" for target in targets)) for name in ("weight", "bias"))
+
+
+# The trunk is registered in both networks, its weights are loaded under both names
+_TRUNK = ("actor.net.0.net", "critic.0.net")
+
+# exit_save/policy.pth to the agent of learner.create_agent(shared_trunk=True), shared_net is the trunk
+SB3_TO_SHARED_TRUNK = StateDictConverter(
+    copies=(
+        (("mlp_extractor.shared_net.0.bias", tuple(f"{trunk}.0.bias" for trunk in _TRUNK)),) +
+        _linear("mlp_extractor.shared_net.2", *(f"{trunk}.2" for trunk in _TRUNK)) +
+        _linear("mlp_extractor.policy_net.0", "actor.net.1") +
+        _linear("mlp_extractor.policy_net.2", "actor.net.3") +
+        _linear("mlp_extractor.policy_net.4", "actor.net.5") +
+        _linear("action_net", "actor.net.7") +
+        _linear("mlp_extractor.value_net.0", "critic.1") +
+        _linear("mlp_extractor.value_net.2", "critic.3") +
+        _linear("mlp_extractor.value_net.4", "critic.5") +
+        _linear("value_net", "critic.7")
+    ),
+    inputs=(
+        (tuple(f"{trunk}.0.weight" for trunk in _TRUNK), _SB3_INPUT_COLUMNS),
+    ),
+)
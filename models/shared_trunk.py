@@ -0,0 +1,40 @@
+"""
+First layers shared by the actor and the critic.
+
+The trunk is a module of both networks, PPO calls the actor then the critic on the same observation tensor, the
+trunk keeps its last output and the critic reuses it instead of computing the two biggest layers again. Gradients of
+both losses flow through the same output, a single backward pass goes through the trunk once.
+"""
+import torch
+from torch import nn
+
+
+class SharedTrunk(nn.Module):
+    def __init__(self, net: nn.Module):
+        super().__init__()
+        self.net = net
+        self._input = None
+        self._key = None
+        self._output = None
+
+    def _cache_key(self, obs: torch.Tensor) -> tuple:
+        # In place changes of the observation or of the weights (optimizer steps) bump their versions
+        weights = tuple(parameter._version for parameter in self.net.parameters())
+        return (obs._version, torch.is_grad_enabled()) + weights
+
+    def forward(self, obs: torch.Tensor) -> torch.Tensor:
+        key = self._cache_key(obs)
+        if obs is self._input and key == self._key:
+            return self._output
+
+        output = self.net(obs)
+        self._input = obs
+        self._key = key
+        self._output = output
+        return output
+
+    def __getstate__(self):
+        # Pickled and copied without the last batch, the actor sent to the workers doesn't carry it
+        state = self.__dict__.copy()
+        state.update(_input=None, _key=None, _output=None)
+        return state
@@ -5,146 +5,416 @@ import rlgym.utils.common_values as constants
 from rlgym.utils.gamestates import GameState, PlayerData
 from rlgym.utils.obs_builders import AdvancedObs
 
+from obs.layout import ASTRA_LAYOUT, OTHER_PLAYER_LAYOUT, PLAYER_LAYOUT, ObsLayout, astra_layout
+
+
+def update_timers_reference(pads: np.ndarray, boosts_state: np.ndarray, boosts_timers: np.ndarray,
+                            boosts_location: np.ndarray, time_interval: float):
+    """
+    Loop implementation of the boost pads timers, AstraObs._update_timers must give the same timers.
+    Updates boosts_state and boosts_timers (in seconds) in place.
+    """
+    for i, av in enumerate(pads):
+        # Unchanged state, basically just update the timer
+        if av == boosts_state[i]:
+            if av == 0:
+                boosts_timers[i] = max(0, boosts_timers[i] - time_interval)
+
+        else:
+            if av == 0:
+                # Big pads
+                if boosts_location[i][2] == AstraObs.BIG_PAD_Z:
+                    boosts_timers[i] = AstraObs.BIG_PAD_RESPAWN
+                # Small pads
+                else:
+                    boosts_timers[i] = AstraObs.SMALL_PAD_RESPAWN
+            else:
+                boosts_timers[i] = 0
+
+    boosts_state[:] = pads
+
+
+# Terms of rlgym.utils.math.quat_to_rot_mtx, row-major: theta[r, c] is 2s * (q[a] * q[b] + sign * q[c] * q[d]),
+# or 1 - that on the diagonal, with q = -quat in (w, x, y, z) order
+_ROT_TERMS = np.array([
+    # a, b, sign, c, d
+    (2, 2, 1, 3, 3),  # [0, 0] front  1 - 2s(yy + zz)
+    (1, 2, -1, 3, 0),  # [0, 1] left   2s(xy - zw)
+    (1, 3, 1, 2, 0),  # [0, 2] up     2s(xz + yw)
+    (1, 2, 1, 3, 0),  # [1, 0] front  2s(xy + zw)
+    (1, 1, 1, 3, 3),  # [1, 1] left   1 - 2s(xx + zz)
+    (2, 3, -1, 1, 0),  # [1, 2] up     2s(yz - xw)
+    (1, 3, -1, 2, 0),  # [2, 0] front  2s(xz - yw)
+    (2, 3, 1, 1, 0),  # [2, 1] left   2s(yz + xw)
+    (1, 1, 1, 2, 2),  # [2, 2] up     1 - 2s(xx + yy)
+])
+_ROT_DIAGONAL = np.eye(3, dtype=bool).ravel()
+
+
+def quat_to_rot_mtx_batch(quats: np.ndarray) -> np.ndarray:
+    """
+    rlgym.utils.math.quat_to_rot_mtx over a (n, 4) array of quaternions, same operations so same floats
+    """
+    q = -quats
+    products = q[:, :, np.newaxis] * q[:, np.newaxis, :]
+
+    # Stacked matmul does one dot per quaternion, like np.dot(quat, quat)
+    norm = np.matmul(quats[:, np.newaxis, :], quats[:, :, np.newaxis])[:, 0, 0]
+    valid = norm != 0
+    s = np.divide(1.0, norm, out=np.zeros_like(norm), where=valid)
+
+    a, b, sign, c, d = _ROT_TERMS.T
+    terms = (2.0 * s)[:, np.newaxis] * (products[:, a, b] + sign.astype(q.dtype) * products[:, c, d])
+    theta = np.where(_ROT_DIAGONAL, 1.0 - terms, terms)
+    theta[~valid] = 0
+
+    return theta.reshape(-1, 3, 3)
+
 
 class AstraObs(AdvancedObs):
 
     BOOST_STD = 10
 
-    def __init__(self, team_size=3, tick_skip: int = 8):
+    BIG_PAD_Z = 73
+    BIG_PAD_RESPAWN = 10
+    SMALL_PAD_RESPAWN = 4
+
+    # Observation layout, see obs/layout.py
+    BALL_POSITION = ASTRA_LAYOUT.slice_of("ball", "position")
+    BALL_LINEAR_VELOCITY = ASTRA_LAYOUT.slice_of("ball", "linear_velocity")
+    BALL_ANGULAR_VELOCITY = ASTRA_LAYOUT.slice_of("ball", "angular_velocity")
+    PREVIOUS_ACTION = ASTRA_LAYOUT["previous_action"]
+    PADS = ASTRA_LAYOUT["pads"]
+    PLAYER = ASTRA_LAYOUT["player"]
+    OTHERS_START = ASTRA_LAYOUT["allies"].start
+
+    # Player block layout
+    REL_POS_TO_BALL = PLAYER_LAYOUT["rel_pos_to_ball"]
+    REL_VEL_TO_BALL = PLAYER_LAYOUT["rel_vel_to_ball"]
+    POSITION = PLAYER_LAYOUT["position"]
+    FORWARD = PLAYER_LAYOUT["forward"]
+    UP = PLAYER_LAYOUT["up"]
+    LINEAR_VELOCITY = PLAYER_LAYOUT["linear_velocity"]
+    ANGULAR_VELOCITY = PLAYER_LAYOUT["angular_velocity"]
+    BOOST_AMOUNT = PLAYER_LAYOUT["boost_amount"].start
+    ON_GROUND = PLAYER_LAYOUT["on_ground"].start
+    HAS_FLIP = PLAYER_LAYOUT["has_flip"].start
+    DEMOED = PLAYER_LAYOUT["demoed"].start
+    PLAYER_LENGTH = PLAYER_LAYOUT.size
+
+    # Extra info of the other players' blocks, relative to the observing player
+    REL_POS_TO_PLAYER = OTHER_PLAYER_LAYOUT["rel_pos_to_player"]
+    REL_VEL_TO_PLAYER = OTHER_PLAYER_LAYOUT["rel_vel_to_player"]
+    OTHER_PLAYER_LENGTH = OTHER_PLAYER_LAYOUT.size
+
+    # Raw car values of the per-step physics cache, same order as in the player block
+    CAR_PHYSICS = slice(POSITION.start, ANGULAR_VELOCITY.stop)
+    PLAYER_INFO = slice(BOOST_AMOUNT, PLAYER_LENGTH)
+    PHYSICS_POSITION = slice(0, 3)
+    PHYSICS_LINEAR_VELOCITY = slice(9, 12)
+
+    # The orange frame is the blue one rotated by 180 degrees around z
+    MIRROR = np.array([-1, -1, 1])
+
+    def __init__(self, team_size=3, tick_skip: int = 8, copy_obs: bool = True, include_timers: bool = False,
+                 dtype=np.float32, mirror_frames: bool = False):
+        """
+        :param mirror_frames: Only compute the blue frame physics and get the orange frame by flipping x and y,
+        instead of reading the inverted data of the state. Same values up to float rounding, see
+        tests/test_astra_obs.py.
+        :param dtype: Type of the observations, float64 gives the exact values of the rlgym AdvancedObs formulas.
+        :param include_timers: Append the boost pads timers section after the players (34 more values).
+        :param copy_obs: Return a fresh copy of the observation. When False, the returned arrays are the builder's
+        own buffers and get overwritten by the next step, only use it if the observations are consumed right away
+        (rollout workers keep references to every observation of the episode).
+        """
         super().__init__()
         self.nb_players = team_size * 2  # 2 teams
         self.tick_skip = tick_skip
         self.time_interval = self.tick_skip / 120  # Running at 120fps
-
-        # Timers start at 10 (refresh time) and end up at 0
+        self.copy_obs = copy_obs
+        self.include_timers = include_timers
+        self.dtype = np.dtype(dtype)
+        self.mirror_frames = mirror_frames
+
+        self.layout = astra_layout(team_size, include_timers)
+        self.obs_length = self.layout.size
+        # One row per player slot, padding is never written and stays at 0
+        self.obs_buffers = np.zeros((self.nb_players, self.obs_length), dtype=self.dtype)
+        self._slots = {}
+
+        # Per-step physics cache, index 0 is the normal frame and 1 the mirrored (orange) frame
+        # balls_physics (2, 9): position, linear velocity, angular velocity
+        # cars_physics (2, n, 15): position, forward, up, linear velocity, angular velocity
+        # players_info (n, 4): boost amount, on ground, has flip, demo'd
+        self.balls_physics = np.zeros((2, 9), dtype=self.dtype)
+        self.cars_physics = np.zeros((2, 0, 15), dtype=self.dtype)
+        self.players_info = np.zeros((0, 4), dtype=self.dtype)
+
+        # Per-value normalization of the ball and player blocks, divided in place once the block is written
+        self._ball_std = np.array([self.POS_STD] * 6 + [self.ANG_STD] * 3, dtype=self.dtype)
+        self._player_std = np.array([self.POS_STD] * 9 + [1] * 6 + [self.POS_STD] * 3 + [self.ANG_STD] * 3 +
+                                    [1] * 4 + [self.POS_STD] * 6, dtype=self.dtype)
+        self._ball_mirror = np.tile(self.MIRROR, 3).astype(self.dtype)
+        self._car_mirror = np.tile(self.MIRROR, 5).astype(self.dtype)
+
+        # Timers start at the pad respawn time (in seconds) and end up at 0
+        self.boosts_location = np.array(constants.BOOST_LOCATIONS)
+        self.boosts_respawn = np.where(self.boosts_location[:, 2] == self.BIG_PAD_Z,
+                                       self.BIG_PAD_RESPAWN, self.SMALL_PAD_RESPAWN).astype(float)
         self.boosts_timers = np.zeros(len(constants.BOOST_LOCATIONS))
         self.boosts_state = np.zeros(len(constants.BOOST_LOCATIONS))
-        self.boosts_location = np.array(constants.BOOST_LOCATIONS)
+        # What goes in the obs, timers / BOOST_STD
+        self.normalized_boosts_timers = np.zeros(len(constants.BOOST_LOCATIONS), dtype=self.dtype)
+
+        # Views, the arrays above are only ever updated in place
         self.inverted_boosts_state = self.boosts_state[::-1]
-        self.inverted_boosts_timers = self.boosts_timers[::-1]
+        self.inverted_boosts_timers = self.normalized_boosts_timers[::-1]
 
     def pre_step(self, state: GameState):
+        self._slots = {player.car_id: i for i, player in enumerate(state.players)}
+        self._ensure_buffers(len(state.players))
+        self._update_physics_cache(state)
+
         # Boost timer
         self._update_timers(state)
-        self.boosts_timers /= self.BOOST_STD
-        self.inverted_boosts_timers /= self.BOOST_STD
+        np.divide(self.boosts_timers, self.BOOST_STD, out=self.normalized_boosts_timers)
 
     def build_obs(self, player: PlayerData, state: GameState, previous_action: np.ndarray) -> Any:
 
         if player.team_num == constants.ORANGE_TEAM:
-            inverted = True
-            ball = state.inverted_ball
-            pads = state.inverted_boost_pads
+            frame = 1
+            pads = state.boost_pads[::-1] if self.mirror_frames else state.inverted_boost_pads
         else:
-            inverted = False
-            ball = state.ball
+            frame = 0
             pads = state.boost_pads
 
-        obs = [ball.position / self.POS_STD,
-               ball.linear_velocity / self.POS_STD,
-               ball.angular_velocity / self.ANG_STD,
-               previous_action,
-               pads]
+        if player.car_id not in self._slots:
+            self._slots = {p.car_id: i for i, p in enumerate(state.players)}
+            self._ensure_buffers(len(state.players))
+            self._update_physics_cache(state)
+
+        index = self._slots[player.car_id]
+        obs = self.obs_buffers[index]
+
+        obs[self.BALL_POSITION.start:self.BALL_ANGULAR_VELOCITY.stop] = self.balls_physics[frame]
+        obs[self.BALL_POSITION.start:self.BALL_ANGULAR_VELOCITY.stop] /= self._ball_std
+        obs[self.PREVIOUS_ACTION] = previous_action
+        obs[self.PADS] = pads
 
-        player_car = self._add_player_to_obs(obs, player, ball, inverted)
+        player_obs = obs[self.PLAYER]
+        self._write_player_to_obs(player_obs, frame, index)
+        player_obs /= self._player_std[:self.PLAYER_LENGTH]
 
         allies = []
         enemies = []
 
-        for other in state.players:
+        for other_index, other in enumerate(state.players):
             if other.car_id == player.car_id:
                 continue
 
             if other.team_num == player.team_num:
-                team_obs = allies
-
+                allies.append(other_index)
             else:
-                team_obs = enemies
+                enemies.append(other_index)
 
-            other_car = self._add_player_to_obs(team_obs, other, ball, inverted)
+        cars = self.cars_physics[frame]
+        start = self.OTHERS_START
 
-            # Extra info
-            team_obs.extend([
-                (other_car.position - player_car.position) / self.POS_STD,
-                (other_car.linear_velocity - player_car.linear_velocity) / self.POS_STD
-            ])
+        for other_index in allies + enemies:
+            other_obs = obs[start:start + self.OTHER_PLAYER_LENGTH]
+            self._write_player_to_obs(other_obs, frame, other_index)
 
-        obs.extend(allies)
-        obs.extend(enemies)
-        base_obs = np.concatenate(obs)
+            # Extra info
+            np.subtract(cars[other_index, self.PHYSICS_POSITION], cars[index, self.PHYSICS_POSITION],
+                        out=other_obs[self.REL_POS_TO_PLAYER])
+            np.subtract(cars[other_index, self.PHYSICS_LINEAR_VELOCITY], cars[index, self.PHYSICS_LINEAR_VELOCITY],
+                        out=other_obs[self.REL_VEL_TO_PLAYER])
+            other_obs /= self._player_std
 
-        # Populate with players
-        missed_players = self.nb_players - len(state.players)
+            start += self.OTHER_PLAYER_LENGTH
 
-        for i in range(missed_players):
-            base_obs = self.create_dummy_players(base_obs)
+        # Missing players
+        obs[start:self._others_stop] = 0
 
-        if player.team_num == constants.ORANGE_TEAM:
-            timers = self.inverted_boosts_timers
+        if self.include_timers:
+            if player.team_num == constants.ORANGE_TEAM:
+                obs[self._others_stop:] = self.inverted_boosts_timers
+            else:
+                obs[self._others_stop:] = self.normalized_boosts_timers
+
+        return obs.copy() if self.copy_obs else obs
+
+    def build_obs_batch(self, state: GameState, previous_actions: np.ndarray) -> np.ndarray:
+        """
+        Builds the observations of every player at once, row i being equal to
+        build_obs(state.players[i], state, previous_actions[i]).
+        Each car block is computed once per team perspective, then gathered into the rows.
+        """
+        players = state.players
+        nb_cars = len(players)
+        self._ensure_buffers(nb_cars)
+
+        if self.cars_physics.shape[1] != nb_cars:
+            self._update_physics_cache(state)
+
+        teams = np.array([p.team_num for p in players])
+        perspective = (teams == constants.ORANGE_TEAM).astype(int)
+
+        # Both frames at once, [frame, i] is car i's block and [frame, i, j] car j relative to car i
+        balls = self.balls_physics
+        cars = self.cars_physics
+        car_blocks = np.empty((2, nb_cars, self.PLAYER_LENGTH), dtype=self.dtype)
+        car_blocks[:, :, self.REL_POS_TO_BALL] = (balls[:, np.newaxis, self.BALL_POSITION] -
+                                                  cars[:, :, self.PHYSICS_POSITION])
+        car_blocks[:, :, self.REL_VEL_TO_BALL] = (balls[:, np.newaxis, self.BALL_LINEAR_VELOCITY] -
+                                                  cars[:, :, self.PHYSICS_LINEAR_VELOCITY])
+        car_blocks[:, :, self.CAR_PHYSICS] = cars
+        car_blocks[:, :, self.PLAYER_INFO] = self.players_info
+        car_blocks /= self._player_std[:self.PLAYER_LENGTH]
+
+        position = cars[:, :, self.PHYSICS_POSITION]
+        linear_velocity = cars[:, :, self.PHYSICS_LINEAR_VELOCITY]
+        rel_pos = (position[:, np.newaxis, :, :] - position[:, :, np.newaxis, :]) / self.POS_STD
+        rel_vel = (linear_velocity[:, np.newaxis, :, :] - linear_velocity[:, :, np.newaxis, :]) / self.POS_STD
+
+        pads = np.stack((state.boost_pads,
+                         state.boost_pads[::-1] if self.mirror_frames else state.inverted_boost_pads))
+
+        # Allies first then enemies, both in state.players order, self excluded
+        index = np.arange(nb_cars)
+        order_key = (teams[np.newaxis, :] != teams[:, np.newaxis]) * nb_cars + index[np.newaxis, :]
+        order_key[index, index] = 2 * nb_cars
+        others = np.argsort(order_key, axis=1, kind="stable")[:, :nb_cars - 1]
+
+        obs = self.obs_buffers[:nb_cars]
+        obs[:, self.BALL_POSITION.start:self.BALL_ANGULAR_VELOCITY.stop] = (balls / self._ball_std)[perspective]
+        obs[:, self.PREVIOUS_ACTION] = np.asarray(previous_actions)[:nb_cars]
+        obs[:, self.PADS] = pads[perspective]
+        obs[:, self.PLAYER] = car_blocks[perspective, index]
+
+        others_end = self.OTHERS_START + self.OTHER_PLAYER_LENGTH * (nb_cars - 1)
+        others_obs = obs[:, self.OTHERS_START:others_end].reshape(nb_cars, nb_cars - 1, self.OTHER_PLAYER_LENGTH)
+        frame = perspective[:, np.newaxis]
+        observer = index[:, np.newaxis]
+        others_obs[:, :, :self.PLAYER_LENGTH] = car_blocks[frame, others]
+        others_obs[:, :, self.REL_POS_TO_PLAYER] = rel_pos[frame, observer, others]
+        others_obs[:, :, self.REL_VEL_TO_PLAYER] = rel_vel[frame, observer, others]
+
+        # Missing players
+        obs[:, others_end:self._others_stop] = 0
+
+        if self.include_timers:
+            obs[:, self._others_stop:] = np.stack((self.normalized_boosts_timers,
+                                                   self.inverted_boosts_timers))[perspective]
+
+        return obs.copy() if self.copy_obs else obs
+
+    @property
+    def _others_stop(self):
+        if self.include_timers:
+            return self.obs_length - len(constants.BOOST_LOCATIONS)
+        return self.obs_length
+
+    def _ensure_buffers(self, nb_cars: int):
+        if nb_cars > len(self.obs_buffers):
+            self.obs_length += self.OTHER_PLAYER_LENGTH * (nb_cars - len(self.obs_buffers))
+            self.obs_buffers = np.zeros((nb_cars, self.obs_length), dtype=self.dtype)
+
+    def _update_physics_cache(self, state: GameState):
+        players = state.players
+        nb_cars = len(players)
+        # Number of frames read from the state, the orange one is derived from the blue one when mirroring
+        nb_frames = 1 if self.mirror_frames else 2
+
+        balls = (state.ball,) if self.mirror_frames else (state.ball, state.inverted_ball)
+        self.balls_physics = np.empty((2, 9), dtype=self.dtype)
+        self.balls_physics[:nb_frames] = [
+            np.concatenate((ball.position, ball.linear_velocity, ball.angular_velocity)) for ball in balls
+        ]
+
+        self.players_info = np.array([[player.boost_amount,
+                                       int(player.on_ground),
+                                       int(player.has_flip),
+                                       int(player.is_demoed)] for player in players],
+                                     dtype=self.dtype).reshape(nb_cars, 4)
+
+        if nb_cars == 0:
+            self.cars_physics = np.zeros((2, 0, 15), dtype=self.dtype)
         else:
-            timers = self.boosts_timers
-
-        # base_obs = np.concatenate((base_obs, timers))
-        # print(f" ========= Player team : {player.team_num} | Car id {player.car_id} ========= ")
-        # AstraObs.print_obs(base_obs)
-        return base_obs
+            # Normal frame cars then mirrored frame cars, all rotations computed in one go
+            cars = [player.car_data for player in players]
+            if not self.mirror_frames:
+                cars += [player.inverted_car_data for player in players]
+            raw = np.concatenate([
+                array for car in cars
+                for array in (car.position, car.linear_velocity, car.angular_velocity, car.quaternion)
+            ]).reshape(nb_frames * nb_cars, 13)
+            rotations = quat_to_rot_mtx_batch(raw[:, 9:13])
+
+            physics = np.empty((2 * nb_cars, 15), dtype=self.dtype)
+            physics[:nb_frames * nb_cars, 0:3] = raw[:, 0:3]
+            physics[:nb_frames * nb_cars, 3:6] = rotations[:, :, 0]
+            physics[:nb_frames * nb_cars, 6:9] = rotations[:, :, 2]
+            physics[:nb_frames * nb_cars, 9:15] = raw[:, 3:9]
+            self.cars_physics = physics.reshape(2, nb_cars, 15)
+
+        if self.mirror_frames:
+            # Every cached value is a vector (or an axial vector for the angular velocities)
+            np.multiply(self.balls_physics[0], self._ball_mirror, out=self.balls_physics[1])
+            np.multiply(self.cars_physics[0], self._car_mirror, out=self.cars_physics[1])
+
+    def _write_player_to_obs(self, obs: np.ndarray, frame: int, index: int):
+        # Raw values from the physics cache, the caller normalizes the whole block at once with _player_std
+        ball = self.balls_physics[frame]
+        car = self.cars_physics[frame, index]
+
+        np.subtract(ball[self.BALL_POSITION], car[self.PHYSICS_POSITION], out=obs[self.REL_POS_TO_BALL])
+        np.subtract(ball[self.BALL_LINEAR_VELOCITY], car[self.PHYSICS_LINEAR_VELOCITY], out=obs[self.REL_VEL_TO_BALL])
+        obs[self.CAR_PHYSICS] = car
+        obs[self.PLAYER_INFO] = self.players_info[index]
 
     @staticmethod
-    def print_obs(obs):
+    def print_obs(obs, layout: ObsLayout = ASTRA_LAYOUT):
+        if len(obs) != layout.size and "timers" not in layout:
+            # Same team size with the timers section
+            layout = ObsLayout(layout.sections + [("timers", len(constants.BOOST_LOCATIONS))])
+        view = layout.view(obs)
+
         print(f"Obs length : {len(obs)}")
-        print(f"Ball position :         {obs[0:3]}")
-        print(f"Ball linear velocity :  {obs[3:6]}")
-        print(f"Ball angular velocity : {obs[6:9]}")
-        print(f"Previous action :       {obs[9:17]}")
-        print(f"Pads :                  {obs[17:51]}")
+        print(f"Ball position :         {view['ball']['position']}")
+        print(f"Ball linear velocity :  {view['ball']['linear_velocity']}")
+        print(f"Ball angular velocity : {view['ball']['angular_velocity']}")
+        print(f"Previous action :       {view['previous_action']}")
+        print(f"Pads :                  {view['pads']}")
         print(f"The players : ")
-        AstraObs.print_player_obs(obs[51:76])
-
-        # for i in range(5):
-        #     AstraObs.print_player_obs(obs[76 + i * 31: (76 + 31) + i * 31])
-
-        print(f"Pads timer : {obs[231:265]}")
+        AstraObs.print_player_obs(obs[layout["player"]])
 
+        if "timers" in layout:
+            print(f"Pads timer : {view['timers']}")
 
     @staticmethod
     def print_player_obs(obs):
-        print(f"Relative pos to ball :  {obs[0:3]}")
-        print(f"Relative vel to ball :  {obs[3:6]}")
-        print(f"Position :              {obs[6:9]}")
-        print(f"Forward :               {obs[9:12]}")
-        print(f"Up :                    {obs[12:15]}")
-        print(f"Linear velocity :       {obs[15:18]}")
-        print(f"Angular velocity :      {obs[18:21]}")
-        print(f"Boost amount :          {obs[21]}")
-        print(f"On ground :             {bool(obs[22])}")
-        print(f"Has flip :              {bool(obs[23])}")
-        print(f"Demo'd :                {bool(obs[24])}")
+        print(f"Relative pos to ball :  {obs[AstraObs.REL_POS_TO_BALL]}")
+        print(f"Relative vel to ball :  {obs[AstraObs.REL_VEL_TO_BALL]}")
+        print(f"Position :              {obs[AstraObs.POSITION]}")
+        print(f"Forward :               {obs[AstraObs.FORWARD]}")
+        print(f"Up :                    {obs[AstraObs.UP]}")
+        print(f"Linear velocity :       {obs[AstraObs.LINEAR_VELOCITY]}")
+        print(f"Angular velocity :      {obs[AstraObs.ANGULAR_VELOCITY]}")
+        print(f"Boost amount :          {obs[AstraObs.BOOST_AMOUNT]}")
+        print(f"On ground :             {bool(obs[AstraObs.ON_GROUND])}")
+        print(f"Has flip :              {bool(obs[AstraObs.HAS_FLIP])}")
+        print(f"Demo'd :                {bool(obs[AstraObs.DEMOED])}")
 
     def _update_timers(self, state: GameState):
         pads = state.boost_pads
-        locs = self.boosts_location
-
-        for i, av in enumerate(pads):
-            # Unchanged state, basically just update the timer
-            if av == self.boosts_state[i]:
-                if av == 0:
-                    self.boosts_timers[i] = max(0, self.boosts_timers[i] - self.time_interval)
-
-            else:
-                self.boosts_state[i] = int(not bool(av))
-                if av == 0:
-                    # Big pads
-                    if locs[i][2] == 73:
-                        self.boosts_timers[i] = 10
-                    # Small pads
-                    else:
-                        self.boosts_timers[i] = 4
-                else:
-                    self.boosts_timers[i] = 0
-
-        self.boosts_state = pads
-        self.inverted_boosts_timers = self.boosts_timers[::-1]
-        self.inverted_boosts_state = self.boosts_state[::-1]
-
-    def create_dummy_players(self, base_obs):
-        return np.concatenate((base_obs, [0] * 31))
+        taken = pads == 0
+        changed = pads != self.boosts_state
+
+        # Just taken: respawn time, available: 0, still taken: count down
+        self.boosts_timers[:] = np.where(changed,
+                                         np.where(taken, self.boosts_respawn, 0),
+                                         np.where(taken, np.maximum(self.boosts_timers - self.time_interval, 0),
+                                                  self.boosts_timers))
+        self.boosts_state[:] = pads
@@ -2,15 +2,22 @@ import math
 import numpy as np
 from typing import Any, List
 from rlgym_compat import common_values
-from rlgym_compat import PlayerData, GameState, PhysicsObject
+from rlgym_compat import PlayerData, GameState
 
 
 class AdvancedObs:
     POS_STD = 2300
     ANG_STD = math.pi
 
-    def __init__(self):
+    def __init__(self, dtype=np.float32):
         super().__init__()
+        self.dtype = np.dtype(dtype)
+        # Constants in the obs dtype, the values read from the state are cast before any arithmetic
+        self._pos_std = self.dtype.type(self.POS_STD)
+        self._ang_std = self.dtype.type(self.ANG_STD)
+
+    def _cast(self, values) -> np.ndarray:
+        return np.asarray(values, dtype=self.dtype)
 
     def reset(self, initial_state: GameState):
         pass
@@ -26,13 +33,16 @@ class AdvancedObs:
             ball = state.ball
             pads = state.boost_pads
 
-        obs = [ball.position / self.POS_STD,
-               ball.linear_velocity / self.POS_STD,
-               ball.angular_velocity / self.ANG_STD,
-               previous_action,
-               pads]
+        ball_position = self._cast(ball.position)
+        ball_linear_velocity = self._cast(ball.linear_velocity)
+        obs = [ball_position / self._pos_std,
+               ball_linear_velocity / self._pos_std,
+               self._cast(ball.angular_velocity) / self._ang_std,
+               self._cast(previous_action),
+               self._cast(pads)]
 
-        player_car = self._add_player_to_obs(obs, player, ball, inverted)
+        position, linear_velocity = self._add_player_to_obs(obs, player, ball_position, ball_linear_velocity,
+                                                            inverted)
 
         allies = []
         enemies = []
@@ -47,12 +57,13 @@ class AdvancedObs:
                 team_obs = enemies
                 stop = True
 
-                other_car = self._add_player_to_obs(team_obs, other, ball, inverted)
+                other_position, other_linear_velocity = self._add_player_to_obs(team_obs, other, ball_position,
+                                                                                ball_linear_velocity, inverted)
 
                 # Extra info
                 team_obs.extend([
-                    (other_car.position - player_car.position) / self.POS_STD,
-                    (other_car.linear_velocity - player_car.linear_velocity) / self.POS_STD
+                    (other_position - position) / self._pos_std,
+                    (other_linear_velocity - linear_velocity) / self._pos_std
                 ])
 
             if stop:
@@ -62,26 +73,33 @@ class AdvancedObs:
         obs.extend(enemies)
         return np.concatenate(obs)
 
-    def _add_player_to_obs(self, obs: List, player: PlayerData, ball: PhysicsObject, inverted: bool):
+    def _add_player_to_obs(self, obs: List, player: PlayerData, ball_position: np.ndarray,
+                           ball_linear_velocity: np.ndarray, inverted: bool):
+        """
+        Adds the player block to obs, returns the position and linear velocity of the car in the obs dtype
+        """
         if inverted:
             player_car = player.inverted_car_data
         else:
             player_car = player.car_data
 
-        rel_pos = ball.position - player_car.position
-        rel_vel = ball.linear_velocity - player_car.linear_velocity
+        position = self._cast(player_car.position)
+        linear_velocity = self._cast(player_car.linear_velocity)
+
+        rel_pos = ball_position - position
+        rel_vel = ball_linear_velocity - linear_velocity
 
         obs.extend([
-            rel_pos / self.POS_STD,
-            rel_vel / self.POS_STD,
-            player_car.position / self.POS_STD,
-            player_car.forward(),
-            player_car.up(),
-            player_car.linear_velocity / self.POS_STD,
-            player_car.angular_velocity / self.ANG_STD,
-            [player.boost_amount,
-             int(player.on_ground),
-             int(player.has_flip),
-             int(player.is_demoed)]])
-
-        return player_car
+            rel_pos / self._pos_std,
+            rel_vel / self._pos_std,
+            position / self._pos_std,
+            self._cast(player_car.forward()),
+            self._cast(player_car.up()),
+            linear_velocity / self._pos_std,
+            self._cast(player_car.angular_velocity) / self._ang_std,
+            self._cast([player.boost_amount,
+                        int(player.on_ground),
+                        int(player.has_flip),
+                        int(player.is_demoed)])])
+
+        return position, linear_velocity
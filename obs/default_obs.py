@@ -8,8 +8,15 @@ class DefaultObs:
     POS_STD = 2300
     ANG_STD = math.pi
 
-    def __init__(self):
+    def __init__(self, dtype=np.float32):
         super().__init__()
+        self.dtype = np.dtype(dtype)
+        # Constants in the obs dtype, the values read from the state are cast before any arithmetic
+        self._pos_std = self.dtype.type(self.POS_STD)
+        self._ang_std = self.dtype.type(self.ANG_STD)
+
+    def _cast(self, values) -> np.ndarray:
+        return np.asarray(values, dtype=self.dtype)
 
     def reset(self, initial_state: GameState):
         pass
@@ -25,16 +32,16 @@ class DefaultObs:
 
         ob = []
 
-        ob.append(ball.position / self.POS_STD)
-        ob.append(ball.linear_velocity / self.POS_STD)
-        ob.append(ball.angular_velocity / self.ANG_STD)
+        ob.append(self._cast(ball.position) / self._pos_std)
+        ob.append(self._cast(ball.linear_velocity) / self._pos_std)
+        ob.append(self._cast(ball.angular_velocity) / self._ang_std)
 
-        ob.append(player_car.position / self.POS_STD)
-        ob.append(player_car.linear_velocity / self.POS_STD)
-        ob.append(player_car.angular_velocity / self.ANG_STD)
-        ob.append([player.boost_amount,
-                   int(player.has_flip),
-                   int(player.on_ground)])
+        ob.append(self._cast(player_car.position) / self._pos_std)
+        ob.append(self._cast(player_car.linear_velocity) / self._pos_std)
+        ob.append(self._cast(player_car.angular_velocity) / self._ang_std)
+        ob.append(self._cast([player.boost_amount,
+                              int(player.has_flip),
+                              int(player.on_ground)]))
 
         for other in players:
             if other.car_id == player.car_id:
@@ -45,8 +52,8 @@ class DefaultObs:
             else:
                 car_data = other.car_data
 
-            ob.append(car_data.position / self.POS_STD)
-            ob.append(car_data.linear_velocity / self.POS_STD)
-            ob.append(car_data.angular_velocity / self.ANG_STD)
+            ob.append(self._cast(car_data.position) / self._pos_std)
+            ob.append(self._cast(car_data.linear_velocity) / self._pos_std)
+            ob.append(self._cast(car_data.angular_velocity) / self._ang_std)
             
         return np.concatenate(ob)
@@ -0,0 +1,165 @@
+"""
+Delta encoding of the observations sent by the rollout workers (send_obs=True).
+
+Each player's episode is split in sections following the obs layout (ball, previous action, pads, player and
+one block per other player, timers). Keyframes hold every section, the other steps only the sections that
+changed since the previous step, the learner forward-fills the rest. Pads, previous actions and the padding
+of missing players rarely change between steps.
+
+The encoded streams are plain dicts of numpy arrays so they go through the rocket_learn msgpack serialization.
+"""
+import inspect
+from typing import List, Sequence
+
+import numpy as np
+
+from obs.layout import ASTRA_LAYOUT, ObsLayout
+
+STREAM_KEY = "delta_obs"
+STREAM_VERSION = 1
+KEYFRAME_INTERVAL = 64
+
+
+def section_bounds(layout: ObsLayout, width: int) -> np.ndarray:
+    """
+    Stops of the sections of an observation row, one per repeated block
+    """
+    if width < layout.size:
+        return np.array([width])
+
+    stops = []
+    for name, content, count in layout.sections:
+        section = layout[name]
+        length = (section.stop - section.start) // max(count, 1)
+        stops += [section.start + length * (i + 1) for i in range(count)]
+
+    # Extra players if the builder grew its buffers
+    if width > layout.size:
+        stops.append(width)
+
+    return np.array(stops)
+
+
+def encode_obs_stream(observations: Sequence[np.ndarray], layout: ObsLayout = ASTRA_LAYOUT,
+                      keyframe_interval: int = KEYFRAME_INTERVAL) -> dict:
+    """
+    Encodes the observations of one player's episode, every obs must have the same shape
+    """
+    dense = np.asarray(observations)
+    steps = len(dense)
+    obs_shape = dense.shape[1:]
+    dense = dense.reshape(steps, int(np.prod(obs_shape)))
+
+    stops = section_bounds(layout, dense.shape[1])
+    starts = np.concatenate(([0], stops[:-1]))
+    lengths = stops - starts
+
+    changed = np.ones((steps, len(stops)), dtype=bool)
+    if steps > 1:
+        different = dense[1:] != dense[:-1]
+        # A section changed if any of its values did
+        changed[1:] = np.logical_or.reduceat(different, starts, axis=1)
+        changed[::keyframe_interval] = True
+
+    values = dense[np.repeat(changed, lengths, axis=1)]
+
+    return {
+        STREAM_KEY: STREAM_VERSION,
+        "shape": list(obs_shape),
+        "steps": steps,
+        "stops": stops,
+        "changed": np.packbits(changed, axis=None),
+        "values": values,
+    }
+
+
+def decode_obs_stream(encoded: dict) -> np.ndarray:
+    """
+    Dense (steps, *obs shape) array of an encoded stream
+    """
+    steps = encoded["steps"]
+    stops = np.asarray(encoded["stops"])
+    values = np.asarray(encoded["values"])
+    width = int(stops[-1]) if len(stops) else 0
+
+    starts = np.concatenate(([0], stops[:-1]))
+    lengths = stops - starts
+    changed = np.unpackbits(np.asarray(encoded["changed"]), count=steps * len(stops)).astype(bool)
+    changed = changed.reshape(steps, len(stops))
+
+    dense = np.zeros((steps, width), dtype=values.dtype)
+    dense[np.repeat(changed, lengths, axis=1)] = values
+
+    # Forward-fill the sections that did not change from the last step that sent them
+    step_index = np.arange(steps)
+    for i, (start, stop) in enumerate(zip(starts, stops)):
+        sent = np.maximum.accumulate(np.where(changed[:, i], step_index, 0))
+        dense[:, start:stop] = dense[sent, start:stop]
+
+    return dense.reshape([steps] + list(encoded["shape"]))
+
+
+def is_obs_stream(item) -> bool:
+    return isinstance(item, dict) and STREAM_KEY in item
+
+
+def encode_players_obs(observations: List[Sequence[np.ndarray]], layout: ObsLayout = ASTRA_LAYOUT,
+                       keyframe_interval: int = KEYFRAME_INTERVAL) -> list:
+    return [encode_obs_stream(player_obs, layout, keyframe_interval) if len(player_obs) > 0 else player_obs
+            for player_obs in observations]
+
+
+def decode_players_obs(observations: list) -> list:
+    return [list(decode_obs_stream(player_obs)) if is_obs_stream(player_obs) else player_obs
+            for player_obs in observations]
+
+
+def install_worker_encoding(layout: ObsLayout = ASTRA_LAYOUT, keyframe_interval: int = KEYFRAME_INTERVAL):
+    """
+    Makes RedisRolloutWorker send delta encoded observations, the learner must call install_learner_decoding
+    """
+    from rocket_learn.rollout_generator.redis import redis_rollout_worker
+
+    encode_buffers = redis_rollout_worker.encode_buffers
+    if getattr(encode_buffers, "delta_obs", False):
+        return
+
+    signature = inspect.signature(encode_buffers)
+    if not {"return_obs", "return_states"} <= set(signature.parameters):
+        raise TypeError(f"encode_buffers{signature} of this rocket_learn has no return_obs / return_states, "
+                        f"the delta encoding can't find the observations")
+
+    def delta_encode_buffers(*args, **kwargs):
+        encoded = encode_buffers(*args, **kwargs)
+
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        if arguments.arguments.get("return_obs", False):
+            # Same order as encode_buffers: states, obs, rewards, ...
+            index = 1 if arguments.arguments.get("return_states", False) else 0
+            encoded[index] = encode_players_obs(encoded[index], layout, keyframe_interval)
+
+        return encoded
+
+    delta_encode_buffers.delta_obs = True
+    redis_rollout_worker.encode_buffers = delta_encode_buffers
+
+
+def install_learner_decoding():
+    """
+    Makes RedisRolloutGenerator decode the delta encoded observations, plain rollouts go through unchanged
+    """
+    from rocket_learn.rollout_generator.redis import redis_rollout_generator, utils
+
+    for module in (redis_rollout_generator, utils):
+        decode_buffers = getattr(module, "decode_buffers", None)
+        if decode_buffers is None or getattr(decode_buffers, "delta_obs", False):
+            continue
+
+        def delta_decode_buffers(enc_buffers, *args, _decode_buffers=decode_buffers, **kwargs):
+            enc_buffers = [decode_players_obs(item) if isinstance(item, list) and any(map(is_obs_stream, item))
+                           else item for item in enc_buffers]
+            return _decode_buffers(enc_buffers, *args, **kwargs)
+
+        delta_decode_buffers.delta_obs = True
+        module.decode_buffers = delta_decode_buffers
@@ -0,0 +1,150 @@
+"""
+Observation layouts, each section is declared once here. Offsets, the network input size and the
+structured views over stored observations are all derived from these declarations.
+"""
+from collections import namedtuple
+from typing import List
+
+import numpy as np
+import rlgym.utils.common_values as constants
+
+# content is either a number of values or a sub layout, count is how many times it is repeated
+ObsSection = namedtuple("ObsSection", ["name", "content", "count"], defaults=(1,))
+
+
+class ObsLayout:
+    def __init__(self, sections: List[ObsSection]):
+        self.sections = [ObsSection(*section) for section in sections]
+        self._slices = {}
+
+        start = 0
+        for name, content, count in self.sections:
+            if name in self._slices:
+                raise ValueError(f"Duplicate section {name}")
+            length = self._content_size(content) * count
+            self._slices[name] = slice(start, start + length)
+            start += length
+
+        self.size = start
+
+    @staticmethod
+    def _content_size(content) -> int:
+        return content if isinstance(content, int) else content.size
+
+    def __getitem__(self, name: str) -> slice:
+        return self._slices[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._slices
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def names(self) -> List[str]:
+        return [section.name for section in self.sections]
+
+    def section(self, name: str) -> ObsSection:
+        for section in self.sections:
+            if section.name == name:
+                return section
+        raise KeyError(name)
+
+    def slice_of(self, *path: str) -> slice:
+        """
+        Absolute slice of a nested field, slice_of("ball", "position").
+        Only the first element of repeated sections is addressed.
+        """
+        start = 0
+        layout = self
+        for name in path[:-1]:
+            start += layout[name].start
+            layout = layout.section(name).content
+        field = layout[path[-1]]
+        return slice(start + field.start, start + field.stop)
+
+    def dtype(self, base=np.float32) -> np.dtype:
+        """
+        Structured dtype with the same memory layout as a row of `base` values
+        """
+        base = np.dtype(base)
+        fields = []
+        for name, content, count in self.sections:
+            if isinstance(content, int):
+                field = np.dtype((base, (content,))) if content != 1 else base
+            else:
+                field = content.dtype(base)
+            if count != 1:
+                field = np.dtype((field, (count,)))
+            fields.append((name, field))
+        return np.dtype(fields)
+
+    def view(self, obs: np.ndarray) -> np.ndarray:
+        """
+        Zero-copy structured view over observations of shape (..., size), np.load(..., mmap_mode="r") arrays
+        included. view(obs)["enemies"]["position"] has shape (..., team_size, 3) and writes go through to obs.
+        """
+        obs = np.asarray(obs)
+        if obs.shape[-1] != self.size:
+            raise ValueError(f"Observations have {obs.shape[-1]} values, the layout expects {self.size}")
+        if obs.ndim == 0 or obs.strides[-1] != obs.itemsize:
+            raise ValueError("The last axis of the observations must be contiguous to be viewed without a copy")
+
+        return obs.view(self.dtype(obs.dtype))[..., 0]
+
+    def describe(self) -> str:
+        lines = []
+        for name, content, count in self.sections:
+            section = self[name]
+            repeat = f" x{count}" if count != 1 else ""
+            lines.append(f"{name}{repeat} : [{section.start}:{section.stop}]")
+        return "\n".join(lines)
+
+
+BALL_LAYOUT = ObsLayout([
+    ObsSection("position", 3),
+    ObsSection("linear_velocity", 3),
+    ObsSection("angular_velocity", 3),
+])
+
+PLAYER_LAYOUT = ObsLayout([
+    ObsSection("rel_pos_to_ball", 3),
+    ObsSection("rel_vel_to_ball", 3),
+    ObsSection("position", 3),
+    ObsSection("forward", 3),
+    ObsSection("up", 3),
+    ObsSection("linear_velocity", 3),
+    ObsSection("angular_velocity", 3),
+    ObsSection("boost_amount", 1),
+    ObsSection("on_ground", 1),
+    ObsSection("has_flip", 1),
+    ObsSection("demoed", 1),
+])
+
+# The other players' blocks have extra info relative to the observing player
+OTHER_PLAYER_LAYOUT = ObsLayout(PLAYER_LAYOUT.sections + [
+    ObsSection("rel_pos_to_player", 3),
+    ObsSection("rel_vel_to_player", 3),
+])
+
+
+def astra_layout(team_size: int = 3, include_timers: bool = False) -> ObsLayout:
+    """
+    Layout of the AstraObs observations for full teams: allies then enemies, each in state.players order.
+    With fewer players the other blocks are packed the same way and the padding is at the end.
+    """
+    sections = [
+        ObsSection("ball", BALL_LAYOUT),
+        ObsSection("previous_action", 8),
+        ObsSection("pads", len(constants.BOOST_LOCATIONS)),
+        ObsSection("player", PLAYER_LAYOUT),
+        ObsSection("allies", OTHER_PLAYER_LAYOUT, team_size - 1),
+        ObsSection("enemies", OTHER_PLAYER_LAYOUT, team_size),
+    ]
+    if include_timers:
+        sections.append(ObsSection("timers", len(constants.BOOST_LOCATIONS)))
+
+    return ObsLayout(sections)
+
+
+ASTRA_LAYOUT = astra_layout()
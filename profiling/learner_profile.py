@@ -0,0 +1,230 @@
+"""
+Time spent by the learner in each phase of a PPO iteration.
+
+LearnerProfiler wraps the parts of rocket_learn's PPO loop (the rollout generator, calculate, the optimizer, save and
+update_parameters) with named timers, the time of a phase excludes the phases nested in it. Each iteration gives a
+record of seconds per phase:
+
+    rollouts: waiting for the rollouts of the workers in Redis, decoding excluded
+    decode: decoding the rollouts
+    advantages: values and advantages of the rollouts, until the first SGD step
+    epoch_<i>: SGD steps of the epoch i
+    stats: after the last SGD step, the stats computed and logged by calculate
+    checkpoint: time the loop is blocked by save
+    publish: sending the new model to the workers (update_parameters)
+    other: the rest of the iteration
+
+A learner starved by the workers spends its time in rollouts, a learner limited by compute in the epochs.
+The records are appended to a JSON lines file and sent to a callback (the UI pipe).
+"""
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+PROFILE_PATH = "learner_profile.jsonl"
+
+
+class PhaseTimer:
+    """
+    Named timers, a phase started inside another one is not counted in the outer one
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        # [name, start, time of the nested phases]
+        self._stack = []
+
+    def start(self, name: str):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def stop(self) -> float:
+        name, start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.add(name, elapsed - nested)
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        return elapsed
+
+    def add(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def take(self) -> Dict[str, float]:
+        phases = self.phases
+        self.phases = {}
+        return phases
+
+
+class LearnerProfiler:
+    def __init__(self, path: Optional[str] = PROFILE_PATH, send: Optional[Callable[[dict], None]] = None):
+        """
+        :param path: JSON lines file the records are appended to, None to only send them
+        :param send: Called with every record
+        """
+        self.path = path
+        self.send = send
+        self.timer = PhaseTimer()
+
+        self.iteration = 0
+        self.rollouts = 0
+        self._iteration_start = time.perf_counter()
+        self._calculated = False
+        self._in_calculate = False
+        self._sgd_start = None
+        self._steps = []
+
+    def install(self, alg):
+        """
+        Wraps the methods of a rocket_learn PPO and of its rollout generator, before alg.run
+        """
+        timer = self.timer
+        generator = alg.rollout_gen
+
+        generate_rollouts = generator.generate_rollouts
+
+        @functools.wraps(generate_rollouts)
+        def profiled_generate_rollouts(*args, **kwargs):
+            rollouts = generate_rollouts(*args, **kwargs)
+            while True:
+                with timer.phase("rollouts"):
+                    rollout = next(rollouts, None)
+                if rollout is None:
+                    return
+                self.rollouts += 1
+                yield rollout
+
+        generator.generate_rollouts = profiled_generate_rollouts
+
+        self._install_decode()
+
+        calculate = alg.calculate
+
+        @functools.wraps(calculate)
+        def profiled_calculate(*args, **kwargs):
+            self._calculated = self._in_calculate = True
+            self._sgd_start = None
+            self._steps = []
+            timer.start("advantages")
+            try:
+                return calculate(*args, **kwargs)
+            finally:
+                self._in_calculate = False
+                timer.stop()
+                self._split_epochs(alg.epochs)
+
+        alg.calculate = profiled_calculate
+
+        optimizer = alg.agent.optimizer
+        zero_grad = optimizer.zero_grad
+        step = optimizer.step
+
+        @functools.wraps(zero_grad)
+        def profiled_zero_grad(*args, **kwargs):
+            if self._in_calculate and self._sgd_start is None:
+                # End of the advantages, the rest of calculate is split in epochs afterwards
+                timer.stop()
+                self._sgd_start = time.perf_counter()
+                timer.start("sgd")
+            return zero_grad(*args, **kwargs)
+
+        @functools.wraps(step)
+        def profiled_step(*args, **kwargs):
+            result = step(*args, **kwargs)
+            self._steps.append(time.perf_counter())
+            return result
+
+        optimizer.zero_grad = profiled_zero_grad
+        optimizer.step = profiled_step
+
+        alg.save = self._timed("checkpoint", alg.save)
+
+        update_parameters = self._timed("publish", generator.update_parameters)
+
+        @functools.wraps(update_parameters)
+        def update_parameters_and_record(*args, **kwargs):
+            result = update_parameters(*args, **kwargs)
+            # Last call of an iteration, the first one is before the loop
+            if self._calculated:
+                self.record()
+            return result
+
+        generator.update_parameters = update_parameters_and_record
+
+    def _timed(self, name: str, function: Callable) -> Callable:
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            with self.timer.phase(name):
+                return function(*args, **kwargs)
+
+        return timed
+
+    def _install_decode(self):
+        from rocket_learn.rollout_generator.redis import redis_rollout_generator, utils
+
+        # Same modules as obs.delta_stream.install_learner_decoding, wraps its decoding if installed
+        for module in (redis_rollout_generator, utils):
+            decode_buffers = getattr(module, "decode_buffers", None)
+            # Decoded by RolloutIngestion in other threads, the wait for them is in rollouts
+            if decode_buffers is None or getattr(decode_buffers, "profiled", False) or \
+                    getattr(decode_buffers, "parallel", False):
+                continue
+
+            timed = self._timed("decode", decode_buffers)
+            timed.profiled = True
+            module.decode_buffers = timed
+
+    def _split_epochs(self, epochs: int):
+        sgd = self.timer.phases.pop("sgd", None)
+        if sgd is None:
+            return
+
+        steps_per_epoch = len(self._steps) // max(epochs, 1)
+        if steps_per_epoch == 0:
+            self.timer.add("sgd", sgd)
+            return
+
+        # Every epoch has the same number of steps
+        bounds = [self._sgd_start] + [self._steps[(epoch + 1) * steps_per_epoch - 1] for epoch in range(epochs)]
+        for epoch in range(epochs):
+            self.timer.add(f"epoch_{epoch}", bounds[epoch + 1] - bounds[epoch])
+        self.timer.add("stats", max(sgd - (bounds[-1] - bounds[0]), 0.0))
+
+    def record(self) -> dict:
+        now = time.perf_counter()
+        total = now - self._iteration_start
+        phases = self.timer.take()
+        phases["other"] = max(total - sum(phases.values()), 0.0)
+
+        record = {
+            "iteration": self.iteration,
+            "time": time.time(),
+            "total": total,
+            "rollouts_received": self.rollouts,
+            "phases": phases,
+        }
+
+        self.iteration += 1
+        self.rollouts = 0
+        self._iteration_start = now
+        self._calculated = False
+
+        if self.path is not None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        if self.send is not None:
+            self.send(record)
+
+        return record
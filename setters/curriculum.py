@@ -0,0 +1,215 @@
+"""
+Curriculum over the scenarios of ProbabilisticStateSetter.
+
+CurriculumTracker wraps the reward function of a worker and records a few stats of each episode (length, touches,
+goals, mean reward) with the scenario it started from. The stats of every worker are summed in a Redis hash
+(LocalCurriculumStore runs without Redis). CurriculumScheduler reads the sums every few seconds and moves the
+scenario weights towards the scenarios whose score still changes, the ones the policy is learning.
+"""
+import time
+from collections import namedtuple
+from typing import Callable, Dict
+
+import numpy as np
+from redis import Redis
+from rlgym.utils import RewardFunction
+from rlgym.utils.gamestates import GameState, PlayerData
+
+from setters.registry import ScenarioRegistry
+
+# Stats of one episode, reward is the mean reward of a player step
+EpisodeStats = namedtuple("EpisodeStats", ["steps", "touches", "goals", "reward"])
+
+FIELDS = ("episodes", "steps", "touches", "goals", "reward", "score")
+
+
+def mean_reward(stats: EpisodeStats) -> float:
+    return stats.reward
+
+
+def touch_rate(stats: EpisodeStats) -> float:
+    # Without rewards, touches per step
+    return stats.touches / stats.steps
+
+
+class LocalCurriculumStore:
+    """
+    In memory stand-in of RedisCurriculumStore, for a single process
+    """
+
+    def __init__(self):
+        self._totals = {}
+
+    def add(self, scenario: str, values: Dict[str, float]):
+        totals = self._totals.setdefault(scenario, dict.fromkeys(FIELDS, 0.0))
+        for field, value in values.items():
+            totals[field] += value
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        return {scenario: dict(totals) for scenario, totals in self._totals.items()}
+
+
+class RedisCurriculumStore:
+    """
+    Sums of the episode stats of all the workers, one hash field per scenario and stat
+    """
+
+    def __init__(self, redis: Redis, key: str = "curriculum-stats"):
+        self.redis = redis
+        self.key = key
+
+    def add(self, scenario: str, values: Dict[str, float]):
+        pipe = self.redis.pipeline(transaction=False)
+        for field, value in values.items():
+            pipe.hincrbyfloat(self.key, f"{scenario}:{field}", value)
+        pipe.execute()
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        totals = {}
+        for field, value in self.redis.hgetall(self.key).items():
+            scenario, field = (field.decode() if isinstance(field, bytes) else field).rsplit(":", 1)
+            totals.setdefault(scenario, dict.fromkeys(FIELDS, 0.0))[field] = float(value)
+        return totals
+
+    def clear(self):
+        self.redis.delete(self.key)
+
+
+class CurriculumScheduler:
+    def __init__(self, store, registry: ScenarioRegistry, score: Callable[[EpisodeStats], float] = mean_reward,
+                 update_interval: float = 30, fast_rate: float = 0.2, slow_rate: float = 0.02,
+                 exploration: float = 0.2):
+        """
+        :param store: LocalCurriculumStore or RedisCurriculumStore
+        :param registry: Its weights are set at each update, the scenarios weighted 0 in its file stay disabled
+        :param score: Score of an episode, the learning progress is how fast its mean changes
+        :param update_interval: Seconds between two reads of the store
+        :param fast_rate: Rate of the fast moving average of the scores
+        :param slow_rate: Rate of the slow moving average of the scores
+        :param exploration: Share of the weights kept on the file weights, no scenario is ever dropped
+        """
+        self.store = store
+        self.registry = registry
+        self.score = score
+        self.update_interval = update_interval
+        self.fast_rate = fast_rate
+        self.slow_rate = slow_rate
+        self.exploration = exploration
+
+        self.fast = {}
+        self.slow = {}
+        self._last_totals = {}
+        self._next_update = time.monotonic() + update_interval
+
+    def record(self, scenario: str, stats: EpisodeStats):
+        self.store.add(scenario, {
+            "episodes": 1,
+            "steps": stats.steps,
+            "touches": stats.touches,
+            "goals": stats.goals,
+            "reward": stats.reward,
+            "score": self.score(stats),
+        })
+
+        if time.monotonic() >= self._next_update:
+            self.update()
+
+    def progress(self) -> Dict[str, float]:
+        return {scenario: abs(self.fast[scenario] - self.slow[scenario]) for scenario in self.fast}
+
+    def update(self) -> Dict[str, float]:
+        """
+        Folds the episodes added to the store since the last update into the averages and sets the new weights
+        """
+        self._next_update = time.monotonic() + self.update_interval
+
+        totals = self.store.totals()
+        for scenario, values in totals.items():
+            last = self._last_totals.get(scenario, {})
+            episodes = values["episodes"] - last.get("episodes", 0)
+            if episodes <= 0:
+                continue
+
+            score = (values["score"] - last.get("score", 0)) / episodes
+            if scenario not in self.fast:
+                self.fast[scenario] = self.slow[scenario] = score
+            else:
+                self.fast[scenario] += self.fast_rate * (score - self.fast[scenario])
+                self.slow[scenario] += self.slow_rate * (score - self.slow[scenario])
+        self._last_totals = totals
+
+        weights = self.weights()
+        self.registry.set_weights(weights)
+        return weights
+
+    def weights(self) -> Dict[str, float]:
+        base = {name: weight for name, weight in self.registry.base_weights.items() if weight > 0}
+        base_total = sum(base.values())
+
+        progress = self.progress()
+        # Scenarios without stats yet get the highest progress so they are tried
+        default = max(progress.values(), default=1.0)
+        progress = {name: progress.get(name, default) for name in base}
+        progress_total = sum(progress.values())
+
+        if progress_total <= 0:
+            return {name: weight / base_total for name, weight in base.items()}
+
+        return {name: self.exploration * base[name] / base_total +
+                (1 - self.exploration) * progress[name] / progress_total
+                for name in base}
+
+
+class CurriculumTracker(RewardFunction):
+    """
+    Reward function wrapper recording the stats of each episode for a CurriculumScheduler,
+    the scenario is the one of the last reset of the ProbabilisticStateSetter
+    """
+
+    def __init__(self, reward_function: RewardFunction, state_setter, scheduler: CurriculumScheduler):
+        super().__init__()
+        self.reward_function = reward_function
+        self.state_setter = state_setter
+        self.scheduler = scheduler
+
+        self.scenario = None
+        self.steps = 0
+        self.touches = 0
+        self.reward = 0.0
+        self.player_steps = 0
+        self.initial_goals = 0
+        self.goals = 0
+
+    def reset(self, initial_state: GameState):
+        self.reward_function.reset(initial_state)
+
+        # Episodes are closed at the start of the next one
+        if self.scenario is not None and self.steps > 0:
+            self.scheduler.record(self.scenario, EpisodeStats(
+                self.steps, self.touches, self.goals - self.initial_goals,
+                self.reward / max(self.player_steps, 1)))
+
+        history = getattr(self.state_setter, "history", None)
+        self.scenario = history[-1].scenario if history else None
+        self.steps = 0
+        self.touches = 0
+        self.reward = 0.0
+        self.player_steps = 0
+        self.initial_goals = self.goals = initial_state.blue_score + initial_state.orange_score
+
+    def pre_step(self, state: GameState):
+        self.reward_function.pre_step(state)
+        self.steps += 1
+        self.goals = state.blue_score + state.orange_score
+
+    def _track(self, player: PlayerData, reward) -> float:
+        self.touches += player.ball_touched
+        self.reward += float(np.sum(reward))
+        self.player_steps += 1
+        return reward
+
+    def get_reward(self, player: PlayerData, state: GameState, previous_action: np.ndarray) -> float:
+        return self._track(player, self.reward_function.get_reward(player, state, previous_action))
+
+    def get_final_reward(self, player: PlayerData, state: GameState, previous_action: np.ndarray) -> float:
+        return self._track(player, self.reward_function.get_final_reward(player, state, previous_action))
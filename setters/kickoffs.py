@@ -0,0 +1,131 @@
+"""
+Kickoffs of DefaultState described as data.
+
+A quarter of the resets are regular kickoffs, each car on a distinct spawn. The others pick a variant of
+KICKOFF_VARIANTS: the cars spawn anywhere on the line from the field center to one of the regular spawns, all on the
+same point (mirrored for orange) or each on its own point, with a random pitch, a low boost and some speed.
+Orange spawns are the blue ones rotated half a turn around the field center.
+
+generate_kickoffs draws any number of kickoffs at once as StateBank rows, the values left to NaN (ball, yaw and roll
+of the variants, ...) keep what the state had.
+"""
+from collections import namedtuple
+
+import numpy as np
+from rlgym.utils.common_values import CAR_MAX_SPEED
+
+from setters.state_bank import BALL_LENGTH, CAR_LENGTH, CAR_BOOST, CAR_LINEAR_VELOCITY, CAR_POSITION, CAR_ROTATION, \
+    TeamSizes, state_length
+
+# Regular kickoffs, blue side
+SPAWN_POSITIONS = np.array([[-2048, -2560, 17], [2048, -2560, 17], [-256, -3840, 17], [256, -3840, 17],
+                            [0, -4608, 17]], dtype=float)
+SPAWN_YAWS = np.array([0.25 * np.pi, 0.75 * np.pi, 0.5 * np.pi, 0.5 * np.pi, 0.5 * np.pi])
+SPAWN_BOOST = 0.33
+# Share of regular kickoffs
+REGULAR_PROB = 0.25
+
+# Half a turn around the field center
+MIRROR = np.array([-1, -1, 1])
+
+PITCH = CAR_ROTATION.start
+YAW = CAR_ROTATION.start + 1
+
+# spawn: (x, y) end of the spawn line, the other end is the field center
+# same_z / different_z: height range with all the cars on the same point / each on its own point
+# pitch, boost, max_speed: per car, the speed is triangular with its mode at 0
+# center_from_y: x is set to 0 when y is above this, the back kickoffs spawn on the center line away from the goal
+# Quirks kept from the former if/else tree of DefaultState, so the distributions don't change:
+# orange_center_when_different: the orange cars always have x = 0 when on different points
+# grounded_when_same: with the cars on the same point and x set to 0, the blue cars are on the ground at y = 0
+# with their x kept
+KickoffVariant = namedtuple("KickoffVariant", ["name", "spawn", "same_z", "different_z", "pitch", "boost", "max_speed",
+                                               "center_from_y", "orange_center_when_different",
+                                               "grounded_when_same"],
+                            defaults=((17, 500), (17, 500), (-1, 1), (0, 0.4), CAR_MAX_SPEED, None, False, False))
+
+KICKOFF_VARIANTS = (
+    KickoffVariant("right_corner", (-2048, -2560), same_z=(17, 200)),
+    KickoffVariant("left_corner", (2048, -2560)),
+    KickoffVariant("back_right", (-256, -3840), center_from_y=-3000, orange_center_when_different=True),
+    KickoffVariant("back_left", (256, -3840), center_from_y=-3000, orange_center_when_different=True,
+                   grounded_when_same=True),
+    KickoffVariant("far_back_center", (0, -4608)),
+)
+
+
+# Table columns as arrays, indexed by variant
+_SPAWNS = np.array([variant.spawn for variant in KICKOFF_VARIANTS], dtype=float)
+_Z_RANGES = np.array([[variant.different_z, variant.same_z] for variant in KICKOFF_VARIANTS], dtype=float)
+_PITCHES = np.array([variant.pitch for variant in KICKOFF_VARIANTS], dtype=float)
+_BOOSTS = np.array([variant.boost for variant in KICKOFF_VARIANTS], dtype=float)
+_MAX_SPEEDS = np.array([variant.max_speed for variant in KICKOFF_VARIANTS], dtype=float)
+_CENTER_FROM_Y = np.array([np.inf if variant.center_from_y is None else variant.center_from_y
+                           for variant in KICKOFF_VARIANTS], dtype=float)
+_ORANGE_CENTER = np.array([variant.orange_center_when_different for variant in KICKOFF_VARIANTS])
+_GROUNDED = np.array([variant.grounded_when_same for variant in KICKOFF_VARIANTS])
+
+# Uniform draws per car
+ALONG, HEIGHT, PITCH_DRAW, BOOST_DRAW, SPEED_DRAW, DIRECTION, NORM_DRAW = 0, 1, 2, 3, 4, slice(5, 8), 8
+DRAWS = 9
+
+
+def _range(ranges: np.ndarray, draws: np.ndarray) -> np.ndarray:
+    return ranges[..., 0] + (ranges[..., 1] - ranges[..., 0]) * draws
+
+
+def generate_kickoffs(rng: np.random.Generator, team_sizes: TeamSizes, count: int) -> np.ndarray:
+    """
+    DefaultState, every kickoff and car drawn at once
+    """
+    blue, orange = team_sizes
+    cars_count = blue + orange
+    picks = rng.random((count, 3))
+    draws = rng.random((count, cars_count, DRAWS))
+    spawn_keys = rng.random((count, len(SPAWN_POSITIONS)))
+
+    regular = (picks[:, 0] < REGULAR_PROB)[:, np.newaxis]
+    variant = (picks[:, 1] * len(KICKOFF_VARIANTS)).astype(int)[:, np.newaxis]
+    same = (picks[:, 2] < 0.5)[:, np.newaxis]
+    is_orange = np.arange(cars_count) >= blue
+
+    # All the cars on the point of the first car, or each on its own
+    along = np.where(same, draws[:, :1, ALONG], draws[:, :, ALONG])
+    height = np.where(same, draws[:, :1, HEIGHT], draws[:, :, HEIGHT])
+
+    line_x = along * _SPAWNS[variant, 0]
+    y = along * _SPAWNS[variant, 1]
+    center_from_y = _CENTER_FROM_Y[variant]
+    x = np.where(y < center_from_y, line_x, 0)
+    z = _range(_Z_RANGES[variant, same.astype(int)], height)
+
+    # Orange spawns are the blue ones rotated half a turn
+    x = np.where(is_orange, -x, x)
+    y = np.where(is_orange, -y, y)
+    x = np.where(is_orange & ~same & _ORANGE_CENTER[variant], 0, x)
+    grounded = ~is_orange & same & _GROUNDED[variant] & (y >= center_from_y)
+    x = np.where(grounded, line_x, x)
+    y = np.where(grounded, 0, y)
+    z = np.where(grounded, 17, z)
+
+    # Regular kickoffs, a distinct spawn per car, the same ones for both teams
+    spawns = np.argsort(spawn_keys, axis=1)
+    spawns = np.concatenate((spawns[:, :blue], spawns[:, :orange]), axis=1)
+    regular_positions = SPAWN_POSITIONS[spawns] * np.where(is_orange[:, np.newaxis], MIRROR, 1)
+    regular_yaws = SPAWN_YAWS[spawns] - np.where(is_orange, np.pi, 0)
+
+    speeds = _MAX_SPEEDS[variant] * (1 - np.sqrt(1 - draws[..., SPEED_DRAW]))
+    directions = draws[..., DIRECTION] - 0.5
+    directions *= (speeds * draws[..., NORM_DRAW] / np.linalg.norm(directions, axis=-1))[..., np.newaxis]
+
+    states = np.full((count, state_length(team_sizes)), np.nan)
+    cars = states[:, BALL_LENGTH:].reshape(count, cars_count, CAR_LENGTH)
+    regular_cars = regular[..., np.newaxis]
+    cars[..., CAR_POSITION] = np.where(regular_cars, regular_positions, np.stack((x, y, z), axis=-1))
+    # set_rot(yaw) of the former tree, the first argument is the pitch
+    cars[..., PITCH] = np.where(regular, np.nan, _range(_PITCHES[variant], draws[..., PITCH_DRAW]))
+    cars[..., YAW] = np.where(regular, regular_yaws, np.nan)
+    cars[..., CAR_LINEAR_VELOCITY] = np.where(regular_cars, np.nan, directions)
+    cars[..., CAR_BOOST] = np.where(regular, SPAWN_BOOST, _range(_BOOSTS[variant], draws[..., BOOST_DRAW]))
+
+    return states
@@ -0,0 +1,132 @@
+"""
+Scenario registry, every state setter is built once and picked with an alias table.
+The weights come from a JSON file that is reloaded when it changes, so the training mix
+of the workers can be changed without restarting them.
+"""
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from rlgym.utils.state_setters import StateSetter
+
+from setters.rng import randrange
+
+SCENARIO_WEIGHTS_PATH = os.path.join(os.path.dirname(__file__), "scenarios.json")
+
+
+class AliasTable:
+    """
+    Vose's alias method, O(n) to build and O(1) to sample
+    """
+
+    def __init__(self, weights: List[float]):
+        total = sum(weights)
+        if len(weights) == 0 or total <= 0 or any(weight < 0 for weight in weights):
+            raise ValueError(f"Weights must be positive with a positive sum, got {weights}")
+
+        n = len(weights)
+        scaled = [weight * n / total for weight in weights]
+        self.probs = [1.0] * n
+        self.alias = list(range(n))
+
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probs[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+
+        # Leftovers are 1 up to float rounding
+        for i in small + large:
+            self.probs[i] = 1.0
+
+    def sample(self, rng: np.random.Generator) -> int:
+        i = randrange(rng, len(self.probs))
+        return i if rng.random() < self.probs[i] else self.alias[i]
+
+
+class ScenarioRegistry:
+    def __init__(self, factories: Dict[str, Callable[[np.random.Generator], StateSetter]],
+                 default_weights: Dict[str, float], weights_path: Optional[str] = SCENARIO_WEIGHTS_PATH,
+                 reload_interval: float = 5, rng: Optional[np.random.Generator] = None):
+        """
+        :param factories: Name -> state setter class (or any callable building one from the Generator)
+        :param default_weights: Used when there is no weights file or it can't be loaded
+        :param weights_path: JSON object of name -> weight, the missing names get a weight of 0
+        :param reload_interval: Seconds between two checks of the weights file modification time
+        :param rng: Shared by the setters and the scenario sampling
+        """
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.setters = {name: factory(self.rng) for name, factory in factories.items()}
+        self.weights_path = weights_path
+        self.reload_interval = reload_interval
+
+        self.weights = {}
+        # Weights of the file (or the defaults), set_weights can override them until the file changes
+        self.base_weights = dict(default_weights)
+        self._names = []
+        self._table = None
+        self._mtime = None
+        self._next_check = 0
+
+        self.set_weights(default_weights)
+        self.reload(force=True)
+
+    def set_weights(self, weights: Dict[str, float]):
+        unknown = set(weights) - set(self.setters)
+        if unknown:
+            raise ValueError(f"Unknown scenarios {sorted(unknown)}, registered : {sorted(self.setters)}")
+
+        names = [name for name, weight in weights.items() if weight != 0]
+        table = AliasTable([float(weights[name]) for name in names])
+
+        self.weights = dict(weights)
+        self._names = names
+        self._table = table
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Loads the weights file if it changed, returns True if the weights were updated.
+        A broken file is reported and the current weights are kept.
+        """
+        if self.weights_path is None:
+            return False
+
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        self._next_check = now + self.reload_interval
+
+        try:
+            mtime = os.stat(self.weights_path).st_mtime
+        except OSError:
+            return False
+
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+
+        try:
+            with open(self.weights_path) as f:
+                self.set_weights(json.load(f))
+                self.base_weights = self.weights
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Could not load the scenario weights from {self.weights_path}, keeping {self.weights} : {e}")
+            return False
+
+        return True
+
+    def probabilities(self) -> Dict[str, float]:
+        total = sum(self.weights[name] for name in self._names)
+        return {name: self.weights[name] / total for name in self._names}
+
+    def sample_name(self) -> str:
+        self.reload()
+        return self._names[self._table.sample(self.rng)]
+
+    def sample(self) -> StateSetter:
+        return self.setters[self.sample_name()]
@@ -0,0 +1,178 @@
+"""
+Starting states taken from recorded games.
+
+A corpus is a directory of memory-mapped .npy columns (ball and car physics, boost) plus a meta.json with the team
+sizes, the cars are ordered blue first like the StateBank rows. Sampling a state reads one index of each column, the
+corpus is never loaded in RAM and the workers of a node share the same pages through the page cache.
+"""
+import json
+import os
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+from rlgym.utils.common_values import BLUE_TEAM, ORANGE_TEAM
+from rlgym.utils.gamestates import GameState
+from rlgym.utils.state_setters import StateSetter, StateWrapper
+
+from setters.rng import randrange
+from setters.state_bank import BALL_LENGTH, CAR_LENGTH, TeamSizes, apply_state, state_length, wrapper_team_sizes
+
+META_FILE = "meta.json"
+
+# Column -> its values in the ball or car block of a StateBank row
+BALL_COLUMNS = {
+    "ball_position": slice(0, 3),
+    "ball_linear_velocity": slice(3, 6),
+    "ball_angular_velocity": slice(6, 9),
+}
+CAR_COLUMNS = {
+    "car_position": slice(0, 3),
+    "car_rotation": slice(3, 6),
+    "car_linear_velocity": slice(6, 9),
+    "car_angular_velocity": slice(9, 12),
+    "car_boost": slice(12, 13),
+}
+
+
+def game_state_row(state: GameState, team_sizes: TeamSizes) -> Optional[np.ndarray]:
+    """
+    StateBank row of a GameState, None if its teams don't have these sizes
+    """
+    blue = [player for player in state.players if player.team_num == BLUE_TEAM]
+    orange = [player for player in state.players if player.team_num == ORANGE_TEAM]
+    if (len(blue), len(orange)) != tuple(team_sizes):
+        return None
+
+    ball = state.ball
+    row = [ball.position, ball.linear_velocity, ball.angular_velocity]
+    for player in blue + orange:
+        car = player.car_data
+        row += [car.position, car.euler_angles(), car.linear_velocity, car.angular_velocity, [player.boost_amount]]
+
+    return np.concatenate(row)
+
+
+def write_corpus(directory: str, states: Union[np.ndarray, Iterable[GameState]], team_sizes: TeamSizes = (3, 3),
+                 dtype=np.float32) -> int:
+    """
+    Writes a corpus from StateBank rows or GameStates (the ones with other team sizes are skipped),
+    returns the number of states written
+    """
+    if not isinstance(states, np.ndarray):
+        states = [row for row in (game_state_row(state, team_sizes) for state in states) if row is not None]
+        states = np.array(states).reshape(len(states), state_length(team_sizes))
+
+    if states.ndim != 2 or states.shape[1] != state_length(team_sizes):
+        raise ValueError(f"Expected rows of {state_length(team_sizes)} values for {team_sizes}, got {states.shape}")
+
+    os.makedirs(directory, exist_ok=True)
+    cars = states[:, BALL_LENGTH:].reshape(len(states), sum(team_sizes), CAR_LENGTH)
+    for column, part in BALL_COLUMNS.items():
+        np.save(os.path.join(directory, f"{column}.npy"), states[:, part].astype(dtype))
+    for column, part in CAR_COLUMNS.items():
+        np.save(os.path.join(directory, f"{column}.npy"), cars[..., part].astype(dtype))
+
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump({"team_sizes": list(team_sizes), "length": len(states)}, f)
+
+    return len(states)
+
+
+def mirror_state(state: np.ndarray, team_sizes: TeamSizes) -> Tuple[np.ndarray, TeamSizes]:
+    """
+    Same state with the teams swapped, rotated half a turn around the field center: x and y are negated and the
+    yaw turned by pi, like the orange kickoffs of DefaultState. Returns the row and the new team sizes.
+    """
+    mirrored = state.copy()
+    mirrored[0:2] *= -1
+    mirrored[3:5] *= -1
+    mirrored[6:8] *= -1
+
+    blue, orange = team_sizes
+    cars = mirrored[BALL_LENGTH:].reshape(blue + orange, CAR_LENGTH)
+    cars[:, 0:2] *= -1
+    cars[:, 6:8] *= -1
+    cars[:, 9:11] *= -1
+    # Back in [-pi, pi)
+    cars[:, 4] = (cars[:, 4] + 2 * np.pi) % (2 * np.pi) - np.pi
+    mirrored[BALL_LENGTH:] = np.concatenate((cars[blue:], cars[:blue]), axis=None)
+
+    return mirrored, (orange, blue)
+
+
+class ReplayCorpus:
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        self.team_sizes = tuple(meta["team_sizes"])
+        self.length = meta["length"]
+
+        # Read only maps, shared by every process opening the corpus
+        self.columns = {column: np.load(os.path.join(directory, f"{column}.npy"), mmap_mode="r")
+                        for column in list(BALL_COLUMNS) + list(CAR_COLUMNS)}
+
+    def __len__(self) -> int:
+        return self.length
+
+    def state(self, index: int) -> np.ndarray:
+        """
+        StateBank row of a recorded state
+        """
+        ball = [self.columns[column][index] for column in BALL_COLUMNS]
+        cars = np.concatenate([self.columns[column][index] for column in CAR_COLUMNS], axis=1)
+        return np.concatenate(ball + [cars.ravel()]).astype(float)
+
+
+def select_cars(state: np.ndarray, team_sizes: TeamSizes, wanted: TeamSizes) -> Optional[np.ndarray]:
+    """
+    Keeps the first cars of each team, None if a team has too few cars
+    """
+    if wanted[0] > team_sizes[0] or wanted[1] > team_sizes[1]:
+        return None
+    if tuple(wanted) == tuple(team_sizes):
+        return state
+
+    cars = state[BALL_LENGTH:].reshape(sum(team_sizes), CAR_LENGTH)
+    cars = np.concatenate((cars[:wanted[0]], cars[team_sizes[0]:team_sizes[0] + wanted[1]]))
+    return np.concatenate((state[:BALL_LENGTH], cars.ravel()))
+
+
+class ReplayStateSetter(StateSetter):
+    """
+    Sets a state drawn from a ReplayCorpus, mirrored half of the time so both teams start from every state
+    """
+
+    def __init__(self, corpus: Union[str, ReplayCorpus], mirror_prob: float = 0.5,
+                 fallback: Optional[StateSetter] = None, rng: Optional[np.random.Generator] = None):
+        """
+        :param corpus: ReplayCorpus or its directory
+        :param fallback: Used when the corpus has fewer cars than the match, otherwise such a match raises
+        """
+        super().__init__()
+        self.corpus = corpus if isinstance(corpus, ReplayCorpus) else ReplayCorpus(corpus)
+        self.mirror_prob = mirror_prob
+        self.fallback = fallback
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # Row applied by the last reset, None if it went to the fallback
+        self.last_state = None
+
+    def reset(self, state_wrapper: StateWrapper):
+        self.last_state = None
+        wanted = wrapper_team_sizes(state_wrapper)
+
+        recorded = self.corpus.state(randrange(self.rng, len(self.corpus)))
+        state = None
+        if self.rng.random() < self.mirror_prob:
+            state = select_cars(*mirror_state(recorded, self.corpus.team_sizes), wanted)
+        # Uneven corpus teams may only fit one way
+        if state is None:
+            state = select_cars(recorded, self.corpus.team_sizes, wanted)
+
+        if state is None:
+            if self.fallback is None:
+                raise ValueError(f"The corpus has {self.corpus.team_sizes} cars, the match {wanted}")
+            self.fallback.reset(state_wrapper)
+            return
+
+        self.last_state = state
+        apply_state(state_wrapper, state)
@@ -0,0 +1,48 @@
+"""
+Randomness of the state setters. Every setter draws from one numpy Generator per worker, reseeded at each episode
+with a recorded seed, so a reset can be reproduced exactly from its seed.
+"""
+from typing import Optional
+
+import numpy as np
+
+
+def uniform(rng: np.random.Generator, low, high, size=None):
+    # Also works with low > high, like random.uniform and np.random.uniform (Generator.uniform raises)
+    return low + (high - low) * rng.random(size)
+
+
+def randint(rng: np.random.Generator, low, high, size=None):
+    # Inclusive, like random.randint
+    low, high = int(low), int(high)
+    if size is None:
+        return low + randrange(rng, high - low + 1)
+    return rng.integers(low, high + 1, size)
+
+
+def randrange(rng: np.random.Generator, stop: int) -> int:
+    # Scalar Generator.integers is several times slower, the bias is below 2^-52 for our ranges
+    return int(rng.random() * stop)
+
+
+class EpisodeSeeder:
+    """
+    Owns the Generator shared by the setters and reseeds it in place, the setters keep their reference
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        """
+        :param seed: Seed of the episode seeds, None for OS entropy
+        """
+        self._seeds = np.random.default_rng(seed)
+        self.rng = np.random.default_rng()
+        self.seed = None
+
+    def reseed(self, seed: int):
+        self.rng.bit_generator.state = np.random.PCG64(seed).state
+        self.seed = seed
+
+    def next_episode(self) -> int:
+        seed = int(self._seeds.integers(2 ** 63))
+        self.reseed(seed)
+        return seed
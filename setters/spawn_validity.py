@@ -0,0 +1,151 @@
+"""
+Spawn validity of the ball and the cars: arena bounds, car-car overlap, ball-car overlap and goal-mouth
+exclusion, checked for every entity in one pass. Works on a single spawn or on batches (leading dimensions).
+
+The setters resample only the invalid entities with resample_invalid, up to a fixed number of retries.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from typing import Callable, Optional
+
+import numpy as np
+from rlgym.utils.common_values import SIDE_WALL_X, BACK_WALL_Y, CEILING_Z, BALL_RADIUS, GOAL_HEIGHT
+from rlgym.utils.state_setters import StateWrapper
+from rlgym.utils.state_setters.wrappers import CarWrapper
+
+# Octane hitbox
+CAR_HALF_EXTENTS = np.array([59.0, 42.1, 18.08])
+CAR_HITBOX_OFFSET = np.array([13.88, 0, 20.75])
+# Cars closer than twice this are overlapping
+CAR_RADIUS = CAR_HALF_EXTENTS[0]
+
+GOAL_HALF_WIDTH = 892.755
+# |x| + |y| of the 45 degrees corner walls
+CORNER_LIMIT = 8064
+# The ball can't spawn this close to the goal line in front of a goal
+GOAL_MOUTH_DEPTH = 2 * BALL_RADIUS
+# Setters put a resting ball at z = 92 or 93
+BALL_FLOOR_TOLERANCE = 5
+
+MAX_RETRIES = 10
+
+SpawnCheck = namedtuple("SpawnCheck", ["ball_out", "ball_in_goal_mouth", "cars_out", "car_overlap",
+                                       "ball_car_overlap"])
+
+
+def euler_to_rotation_batch(pyr: np.ndarray) -> np.ndarray:
+    """
+    rlgym.utils.math.euler_to_rotation over (..., 3) pitch, yaw, roll
+    """
+    cos, sin = np.cos(pyr), np.sin(pyr)
+    cp, cy, cr = cos[..., 0], cos[..., 1], cos[..., 2]
+    sp, sy, sr = sin[..., 0], sin[..., 1], sin[..., 2]
+
+    theta = np.empty(pyr.shape[:-1] + (3, 3))
+    # front
+    theta[..., 0, 0] = cp * cy
+    theta[..., 1, 0] = cp * sy
+    theta[..., 2, 0] = sp
+    # left
+    theta[..., 0, 1] = cy * sp * sr - cr * sy
+    theta[..., 1, 1] = sy * sp * sr + cr * cy
+    theta[..., 2, 1] = -cp * sr
+    # up
+    theta[..., 0, 2] = -cr * cy * sp - sr * sy
+    theta[..., 1, 2] = -cr * sy * sp + sr * cy
+    theta[..., 2, 2] = cp * cr
+
+    return theta
+
+
+@lru_cache()
+def _earlier_cars(nb_cars: int) -> np.ndarray:
+    return np.tri(nb_cars, k=-1, dtype=bool)
+
+
+def check_spawns(ball_position: np.ndarray, car_positions: np.ndarray, car_rotations: Optional[np.ndarray] = None,
+                 goal_mouth_depth: float = GOAL_MOUTH_DEPTH) -> SpawnCheck:
+    """
+    :param ball_position: (..., 3)
+    :param car_positions: (..., cars, 3)
+    :param car_rotations: (..., cars, 3) pitch, yaw, roll, gives the exact ball-car overlap (hitbox instead of
+    a sphere)
+    NaN values (not set) are never invalid. Of two overlapping cars only the later one is flagged.
+    """
+    ball_position = np.asarray(ball_position, dtype=float)
+    car_positions = np.asarray(car_positions, dtype=float)
+
+    # Comparisons written so that NaN gives False
+    ball_abs = np.abs(ball_position)
+    x, y, z = ball_abs[..., 0], ball_abs[..., 1], ball_position[..., 2]
+    ball_out = (x > SIDE_WALL_X - BALL_RADIUS) | (y > BACK_WALL_Y - BALL_RADIUS) | \
+               (z < BALL_RADIUS - BALL_FLOOR_TOLERANCE) | (z > CEILING_Z - BALL_RADIUS) | \
+               (x + y > CORNER_LIMIT - BALL_RADIUS * 2 ** 0.5)
+    ball_in_goal_mouth = (x < GOAL_HALF_WIDTH) & (z < GOAL_HEIGHT) & (y > BACK_WALL_Y - goal_mouth_depth)
+
+    cars_abs = np.abs(car_positions)
+    cx, cy, cz = cars_abs[..., 0], cars_abs[..., 1], car_positions[..., 2]
+    cars_out = (cx > SIDE_WALL_X) | (cy > BACK_WALL_Y) | (cz < 0) | (cz > CEILING_Z) | (cx + cy > CORNER_LIMIT)
+
+    # Pairwise, a car overlapping any earlier car
+    between = car_positions[..., :, np.newaxis, :] - car_positions[..., np.newaxis, :, :]
+    close = (between * between).sum(axis=-1) < (2 * CAR_RADIUS) ** 2
+    car_overlap = (close & _earlier_cars(car_positions.shape[-2])).any(axis=-1)
+
+    relative = ball_position[..., np.newaxis, :] - car_positions
+    if car_rotations is None:
+        ball_car_overlap = (relative * relative).sum(axis=-1) < (BALL_RADIUS + CAR_RADIUS) ** 2
+    else:
+        rotations = euler_to_rotation_batch(np.asarray(car_rotations, dtype=float))
+        # Ball center in the car frame, relative to the hitbox center
+        local = (relative[..., np.newaxis, :] @ rotations)[..., 0, :] - CAR_HITBOX_OFFSET
+        outside = local - np.minimum(np.maximum(local, -CAR_HALF_EXTENTS), CAR_HALF_EXTENTS)
+        ball_car_overlap = (outside * outside).sum(axis=-1) < BALL_RADIUS ** 2
+
+    return SpawnCheck(ball_out, ball_in_goal_mouth, cars_out, car_overlap, ball_car_overlap)
+
+
+def invalid_entities(check: SpawnCheck, move_ball_on_overlap: bool = False):
+    """
+    (ball invalid, cars invalid) of a check, a ball-car overlap flags the car unless move_ball_on_overlap
+    """
+    ball_invalid = check.ball_out | check.ball_in_goal_mouth
+    cars_invalid = check.cars_out | check.car_overlap
+
+    if move_ball_on_overlap:
+        ball_invalid = ball_invalid | check.ball_car_overlap.any(axis=-1)
+    else:
+        cars_invalid = cars_invalid | check.ball_car_overlap
+
+    return ball_invalid, cars_invalid
+
+
+def check_wrapper(state_wrapper: StateWrapper, **kwargs) -> SpawnCheck:
+    cars = state_wrapper.cars
+    return check_spawns(state_wrapper.ball.position,
+                        np.array([car.position for car in cars], dtype=float).reshape(len(cars), 3),
+                        np.array([car.rotation for car in cars], dtype=float).reshape(len(cars), 3),
+                        **kwargs)
+
+
+def resample_invalid(state_wrapper: StateWrapper, resample_car: Optional[Callable[[CarWrapper], None]] = None,
+                     resample_ball: Optional[Callable[[], None]] = None, move_ball_on_overlap: bool = False,
+                     max_retries: int = MAX_RETRIES) -> bool:
+    """
+    Resamples the invalid entities of a state until it is valid or the retries run out.
+    Entities without a resampling function are kept. Returns True if the state ended up valid.
+    """
+    for retry in range(max_retries + 1):
+        ball_invalid, cars_invalid = invalid_entities(check_wrapper(state_wrapper), move_ball_on_overlap)
+        if not ball_invalid and not cars_invalid.any():
+            return True
+        if retry == max_retries:
+            break
+
+        if ball_invalid and resample_ball is not None:
+            resample_ball()
+        if resample_car is not None:
+            for i in np.flatnonzero(cars_invalid):
+                resample_car(state_wrapper.cars[i])
+
+    return False
@@ -0,0 +1,588 @@
+"""
+Pre-generated states for the scenarios of CustomStateSetter.py.
+
+Each vectorized scenario draws thousands of states at once with numpy instead of a few dozen scalar random calls
+per reset. The states are kept in one ring buffer per scenario, refilled by a background thread, and a reset
+only copies one row into the StateWrapper. A bank can be saved as .npy files and loaded memory-mapped so a worker
+starts with a warm bank.
+
+A state row is the ball (position, linear velocity, angular velocity) followed by one block per car (position,
+rotation, linear velocity, angular velocity, boost), blue cars first then orange cars, in StateWrapper order.
+NaN values are left unchanged, like the values a setter does not set.
+"""
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from rlgym.utils.common_values import CAR_MAX_SPEED, SIDE_WALL_X, BACK_WALL_Y, CEILING_Z, BALL_RADIUS, \
+    CAR_MAX_ANG_VEL, BALL_MAX_SPEED, BLUE_TEAM, ORANGE_TEAM
+from rlgym.utils.state_setters import StateSetter, StateWrapper
+
+from setters.rng import randint, uniform
+from setters.spawn_validity import MAX_RETRIES, check_spawns, invalid_entities
+
+# Same limits as CustomStateSetter.py
+LIM_X = SIDE_WALL_X - 1152 / 2 - BALL_RADIUS * 2 ** 0.5
+LIM_Y = BACK_WALL_Y - 1152 / 2 - BALL_RADIUS * 2 ** 0.5
+LIM_Z = CEILING_Z - BALL_RADIUS
+
+PITCH_LIM = np.pi / 2
+YAW_LIM = np.pi
+ROLL_LIM = np.pi
+
+DEG_TO_RAD = np.pi / 180
+
+# State row columns
+BALL_POSITION = slice(0, 3)
+BALL_LINEAR_VELOCITY = slice(3, 6)
+BALL_ANGULAR_VELOCITY = slice(6, 9)
+BALL_LENGTH = 9
+
+CAR_POSITION = slice(0, 3)
+CAR_ROTATION = slice(3, 6)
+CAR_LINEAR_VELOCITY = slice(6, 9)
+CAR_ANGULAR_VELOCITY = slice(9, 12)
+CAR_BOOST = 12
+CAR_LENGTH = 13
+
+# (blue cars, orange cars)
+TeamSizes = Tuple[int, int]
+
+
+def state_length(team_sizes: TeamSizes) -> int:
+    return BALL_LENGTH + CAR_LENGTH * sum(team_sizes)
+
+
+def car_block(states: np.ndarray, index: int) -> np.ndarray:
+    start = BALL_LENGTH + CAR_LENGTH * index
+    return states[:, start:start + CAR_LENGTH]
+
+
+def car_teams(team_sizes: TeamSizes) -> np.ndarray:
+    return np.array([BLUE_TEAM] * team_sizes[0] + [ORANGE_TEAM] * team_sizes[1])
+
+
+def rand_vec3(rng: np.random.Generator, max_norm) -> np.ndarray:
+    """
+    rlgym.utils.math.rand_vec3 for every max_norm at once
+    """
+    max_norm = np.asarray(max_norm, dtype=float)
+    vec = rng.random((len(max_norm), 3)) - 0.5
+    vec /= np.linalg.norm(vec, axis=1, keepdims=True)
+    return vec * (rng.random(len(max_norm)) * max_norm)[:, np.newaxis]
+
+
+def random_car(rng: np.random.Generator, car: np.ndarray):
+    """
+    Rotation, velocities and boost that most setters give to the cars
+    """
+    count = len(car)
+    car[:, CAR_LINEAR_VELOCITY] = rand_vec3(rng, rng.triangular(0, 0, CAR_MAX_SPEED, count))
+    car[:, CAR_ROTATION] = np.stack((rng.triangular(-PITCH_LIM, 0, PITCH_LIM, count),
+                                     rng.uniform(-YAW_LIM, YAW_LIM, count),
+                                     rng.triangular(-ROLL_LIM, 0, ROLL_LIM, count)), axis=1)
+    car[:, CAR_ANGULAR_VELOCITY] = rand_vec3(rng, rng.triangular(0, 0, CAR_MAX_ANG_VEL, count))
+    car[:, CAR_BOOST] = rng.uniform(0, 1, count)
+
+
+def ball_near_car(rng: np.random.Generator, states: np.ndarray, car: np.ndarray, y_low: float, y_high: float):
+    # Ball of ShotState and SaveState
+    count = len(states)
+    car_x = car[:, 0]
+    states[:, 0] = uniform(rng, np.maximum(car_x - 1000, -LIM_X), np.minimum(car_x + 1000, LIM_X), count)
+    states[:, 1] = uniform(rng, car[:, 1] + y_low, car[:, 1] + y_high, count)
+    states[:, 2] = rng.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z / 2, count)
+
+    ball_speed = rng.exponential(-(BALL_MAX_SPEED / 3) / np.log(1 - 0.999), count)
+    states[:, BALL_LINEAR_VELOCITY] = rand_vec3(rng, np.minimum(ball_speed, BALL_MAX_SPEED / 3))
+    states[:, BALL_ANGULAR_VELOCITY] = rand_vec3(rng, rng.triangular(0, 0, CAR_MAX_ANG_VEL + 0.5, count))
+
+
+def defending_car(rng: np.random.Generator, car: np.ndarray, side: int):
+    # Cars spawned in front of their goal, side is 1 for orange and -1 for blue
+    count = len(car)
+    car[:, 0] = randint(rng, -2900, 2900, count)
+    car[:, 1] = side * randint(rng, 3000, 5120, count)
+    car[:, 2] = 17
+    random_car(rng, car)
+
+
+def generate_random(rng: np.random.Generator, team_sizes: TeamSizes, count: int) -> np.ndarray:
+    """
+    CustomStateSetter
+    """
+    states = np.full((count, state_length(team_sizes)), np.nan)
+    states[:, 0] = rng.uniform(-LIM_X, LIM_X, count)
+    states[:, 1] = rng.uniform(-LIM_Y, LIM_Y, count)
+    states[:, 2] = rng.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z, count)
+
+    # 99.9% chance of below ball max speed
+    ball_speed = rng.exponential(-BALL_MAX_SPEED / np.log(1 - 0.999), count)
+    states[:, BALL_LINEAR_VELOCITY] = rand_vec3(rng, np.minimum(ball_speed, BALL_MAX_SPEED))
+    states[:, BALL_ANGULAR_VELOCITY] = rand_vec3(rng, rng.triangular(0, 0, CAR_MAX_ANG_VEL + 0.5, count))
+
+    for i in range(sum(team_sizes)):
+        car = car_block(states, i)
+
+        # On average 1 second at max speed away from ball
+        car_pos = states[:, BALL_POSITION] + rand_vec3(rng, rng.exponential(BALL_MAX_SPEED, count))
+        valid = (np.abs(car_pos[:, 0]) < LIM_X) & (np.abs(car_pos[:, 1]) < LIM_Y) & \
+                (0 < car_pos[:, 2]) & (car_pos[:, 2] < LIM_Z)
+        # Fallback on fully random
+        fallback = np.stack((rng.uniform(-LIM_X, LIM_X, count),
+                             rng.uniform(-LIM_Y, LIM_Y, count),
+                             rng.triangular(BALL_RADIUS, BALL_RADIUS, LIM_Z, count)), axis=1)
+        car[:, CAR_POSITION] = np.where(valid[:, np.newaxis], car_pos, fallback)
+
+        random_car(rng, car)
+
+    return states
+
+
+def generate_shot(rng: np.random.Generator, team_sizes: TeamSizes, count: int) -> np.ndarray:
+    """
+    ShotState, the ball is placed in front of the last blue car
+    """
+    states = np.full((count, state_length(team_sizes)), np.nan)
+
+    for i, team in enumerate(car_teams(team_sizes)):
+        car = car_block(states, i)
+        if team == BLUE_TEAM:
+            car[:, 0] = rng.uniform(-4096, 4096, count)
+            car[:, 1] = rng.uniform(0, 3000, count)
+            car[:, 2] = 17
+            random_car(rng, car)
+            ball_near_car(rng, states, car, 1000, 100)
+        else:
+            defending_car(rng, car, 1)
+
+    return states
+
+
+def generate_jump_shot(rng: np.random.Generator, team_sizes: TeamSizes, count: int) -> np.ndarray:
+    """
+    JumpShotState, the ball is placed in front of the last blue car
+    """
+    states = np.full((count, state_length(team_sizes)), np.nan)
+
+    for i, team in enumerate(car_teams(team_sizes)):
+        car = car_block(states, i)
+        if team == BLUE_TEAM:
+            car[:, 0] = rng.uniform(-4096, 4096, count)
+            car[:, 1] = rng.uniform(0, 2500, count)
+            car[:, 2] = 17
+            car[:, CAR_LINEAR_VELOCITY] = rand_vec3(rng, rng.triangular(0, 0, CAR_MAX_SPEED, count))
+            # Yaw in radians, same as JumpShotState
+            car[:, CAR_ROTATION] = (0, 90, 0)
+            car[:, CAR_ANGULAR_VELOCITY] = 0
+            car[:, CAR_BOOST] = rng.uniform(0, 1, count)
+
+            car_x = car[:, 0]
+            states[:, 0] = uniform(rng, np.maximum(car_x - 1000, -LIM_X), np.minimum(car_x + 1000, LIM_X), count)
+            states[:, 1] = uniform(rng, car[:, 1] + 1500, car[:, 1] + 500, count)
+            states[:, 2] = CEILING_Z / 2
+            ball_speed = rng.uniform(100, BALL_MAX_SPEED / 2, count)
+            states[:, BALL_LINEAR_VELOCITY] = rand_vec3(rng, np.minimum(ball_speed, BALL_MAX_SPEED / 2))
+            states[:, BALL_ANGULAR_VELOCITY] = 0
+        else:
+            defending_car(rng, car, 1)
+
+    return states
+
+
+def generate_save(rng: np.random.Generator, team_sizes: TeamSizes, count: int) -> np.ndarray:
+    """
+    SaveState, the ball is placed in front of the last orange car
+    """
+    states = np.full((count, state_length(team_sizes)), np.nan)
+
+    for i, team in enumerate(car_teams(team_sizes)):
+        car = car_block(states, i)
+        if team == ORANGE_TEAM:
+            car[:, 0] = rng.uniform(-4096, 4096, count)
+            car[:, 1] = uniform(rng, 0, -3000, count)
+            car[:, 2] = 17
+            random_car(rng, car)
+            ball_near_car(rng, states, car, -1000, -100)
+        else:
+            defending_car(rng, car, -1)
+
+    return states
+
+
+def generate_air_dribble_2_touch(rng: np.random.Generator, team_sizes: TeamSizes, count: int) -> np.ndarray:
+    """
+    AirDribble2Touch, the ball is placed on the last blue car
+    """
+    states = np.full((count, state_length(team_sizes)), np.nan)
+
+    for i, team in enumerate(car_teams(team_sizes)):
+        car = car_block(states, i)
+        if team == BLUE_TEAM:
+            car[:, 0] = randint(rng, -3500, 3500, count)
+            car[:, 1] = randint(rng, -2000, 4000, count)
+            car[:, 2] = rng.uniform(500, LIM_Z, count)
+            car[:, CAR_ROTATION] = rng.uniform(-1, 1, (count, 3)) * np.pi
+
+            car_lin_y = rng.uniform(300, CAR_MAX_SPEED, count)
+            car[:, 6] = rng.uniform(-150, 150, count)
+            car[:, 7] = car_lin_y
+            car[:, 8] = rng.uniform(-150, 150, count)
+
+            place_dribble_ball(rng, states, car)
+            car[:, CAR_BOOST] = rng.uniform(0.4, 1, count)
+        else:
+            defending_car(rng, car, 1)
+
+    return states
+
+
+def place_dribble_ball(rng: np.random.Generator, states: np.ndarray, car: np.ndarray):
+    """
+    Ball of AirDribble2Touch on the dribbler car, for every row of states
+    """
+    count = len(states)
+    states[:, 0] = car[:, 0] + rng.uniform(-150, 150, count)
+    states[:, 1] = car[:, 1] + rng.uniform(0, 150, count)
+    states[:, 2] = car[:, 2] + rng.uniform(0, 150, count)
+
+    states[:, 3] = rng.uniform(-150, 150, count)
+    states[:, 4] = car[:, 7] + rng.uniform(-150, 150, count)
+    states[:, 5] = rng.uniform(-150, 150, count)
+
+
+def resample_dribble_ball(rng: np.random.Generator, states: np.ndarray, team_sizes: TeamSizes):
+    """
+    Draws the ball of the AirDribble2Touch rows again, the cars are kept
+    """
+    # The ball is placed on the last blue car
+    dribbler = car_block(states, team_sizes[0] - 1)
+    place_dribble_ball(rng, states, dribbler)
+
+
+def generate_air_dribble_setup(rng: np.random.Generator, team_sizes: TeamSizes, count: int) -> np.ndarray:
+    """
+    AirDribbleSetup, the first car of a random team rolls the ball along a side wall
+    """
+    states = np.full((count, state_length(team_sizes)), np.nan)
+
+    axis_inverter = rng.choice([1, -1], count)
+    team_side = rng.choice([BLUE_TEAM, ORANGE_TEAM], count)
+    # Only the present team can be picked
+    if team_sizes[0] == 0:
+        team_side[:] = ORANGE_TEAM
+    elif team_sizes[1] == 0:
+        team_side[:] = BLUE_TEAM
+    team_inverter = np.where(team_side == BLUE_TEAM, 1, -1)
+
+    states[:, 0] = 3000 * axis_inverter
+    states[:, 1] = rng.integers(0, 7600, count) - 3800
+    states[:, 2] = BALL_RADIUS
+
+    states[:, 3] = (2000 + (rng.integers(0, 1000, count) - 500)) * axis_inverter
+    states[:, 4] = rng.integers(0, 1000, count) * team_inverter
+    states[:, 5] = 0
+
+    # First car of each team
+    chosen_index = np.where(team_side == BLUE_TEAM, 0, team_sizes[0])
+    yaw = np.where(axis_inverter == 1, 0, 180)
+
+    for i in range(sum(team_sizes)):
+        car = car_block(states, i)
+        chosen = chosen_index == i
+
+        car[:, 0] = np.where(chosen, 2500 * axis_inverter, rng.integers(0, 2944, count) - 1472)
+        car[:, 1] = np.where(chosen, states[:, 1], rng.integers(0, 3968, count) - 1984)
+        car[:, 2] = np.where(chosen, 27, 0)
+
+        car[:, 3] = 0
+        car[:, 4] = np.where(chosen, (yaw + (rng.integers(0, 40, count) - 20)) * DEG_TO_RAD,
+                             (rng.integers(0, 360, count) - 180) * (3.1415927 / 180))
+        car[:, 5] = 0
+        car[:, CAR_BOOST] = np.where(chosen, 100, np.nan)
+
+    return states
+
+
+def generate_aerial_ball(rng: np.random.Generator, team_sizes: TeamSizes, count: int) -> np.ndarray:
+    """
+    AerialBallState
+    """
+    xthreshold = 1800
+    ythreshold = 1200
+    zthreshold = 500
+
+    states = np.full((count, state_length(team_sizes)), np.nan)
+    states[:, 0] = rng.integers(-SIDE_WALL_X + xthreshold, SIDE_WALL_X - xthreshold, count)
+    states[:, 1] = rng.integers(-BACK_WALL_Y + ythreshold, BACK_WALL_Y - ythreshold, count)
+    states[:, 2] = rng.integers(zthreshold, CEILING_Z - 2 * zthreshold, count)
+    states[:, BALL_LINEAR_VELOCITY] = rng.integers(500, 1000, (count, 3))
+
+    for i in range(sum(team_sizes)):
+        car = car_block(states, i)
+        car[:, 0] = rng.integers(-SIDE_WALL_X + xthreshold, SIDE_WALL_X - xthreshold, count)
+        car[:, 1] = rng.integers(-BACK_WALL_Y + ythreshold, BACK_WALL_Y - ythreshold, count)
+        car[:, 2] = 30
+        car[:, CAR_BOOST] = 100
+
+    return states
+
+
+# Scenario names of CustomStateSetter.SCENARIOS that can be pre-generated
+GENERATORS: Dict[str, Callable[[np.random.Generator, TeamSizes, int], np.ndarray]] = {
+    "random": generate_random,
+    "shot": generate_shot,
+    "jump_shot": generate_jump_shot,
+    "save": generate_save,
+    "air_dribble_2_touch": generate_air_dribble_2_touch,
+    "air_dribble_setup": generate_air_dribble_setup,
+    "aerial_ball": generate_aerial_ball,
+}
+
+# Scenarios where a ball spawned in a car hitbox is drawn again instead of dropping the state, like the
+# move_ball_on_overlap of their setter
+BALL_RESAMPLERS: Dict[str, Callable[[np.random.Generator, np.ndarray, TeamSizes], None]] = {
+    "air_dribble_2_touch": resample_dribble_ball,
+}
+
+
+def _set(array: np.ndarray, values: list, given: list):
+    if all(given):
+        array[:] = values
+    else:
+        for i, value in enumerate(values):
+            if given[i]:
+                array[i] = value
+
+
+def check_states(states: np.ndarray, team_sizes: TeamSizes):
+    cars = states[:, BALL_LENGTH:].reshape(len(states), sum(team_sizes), CAR_LENGTH)
+    return check_spawns(states[:, BALL_POSITION], cars[..., CAR_POSITION], cars[..., CAR_ROTATION])
+
+
+def valid_states(states: np.ndarray, team_sizes: TeamSizes) -> np.ndarray:
+    """
+    Mask of the states with every entity valid, see setters/spawn_validity.py
+    """
+    ball_invalid, cars_invalid = invalid_entities(check_states(states, team_sizes))
+    return ~(ball_invalid | cars_invalid.any(axis=-1))
+
+
+def apply_state(state_wrapper: StateWrapper, state: np.ndarray):
+    """
+    Writes a state row into the wrapper, the cars must be ordered blue first (see wrapper_car_order)
+    """
+    # Plain lists, much faster than numpy for a few values
+    given = (~np.isnan(state)).tolist()
+    state = state.tolist()
+
+    ball = state_wrapper.ball
+    for array, columns in ((ball.position, BALL_POSITION), (ball.linear_velocity, BALL_LINEAR_VELOCITY),
+                           (ball.angular_velocity, BALL_ANGULAR_VELOCITY)):
+        _set(array, state[columns], given[columns])
+
+    for i, car in enumerate(wrapper_car_order(state_wrapper)):
+        start = BALL_LENGTH + CAR_LENGTH * i
+        block, block_given = state[start:start + CAR_LENGTH], given[start:start + CAR_LENGTH]
+
+        for array, columns in ((car.position, CAR_POSITION), (car.rotation, CAR_ROTATION),
+                               (car.linear_velocity, CAR_LINEAR_VELOCITY),
+                               (car.angular_velocity, CAR_ANGULAR_VELOCITY)):
+            _set(array, block[columns], block_given[columns])
+        if block_given[CAR_BOOST]:
+            car.boost = block[CAR_BOOST]
+
+
+def wrapper_car_order(state_wrapper: StateWrapper) -> list:
+    # Blue cars then orange cars, each in StateWrapper order
+    return state_wrapper.blue_cars() + state_wrapper.orange_cars()
+
+
+def wrapper_team_sizes(state_wrapper: StateWrapper) -> TeamSizes:
+    blue = sum(car.team_num == BLUE_TEAM for car in state_wrapper.cars)
+    return blue, len(state_wrapper.cars) - blue
+
+
+class StateBank:
+    def __init__(self, team_sizes: TeamSizes = (3, 3), capacity: int = 4096, refill_ratio: float = 0.5,
+                 generators: Optional[Dict[str, Callable]] = None, seed: Optional[int] = None,
+                 background: bool = True):
+        """
+        :param team_sizes: (blue cars, orange cars) of the states
+        :param capacity: States kept per scenario
+        :param refill_ratio: A scenario is refilled once less than this ratio of its states are left
+        :param background: Refill in a daemon thread, otherwise an empty scenario is refilled on the next pop
+        """
+        self.team_sizes = tuple(team_sizes)
+        self.capacity = capacity
+        self.refill_level = int(capacity * refill_ratio)
+        self.generators = dict(GENERATORS if generators is None else generators)
+        # The refill thread has its own generator, they are not thread safe
+        self.rng, self._thread_rng = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2)]
+
+        width = state_length(self.team_sizes)
+        self._rings = {name: np.empty((capacity, width)) for name in self.generators}
+        self._heads = {name: 0 for name in self.generators}
+        self._sizes = {name: 0 for name in self.generators}
+        # States loaded from disk, used before the rings
+        self._warm = {}
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._refill_loop, name="StateBank refill", daemon=True)
+            self._thread.start()
+            self._wake.set()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.generators
+
+    def level(self, name: str) -> int:
+        warm = self._warm.get(name)
+        return self._sizes[name] + (len(warm[0]) - warm[1] if warm is not None else 0)
+
+    def pop(self, name: str) -> np.ndarray:
+        with self._lock:
+            warm = self._warm.get(name)
+            if warm is not None:
+                states, index = warm
+                state = np.array(states[index])
+                if index + 1 < len(states):
+                    self._warm[name] = (states, index + 1)
+                else:
+                    del self._warm[name]
+                return state
+
+            if self._sizes[name] == 0:
+                # Faster than waiting for the thread
+                self._store(name, self._generate(name, self.rng))
+
+            state = self._rings[name][self._heads[name]].copy()
+            self._heads[name] = (self._heads[name] + 1) % self.capacity
+            self._sizes[name] -= 1
+
+            if self._sizes[name] < self.refill_level:
+                self._wake.set()
+
+        return state
+
+    def _generate(self, name: str, rng: np.random.Generator) -> np.ndarray:
+        # Invalid states are dropped and drawn again, a few rounds at most, the result can be short of capacity
+        missing = self.capacity - self._sizes[name]
+        resample_ball = BALL_RESAMPLERS.get(name)
+        batches = []
+        for _ in range(MAX_RETRIES):
+            states = self.generators[name](rng, self.team_sizes, missing)
+            if resample_ball is not None:
+                self._resample_overlapping_balls(resample_ball, rng, states)
+            states = states[valid_states(states, self.team_sizes)]
+            batches.append(states)
+            missing -= len(states)
+            if missing <= 0:
+                break
+
+        states = np.concatenate(batches)
+        if len(states) == 0:
+            raise RuntimeError(f"No valid {name} state in {MAX_RETRIES} rounds of generation")
+        return states
+
+    def _resample_overlapping_balls(self, resample_ball: Callable, rng: np.random.Generator, states: np.ndarray):
+        for _ in range(MAX_RETRIES):
+            overlap = check_states(states, self.team_sizes).ball_car_overlap.any(axis=-1)
+            if not overlap.any():
+                return
+            rows = states[overlap]
+            resample_ball(rng, rows, self.team_sizes)
+            states[overlap] = rows
+
+    def _store(self, name: str, states: np.ndarray):
+        # Called with the lock held, states popped since _generate make room for more
+        count = min(len(states), self.capacity - self._sizes[name])
+        tail = (self._heads[name] + self._sizes[name]) % self.capacity
+        first = min(count, self.capacity - tail)
+        self._rings[name][tail:tail + first] = states[:first]
+        self._rings[name][:count - first] = states[first:count]
+        self._sizes[name] += count
+
+    def _refill_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+
+            for name in self.generators:
+                if self._sizes[name] < self.refill_level or self._sizes[name] == 0:
+                    # Generated without the lock, the workers keep popping meanwhile
+                    try:
+                        states = self._generate(name, self._thread_rng)
+                    except RuntimeError as e:
+                        # pop generates again and raises in the worker
+                        print(f"StateBank refill : {e}")
+                        continue
+                    with self._lock:
+                        self._store(name, states)
+
+    def fill(self):
+        """
+        Fills every scenario right away
+        """
+        with self._lock:
+            for name in self.generators:
+                self._store(name, self._generate(name, self.rng))
+
+    def save(self, directory: str):
+        """
+        One .npy per scenario with the states currently in the bank
+        """
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            for name in self.generators:
+                head, size = self._heads[name], self._sizes[name]
+                states = np.take(self._rings[name], np.arange(head, head + size) % self.capacity, axis=0)
+                np.save(os.path.join(directory, f"{name}_{self.team_sizes[0]}v{self.team_sizes[1]}.npy"), states)
+
+    def load(self, directory: str) -> int:
+        """
+        Memory maps the states saved by save for these team sizes, returns the number of states loaded
+        """
+        loaded = 0
+        with self._lock:
+            for name in self.generators:
+                path = os.path.join(directory, f"{name}_{self.team_sizes[0]}v{self.team_sizes[1]}.npy")
+                if not os.path.exists(path):
+                    continue
+
+                states = np.load(path, mmap_mode="r")
+                if states.ndim != 2 or states.shape[1] != state_length(self.team_sizes) or len(states) == 0:
+                    continue
+
+                self._warm[name] = (states, 0)
+                loaded += len(states)
+
+        return loaded
+
+
+class BankedStateSetter(StateSetter):
+    """
+    Takes its states from a StateBank, the wrapped setter is used when the cars don't match the bank
+    """
+
+    def __init__(self, bank: StateBank, name: str, fallback: StateSetter):
+        super().__init__()
+        self.bank = bank
+        self.name = name
+        self.fallback = fallback
+        # Row applied by the last reset, None if it went to the fallback
+        self.last_state = None
+
+    def reset(self, state_wrapper: StateWrapper):
+        self.last_state = None
+
+        # Setters with observers read the wrapper before setting it
+        if wrapper_team_sizes(state_wrapper) != self.bank.team_sizes or getattr(self.fallback, "observators", None):
+            self.fallback.reset(state_wrapper)
+            return
+
+        self.last_state = self.bank.pop(self.name)
+        apply_state(state_wrapper, self.last_state)
@@ -9,4 +9,23 @@ $(document).ready(function() {
     socket.on("lOutput", (data) => {
         $("#learner_log #log").text(data)
     })
-})
\ No newline at end of file
+
+    // Time per phase of the last learner iteration, see profiling/learner_profile.py
+    socket.on("lProfile", (data) => {
+        let phases = $("#profile_phases")
+        phases.empty()
+
+        for (const [phase, seconds] of Object.entries(data.phases)) {
+            phases.append($("<tr>")
+                .append($("<td>").text(phase))
+                .append($("<td>").text(seconds.toFixed(2)))
+                .append($("<td>").text((100 * seconds / data.total).toFixed(1) + " %")))
+        }
+
+        // Waiting for the workers vs computing
+        let waiting = (data.phases.rollouts || 0) / data.total
+        $("#profile_summary").text(
+            `Iteration ${data.iteration} : ${data.total.toFixed(1)} s, ${data.rollouts_received} rollouts, ` +
+            `${(100 * waiting).toFixed(0)} % waiting for the workers`)
+    })
+})
@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("rlgym")
+
+import rlgym.utils.common_values as constants
+from rlgym.utils.gamestates import PhysicsObject
+from rlgym.utils.math import euler_to_rotation, quat_to_euler, quat_to_rot_mtx, rotation_to_quaternion
+from rlgym.utils.obs_builders import AdvancedObs
+
+from benchmarks.synthetic_state import make_states
+from obs.AstraObs import AstraObs, quat_to_rot_mtx_batch, update_timers_reference
+
+
+def baseline_obs(player, state, previous_action: np.ndarray, nb_players: int = 6) -> np.ndarray:
+    """
+    AstraObs.build_obs before the preallocated buffers: rlgym's AdvancedObs blocks concatenated, then padded
+    """
+    advanced = AdvancedObs()
+    if player.team_num == constants.ORANGE_TEAM:
+        inverted, ball, pads = True, state.inverted_ball, state.inverted_boost_pads
+    else:
+        inverted, ball, pads = False, state.ball, state.boost_pads
+
+    obs = [ball.position / advanced.POS_STD,
+           ball.linear_velocity / advanced.POS_STD,
+           ball.angular_velocity / advanced.ANG_STD,
+           previous_action,
+           pads]
+    player_car = advanced._add_player_to_obs(obs, player, ball, inverted)
+
+    allies = []
+    enemies = []
+    for other in state.players:
+        if other.car_id == player.car_id:
+            continue
+        team_obs = allies if other.team_num == player.team_num else enemies
+        other_car = advanced._add_player_to_obs(team_obs, other, ball, inverted)
+        team_obs.extend([
+            (other_car.position - player_car.position) / advanced.POS_STD,
+            (other_car.linear_velocity - player_car.linear_velocity) / advanced.POS_STD
+        ])
+
+    obs.extend(allies)
+    obs.extend(enemies)
+    base_obs = np.concatenate(obs)
+    for _ in range(nb_players - len(state.players)):
+        base_obs = np.concatenate((base_obs, [0] * 31))
+    return base_obs
+
+
+@pytest.mark.parametrize("team_size", [1, 2, 3])
+def test_obs_match_baseline(team_size):
+    builder = AstraObs(team_size=3, dtype=np.float64)
+    previous_actions = np.random.default_rng(team_size).uniform(-1, 1, (team_size * 2, 8))
+
+    for state in make_states(team_size, 100, seed=team_size):
+        builder.pre_step(state)
+        expected = np.stack([baseline_obs(player, state, previous_actions[i])
+                             for i, player in enumerate(state.players)])
+
+        for i, player in enumerate(state.players):
+            np.testing.assert_array_equal(builder.build_obs(player, state, previous_actions[i]), expected[i])
+        np.testing.assert_array_equal(builder.build_obs_batch(state, previous_actions), expected)
+
+
+def test_rotation_matrices_match_rlgym():
+    quats = np.random.default_rng(0).normal(size=(500, 4))
+    quats[:250] /= np.linalg.norm(quats[:250], axis=1, keepdims=True)
+    quats[-1] = 0
+
+    expected = np.stack([quat_to_rot_mtx(quat) for quat in quats])
+    np.testing.assert_array_equal(quat_to_rot_mtx_batch(quats), expected)
+
+
+@pytest.mark.parametrize("team_size", [1, 2, 3])
+def test_timers_match_reference(team_size):
+    builder = AstraObs(team_size=3, include_timers=True, dtype=np.float64)
+    boosts_state = np.zeros(len(builder.boosts_location))
+    boosts_timers = np.zeros(len(builder.boosts_location))
+
+    for state in make_states(team_size, 300, seed=team_size):
+        builder.pre_step(state)
+        update_timers_reference(state.boost_pads, boosts_state, boosts_timers, builder.boosts_location,
+                                builder.time_interval)
+
+        np.testing.assert_array_equal(builder.boosts_timers, boosts_timers)
+        np.testing.assert_array_equal(builder.boosts_state, boosts_state)
+
+
+def test_timers_count_down_while_taken():
+    builder = AstraObs(team_size=1, include_timers=True, dtype=np.float64)
+    boosts_state = np.zeros(len(builder.boosts_location))
+    boosts_timers = np.zeros(len(builder.boosts_location))
+
+    state = make_states(1, 1)[0]
+    # Taken, then still taken for longer than the respawn time, then available again
+    sequence = [np.ones_like(state.boost_pads)] + [np.zeros_like(state.boost_pads)] * 100 + \
+        [np.ones_like(state.boost_pads)]
+    for pads in sequence:
+        state.boost_pads = pads
+        builder.pre_step(state)
+        update_timers_reference(pads, boosts_state, boosts_timers, builder.boosts_location, builder.time_interval)
+
+        np.testing.assert_array_equal(builder.boosts_timers, boosts_timers)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_inverted_timers_view(dtype):
+    builder = AstraObs(team_size=3, include_timers=True, dtype=dtype)
+
+    for state in make_states(3, 50):
+        builder.pre_step(state)
+
+        expected = (builder.boosts_timers / AstraObs.BOOST_STD)[::-1].astype(dtype)
+        np.testing.assert_array_equal(builder.inverted_boosts_timers, expected)
+        np.testing.assert_array_equal(builder.inverted_boosts_state, builder.boosts_state[::-1])
+
+
+def invert_with_rlgym(state):
+    """
+    Replaces the inverted car data of the synthetic state: the orange view turns the car by 180 degrees of yaw,
+    the quaternion is rebuilt from these angles with rlgym's conversions, not with invert_quaternion
+    """
+    mirror = np.array([-1, -1, 1])
+    for player in state.players:
+        car = player.car_data
+        pitch, yaw, roll = quat_to_euler(car.quaternion)
+        quaternion = rotation_to_quaternion(euler_to_rotation(np.array([pitch, yaw + np.pi, roll])))
+        player.inverted_car_data = PhysicsObject(position=car.position * mirror, quaternion=quaternion,
+                                                 linear_velocity=car.linear_velocity * mirror,
+                                                 angular_velocity=car.angular_velocity * mirror)
+    return state
+
+
+def test_rlgym_inversion_faces_the_other_way():
+    state = make_states(1, 1)[0]
+    player = state.players[0]
+    # Known values: yaw 0, the car faces +x, seen from orange it faces -x
+    player.car_data.quaternion = np.array([1.0, 0.0, 0.0, 0.0])
+    invert_with_rlgym(state)
+
+    np.testing.assert_allclose(player.car_data.forward(), [1, 0, 0], atol=1e-12)
+    np.testing.assert_allclose(player.inverted_car_data.forward(), [-1, 0, 0], atol=1e-12)
+    np.testing.assert_allclose(player.inverted_car_data.up(), [0, 0, 1], atol=1e-12)
+
+
+@pytest.mark.parametrize("team_size", [1, 2, 3])
+@pytest.mark.parametrize("dtype, tolerance", [(np.float64, 1e-12), (np.float32, 1e-5)])
+def test_mirror_frames_equivalence(team_size, dtype, tolerance):
+    default = AstraObs(team_size=3, include_timers=True, dtype=dtype)
+    mirrored = AstraObs(team_size=3, include_timers=True, dtype=dtype, mirror_frames=True)
+    previous_actions = np.random.default_rng(team_size).integers(0, 2, (team_size * 2, 8)).astype(float)
+
+    for state in map(invert_with_rlgym, make_states(team_size, 200, seed=team_size)):
+        default.pre_step(state)
+        mirrored.pre_step(state)
+
+        for i, player in enumerate(state.players):
+            np.testing.assert_allclose(mirrored.build_obs(player, state, previous_actions[i]),
+                                       default.build_obs(player, state, previous_actions[i]), rtol=0, atol=tolerance)
+
+        np.testing.assert_allclose(mirrored.build_obs_batch(state, previous_actions),
+                                   default.build_obs_batch(state, previous_actions), rtol=0, atol=tolerance)
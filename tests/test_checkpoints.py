@@ -0,0 +1,98 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("rocket_learn")
+
+from rocket_learn.ppo import PPO
+
+from models.checkpoints import CHECKPOINT_FILE, JIT_FILE, AsyncCheckpointPPO, CheckpointWriter
+
+
+def make_agent():
+    actor = torch.nn.Linear(2, 3)
+    critic = torch.nn.Linear(2, 1)
+    optimizer = torch.optim.Adam([*actor.parameters(), *critic.parameters()])
+    return SimpleNamespace(actor=actor, critic=critic, optimizer=optimizer)
+
+
+def make_ppo(tmp_path, latest_interval: int, cls=AsyncCheckpointPPO) -> PPO:
+    # Only what save and load read, without the rollout generator of PPO.__init__
+    ppo = cls.__new__(cls)
+    ppo.logger = SimpleNamespace(project="astra", log=lambda *args, **kwargs: None)
+    ppo.agent = make_agent()
+    ppo.device = "cpu"
+    ppo.total_steps = 0
+    ppo.starting_iteration = 0
+    ppo.jit_tracer = torch.zeros(2)
+    ppo.checkpoint_writer = CheckpointWriter(keep_last=2, keep_every=0, save_interval=1)
+    ppo.latest_interval = latest_interval
+    ppo._latest_calls = 0
+    return ppo
+
+
+def train_step(agent):
+    loss = agent.actor(torch.ones(2)).sum() + agent.critic(torch.ones(2)).sum()
+    agent.optimizer.zero_grad()
+    loss.backward()
+    agent.optimizer.step()
+
+
+def test_latest_saves_are_throttled(tmp_path):
+    ppo = make_ppo(tmp_path, latest_interval=10)
+    latest = os.path.join(tmp_path, "astra_latest")
+
+    for _ in range(25):
+        ppo.save(latest, -1)
+    ppo.checkpoint_writer.flush()
+
+    # Calls 1, 11 and 21
+    assert len(ppo.checkpoint_writer.write_times) == 3
+    assert os.path.exists(os.path.join(latest, "astra_-1", CHECKPOINT_FILE))
+
+
+def test_prune_keeps_the_latest_checkpoint(tmp_path):
+    ppo = make_ppo(tmp_path, latest_interval=1)
+    run = os.path.join(tmp_path, "run")
+
+    ppo.save(os.path.join(run, "astra_latest"), -1)
+    for step in range(5):
+        ppo.save(run, step)
+    ppo.checkpoint_writer.flush()
+
+    assert sorted(os.listdir(run)) == ["astra_3", "astra_4", "astra_latest"]
+    assert os.listdir(os.path.join(run, "astra_latest")) == ["astra_-1"]
+
+
+def test_ppo_load_resumes_the_checkpoint(tmp_path):
+    ppo = make_ppo(tmp_path, latest_interval=1)
+    train_step(ppo.agent)
+    ppo.total_steps = 123_456
+    ppo.save(str(tmp_path), 7)
+    ppo.checkpoint_writer.flush()
+
+    # rocket_learn's own load, into a fresh agent
+    loaded = make_ppo(tmp_path, latest_interval=1, cls=PPO)
+    loaded.load(os.path.join(tmp_path, "astra_7", CHECKPOINT_FILE), continue_iterations=True)
+
+    assert loaded.starting_iteration == 7
+    assert loaded.total_steps == 123_456
+    for name in ("actor", "critic"):
+        expected = getattr(ppo.agent, name).state_dict()
+        for key, values in getattr(loaded.agent, name).state_dict().items():
+            assert torch.equal(values, expected[key])
+    assert loaded.agent.optimizer.state_dict()["state"].keys() == ppo.agent.optimizer.state_dict()["state"].keys()
+
+
+def test_save_actor_jit(tmp_path):
+    ppo = make_ppo(tmp_path, latest_interval=1)
+    ppo.save(str(tmp_path), 0, True)
+    expected = ppo.agent.actor(torch.ones(2)).detach()
+    # The traced copy keeps the weights of the save
+    train_step(ppo.agent)
+    ppo.checkpoint_writer.flush()
+
+    traced = torch.jit.load(os.path.join(tmp_path, "astra_0", JIT_FILE))
+    assert torch.equal(traced(torch.ones(2)), expected)
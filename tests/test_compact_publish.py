@@ -0,0 +1,176 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("rocket_learn")
+pytest.importorskip("rlgym")
+
+from models.compact_publish import KEYFRAMES_KEY, CompactModelDecoder, CompactPublisher, is_compact, read_payload
+from models.networks import create_networks
+from obs.layout import ASTRA_LAYOUT
+
+# Largest error of a weight, the int8 scale is the largest weight of the tensor / 127
+TOLERANCES = {"fp16": 1e-3, "int8": 0.5 / 127}
+
+
+class Redis:
+    def __init__(self):
+        self.hashes = {}
+
+    def hset(self, name, key, value):
+        self.hashes.setdefault(name, {})[key] = value
+
+    def hget(self, name, key):
+        return self.hashes.get(name, {}).get(key)
+
+    def hdel(self, name, key):
+        self.hashes.get(name, {}).pop(key, None)
+
+    def delete(self, name):
+        self.hashes.pop(name, None)
+
+    def get(self, name):
+        return None
+
+
+class RolloutGenerator:
+    """
+    Publishes like RedisRolloutGenerator.update_parameters, every save_every-th model is kept as a past version
+    """
+
+    def __init__(self, save_every: int):
+        self.save_every = save_every
+        self.n_updates = 0
+        self.latest = None
+        self.saved = []
+
+    def update_parameters(self, agent):
+        from rocket_learn.rollout_generator.redis import redis_rollout_generator
+
+        self.latest = redis_rollout_generator._serialize_model(agent)
+        if self.n_updates % self.save_every == 0:
+            self.saved.append(self.latest)
+        self.n_updates += 1
+
+
+@pytest.fixture
+def serialize(monkeypatch):
+    from rocket_learn.rollout_generator.redis import redis_rollout_generator, redis_rollout_worker, utils
+
+    # Restored after the test, install replaces them
+    for module in (redis_rollout_generator, redis_rollout_worker, utils):
+        for name in ("_serialize_model", "_unserialize_model"):
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, getattr(module, name))
+
+
+def assert_close(actor, decoded, dtype):
+    expected = actor.state_dict()
+    state_dict = decoded.state_dict()
+    assert state_dict.keys() == expected.keys()
+    for name, values in expected.items():
+        scale = float(values.abs().max()) if dtype == "int8" else 1.0
+        assert float((state_dict[name] - values).abs().max()) <= TOLERANCES[dtype] * max(scale, 1e-12)
+
+
+def train_step(actor):
+    with torch.no_grad():
+        for parameter in actor.parameters():
+            parameter.add_(torch.randn_like(parameter) * 1e-3)
+
+
+@pytest.mark.parametrize("dtype", ["fp16", "int8"])
+@pytest.mark.parametrize("shared_trunk", [False, True])
+def test_round_trip(dtype, shared_trunk):
+    torch.manual_seed(0)
+    actor, _ = create_networks(shared_trunk)
+    redis = Redis()
+
+    payload = CompactPublisher(redis, dtype=dtype).encode(actor)
+    assert is_compact(payload)
+    decoded = CompactModelDecoder(redis).decode(payload)
+
+    assert type(decoded) is type(actor)
+    assert not decoded.training
+    assert_close(actor, decoded, dtype)
+
+
+@pytest.mark.parametrize("dtype", ["fp16", "int8"])
+def test_deltas_rebuild_every_version(dtype):
+    torch.manual_seed(0)
+    actor, _ = create_networks()
+    redis = Redis()
+    publisher = CompactPublisher(redis, dtype=dtype, delta=True, keyframe_interval=3)
+    decoder = CompactModelDecoder(redis, cache_size=1)
+
+    bases = []
+    for _ in range(7):
+        train_step(actor)
+        payload = publisher.encode(actor)
+        bases.append(read_payload(payload)[0]["base"])
+        # Only the current keyframe is kept
+        assert len(redis.hashes[KEYFRAMES_KEY]) == 1
+        assert_close(actor, decoder.decode(payload), dtype)
+
+    assert [base is None for base in bases] == [True, False, False, True, False, False, True]
+
+
+def test_saved_versions_are_keyframes(serialize):
+    torch.manual_seed(0)
+    actor, _ = create_networks()
+    redis = Redis()
+    redis.hset(KEYFRAMES_KEY, "previous-run", b"")
+    generator = RolloutGenerator(save_every=4)
+    CompactPublisher(redis, dtype="fp16", delta=True, keyframe_interval=3, save_every=4).install(generator)
+
+    latest = []
+    for _ in range(13):
+        train_step(actor)
+        generator.update_parameters(actor)
+        latest.append(read_payload(generator.latest)[0]["base"] is None)
+
+    # Keyframes every 3 publishes and at every saved version
+    assert latest == [True, False, False, True, True, False, True, False, True, True, False, False, True]
+    assert len(generator.saved) == 4
+    assert all(read_payload(payload)[0]["base"] is None for payload in generator.saved)
+    assert list(redis.hashes[KEYFRAMES_KEY]) == [read_payload(generator.latest)[0]["checksum"]]
+
+    # Decoded without the keyframes they were published with
+    for payload in generator.saved:
+        CompactModelDecoder(Redis()).decode(payload)
+
+
+def test_delta_needs_the_generator():
+    with pytest.raises(ValueError):
+        CompactPublisher(Redis(), delta=True).install()
+
+
+def test_corrupted_payload_is_rejected():
+    actor, _ = create_networks()
+    payload = bytearray(CompactPublisher(Redis()).encode(actor))
+    payload[-10] ^= 0xFF
+
+    with pytest.raises(ValueError):
+        CompactModelDecoder(Redis()).decode(bytes(payload))
+
+
+def test_worker_gets_the_type_of_a_pickled_model(serialize):
+    from rocket_learn.rollout_generator.redis import redis_rollout_generator, redis_rollout_worker, utils
+
+    torch.manual_seed(0)
+    actor, _ = create_networks()
+    pickled = redis_rollout_worker._unserialize_model(utils._serialize_model(actor))
+
+    redis = Redis()
+    CompactPublisher(redis).install()
+    CompactModelDecoder(redis).install()
+    payload = redis_rollout_generator._serialize_model(actor)
+    decoded = redis_rollout_worker._unserialize_model(payload)
+
+    assert is_compact(payload)
+    assert type(decoded) is type(pickled)
+    obs = torch.randn(6, ASTRA_LAYOUT.size)
+    with torch.no_grad():
+        expected = pickled.get_action_distribution(obs).logits
+        logits = decoded.get_action_distribution(obs).logits
+    finite = torch.isfinite(expected)
+    assert float((logits[finite] - expected[finite]).abs().max()) < 1e-2
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("rlgym")
+
+from benchmarks.synthetic_state import make_states
+from obs.AstraObs import AstraObs
+from obs.delta_stream import decode_obs_stream, encode_obs_stream, install_learner_decoding, \
+    install_worker_encoding, is_obs_stream
+
+
+def episode_obs(team_size: int, steps: int) -> np.ndarray:
+    builder = AstraObs(team_size=3, include_timers=True)
+    previous_actions = np.zeros((team_size * 2, 8))
+    observations = []
+    for state in make_states(team_size, steps, seed=team_size):
+        builder.pre_step(state)
+        observations.append(builder.build_obs_batch(state, previous_actions))
+    # (players, steps, obs)
+    return np.stack(observations, axis=1)
+
+
+@pytest.mark.parametrize("team_size", [1, 3])
+@pytest.mark.parametrize("keyframe_interval", [1, 7, 64])
+def test_stream_round_trip(team_size, keyframe_interval):
+    for player_obs in episode_obs(team_size, 100):
+        encoded = encode_obs_stream(player_obs, keyframe_interval=keyframe_interval)
+        np.testing.assert_array_equal(decode_obs_stream(encoded), player_obs)
+
+
+def test_unchanged_sections_are_not_sent():
+    player_obs = np.repeat(episode_obs(1, 1)[0], 10, axis=0)
+    encoded = encode_obs_stream(player_obs)
+    assert encoded["values"].size == player_obs.shape[1]
+    np.testing.assert_array_equal(decode_obs_stream(encoded), player_obs)
+
+
+def test_round_trip_through_rocket_learn(monkeypatch):
+    pytest.importorskip("rocket_learn")
+    from rocket_learn.experience_buffer import ExperienceBuffer
+    from rocket_learn.rollout_generator.redis import redis_rollout_generator, redis_rollout_worker, utils
+
+    # Restored after the test, the install functions replace them
+    monkeypatch.setattr(redis_rollout_worker, "encode_buffers", redis_rollout_worker.encode_buffers)
+    for module in (redis_rollout_generator, utils):
+        monkeypatch.setattr(module, "decode_buffers", module.decode_buffers)
+
+    observations = episode_obs(2, 50)
+    steps = observations.shape[1]
+    buffers = [ExperienceBuffer(observations=list(player_obs), actions=[np.zeros(8)] * steps,
+                                rewards=[0.0] * steps, dones=[False] * (steps - 1) + [True],
+                                log_probs=[0.0] * steps, infos=[{}] * steps)
+               for player_obs in observations]
+
+    install_worker_encoding()
+    encoded = redis_rollout_worker.encode_buffers(buffers, return_obs=True, return_states=False,
+                                                  return_rewards=True)
+    assert all(map(is_obs_stream, encoded[0]))
+
+    install_learner_decoding()
+    decoded = list(redis_rollout_generator.decode_buffers(encoded, [0] * len(buffers), True, False, True))
+
+    assert len(decoded) == len(buffers)
+    for buffer, player_obs in zip(decoded, observations):
+        np.testing.assert_array_equal(np.asarray(buffer.observations).reshape(player_obs.shape), player_obs)
@@ -0,0 +1,54 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("rocket_learn")
+pytest.importorskip("rlgym")
+
+from models.frozen_actor import FrozenNet, freeze_policy, install_worker_inference, max_difference
+from models.networks import create_networks
+from obs.layout import ASTRA_LAYOUT
+
+TOLERANCE = 1e-4
+
+
+@pytest.fixture
+def actor():
+    torch.manual_seed(0)
+    actor, _ = create_networks()
+    return actor.eval()
+
+
+@pytest.mark.parametrize("fuse", [False, True])
+@pytest.mark.parametrize("shared_trunk", [False, True])
+def test_frozen_logits_match_eager(fuse, shared_trunk):
+    torch.manual_seed(0)
+    actor, _ = create_networks(shared_trunk)
+    actor.eval()
+    frozen = freeze_policy(actor, fuse=fuse)
+
+    assert max_difference(actor, frozen, ASTRA_LAYOUT.size, range(1, 7), samples=20) <= TOLERANCE
+
+
+def test_eager_policy_keeps_its_net(actor):
+    net = actor.net
+    frozen = freeze_policy(actor)
+
+    assert actor.net is net
+    assert isinstance(frozen.net, FrozenNet)
+
+
+def test_worker_loads_frozen_models(monkeypatch, actor):
+    from rocket_learn.rollout_generator.redis import redis_rollout_worker, utils
+
+    # Restored after the test, install_worker_inference replaces them
+    for module in (redis_rollout_worker, utils):
+        if hasattr(module, "_unserialize_model"):
+            monkeypatch.setattr(module, "_unserialize_model", module._unserialize_model)
+
+    install_worker_inference()
+    install_worker_inference()
+    loaded = redis_rollout_worker._unserialize_model(utils._serialize_model(actor))
+
+    # Installed once, the frozen policy is not frozen again
+    assert isinstance(loaded.net, FrozenNet)
+    assert max_difference(actor, loaded, ASTRA_LAYOUT.size, range(1, 7), samples=20) <= TOLERANCE
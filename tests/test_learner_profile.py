@@ -0,0 +1,96 @@
+import json
+import time
+
+import pytest
+
+pytest.importorskip("rocket_learn")
+
+from profiling.learner_profile import LearnerProfiler, PhaseTimer
+
+
+class Optimizer:
+    def zero_grad(self):
+        pass
+
+    def step(self):
+        time.sleep(0.001)
+
+
+class RolloutGenerator:
+    def __init__(self):
+        self.published = 0
+
+    def generate_rollouts(self):
+        while True:
+            time.sleep(0.001)
+            yield object()
+
+    def update_parameters(self, actor):
+        self.published += 1
+
+
+class LoopPPO:
+    """
+    The attributes and the loop of rocket_learn's PPO that LearnerProfiler wraps
+    """
+
+    def __init__(self, epochs: int = 3, steps_per_epoch: int = 2):
+        self.rollout_gen = RolloutGenerator()
+        self.agent = type("Agent", (), {"optimizer": Optimizer(), "actor": None})()
+        self.epochs = epochs
+        self.steps_per_epoch = steps_per_epoch
+
+    def calculate(self, rollouts):
+        time.sleep(0.001)
+        for _ in range(self.epochs * self.steps_per_epoch):
+            self.agent.optimizer.zero_grad()
+            self.agent.optimizer.step()
+
+    def save(self, save_location, current_step, save_actor_jit=False):
+        pass
+
+    def run(self, iterations: int, rollouts_per_iteration: int = 4):
+        self.rollout_gen.update_parameters(self.agent.actor)
+        rollouts = self.rollout_gen.generate_rollouts()
+        for iteration in range(iterations):
+            self.calculate([next(rollouts) for _ in range(rollouts_per_iteration)])
+            self.save("checkpoints", iteration, False)
+            self.rollout_gen.update_parameters(self.agent.actor)
+
+
+def test_phase_timer_excludes_nested_phases():
+    timer = PhaseTimer()
+    with timer.phase("outer"):
+        with timer.phase("inner"):
+            time.sleep(0.01)
+    phases = timer.take()
+
+    assert phases["inner"] >= 0.01
+    assert phases["outer"] < phases["inner"]
+    assert timer.take() == {}
+
+
+def test_profiler_records_every_iteration(monkeypatch, tmp_path):
+    from rocket_learn.rollout_generator.redis import redis_rollout_generator, utils
+
+    # Restored after the test, install wraps them
+    for module in (redis_rollout_generator, utils):
+        if hasattr(module, "decode_buffers"):
+            monkeypatch.setattr(module, "decode_buffers", module.decode_buffers)
+
+    path = tmp_path / "profile.jsonl"
+    sent = []
+    alg = LoopPPO()
+
+    LearnerProfiler(str(path), sent.append).install(alg)
+    alg.run(iterations=3)
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert records == sent
+    assert [record["iteration"] for record in records] == [0, 1, 2]
+    for record in records:
+        assert record["rollouts_received"] == 4
+        assert {"rollouts", "advantages", "epoch_0", "epoch_1", "epoch_2", "stats", "checkpoint", "publish",
+                "other"} <= set(record["phases"])
+        assert sum(record["phases"].values()) == pytest.approx(record["total"])
+    assert alg.rollout_gen.published == 4
@@ -0,0 +1,153 @@
+import time
+from queue import Queue
+
+import pytest
+
+pytest.importorskip("rocket_learn")
+
+from ingestion.rollout_ingestion import RolloutIngestion, agent_version
+
+
+def slow_decode(enc_buffers, versions, *args):
+    time.sleep(0.02)
+    if enc_buffers == "bad":
+        raise ValueError("Undecodable rollout")
+    return [f"{enc_buffers}-{i}" for i in range(2)]
+
+
+def install_slow_decode():
+    from rocket_learn.rollout_generator.redis import redis_rollout_generator
+
+    redis_rollout_generator.decode_buffers = slow_decode
+
+
+class Redis:
+    def __init__(self):
+        self.rollouts = Queue()
+
+    def blpop(self, key):
+        return key, self.rollouts.get()
+
+
+class Generator:
+    """
+    generate_rollouts shaped like RedisRolloutGenerator's, its state updates must never overlap
+    """
+
+    def __init__(self, max_age: int = 0):
+        self.max_age = max_age
+        self.redis = Redis()
+        self.pending = self.redis.rollouts
+        self.active = 0
+        self.overlaps = 0
+        self.updates = 0
+
+    def _update_state(self):
+        self.active += 1
+        if self.active > 1:
+            self.overlaps += 1
+        time.sleep(0.001)
+        self.updates += 1
+        self.active -= 1
+
+    def generate_rollouts(self):
+        from rocket_learn.rollout_generator.redis import redis_rollout_generator
+
+        while True:
+            name, versions = self.redis.blpop("rollouts")[1]
+            self._update_state()
+            buffers = redis_rollout_generator.decode_buffers(name, versions, True, False, True)
+            self._update_state()
+            yield from buffers
+
+    def update_parameters(self, actor):
+        pass
+
+
+@pytest.fixture
+def decode(monkeypatch):
+    from rocket_learn.rollout_generator.redis import redis_rollout_generator
+
+    monkeypatch.setattr(redis_rollout_generator, "decode_buffers", slow_decode)
+
+
+def test_agent_version():
+    assert agent_version([-4, 2, -5]) == 4
+    assert agent_version([2, 3]) is None
+    assert agent_version(["na", -1]) is None
+
+
+def test_generator_state_is_never_shared(decode):
+    generator = Generator(max_age=100)
+    ingestion = RolloutIngestion(generator, processes=4, initializer=install_slow_decode)
+    ingestion.install()
+    for i in range(20):
+        generator.pending.put((f"rollout{i}", [-1, -1]))
+
+    start = time.perf_counter()
+    rollouts = generator.generate_rollouts()
+    received = [next(rollouts) for _ in range(40)]
+    elapsed = time.perf_counter() - start
+    ingestion.close()
+
+    assert sorted(received) == sorted(f"rollout{i}-{j}" for i in range(20) for j in range(2))
+    assert generator.updates == 40
+    assert generator.overlaps == 0
+    # The decodings still overlap, 20 of them take 0.4 s one after the other
+    assert elapsed < 0.4
+
+
+def test_stale_rollouts_are_dropped_when_taken(decode):
+    generator = Generator(max_age=1)
+    ingestion = RolloutIngestion(generator, processes=1, initializer=install_slow_decode)
+    ingestion.install()
+    rollouts = generator.generate_rollouts()
+
+    generator.pending.put(("old", [-5, 3]))
+    assert next(rollouts) == "old-0"
+    # Waits in the ready queue while two models are published
+    while ingestion.queue.empty():
+        time.sleep(0.01)
+    generator.update_parameters(None)
+    generator.update_parameters(None)
+    generator.pending.put(("new", [-7, 3]))
+
+    assert next(rollouts) == "new-0"
+    assert ingestion.dropped == 1
+    ingestion.close()
+
+
+def test_max_age_0_drops_rollouts_of_the_previous_version(decode):
+    generator = Generator(max_age=0)
+    ingestion = RolloutIngestion(generator, processes=1, initializer=install_slow_decode)
+    ingestion.install()
+    rollouts = generator.generate_rollouts()
+
+    generator.pending.put(("current", [-5, 3]))
+    assert next(rollouts) == "current-0"
+    while ingestion.queue.empty():
+        time.sleep(0.01)
+    assert next(rollouts) == "current-1"
+    assert ingestion.dropped == 0
+
+    # Decoded during the epochs, taken after the next publication
+    generator.pending.put(("epochs", [-5, 3]))
+    while ingestion.queue.qsize() < 2:
+        time.sleep(0.01)
+    generator.update_parameters(None)
+    generator.pending.put(("next", [-6, 3]))
+
+    assert next(rollouts) == "next-0"
+    assert ingestion.dropped == 2
+    ingestion.close()
+
+
+def test_errors_reach_the_learner(decode):
+    generator = Generator()
+    ingestion = RolloutIngestion(generator, processes=1, initializer=install_slow_decode)
+    ingestion.install()
+    generator.pending.put(("bad", None))
+
+    with pytest.raises(ValueError):
+        next(generator.generate_rollouts())
+    ingestion.close()
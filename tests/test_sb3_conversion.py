@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from models.sb3_conversion import SB3_TO_ROCKET_LEARN, load_converted
+
+SHARED = "mlp_extractor.shared_net.0.weight"
+LAYERS = ("mlp_extractor.shared_net.0", "mlp_extractor.shared_net.2", "mlp_extractor.policy_net.0",
+          "mlp_extractor.policy_net.2", "mlp_extractor.policy_net.4", "mlp_extractor.value_net.0",
+          "mlp_extractor.value_net.2", "mlp_extractor.value_net.4", "action_net", "value_net")
+
+
+def sb3_params(seed: int = 0) -> dict:
+    """
+    exit_save/policy.pth keys with 4 units per layer, the first layer keeps its 107 inputs
+    """
+    generator = torch.Generator().manual_seed(seed)
+    params = {}
+    for layer in LAYERS:
+        params[f"{layer}.weight"] = torch.randn(4, 107 if f"{layer}.weight" == SHARED else 4, generator=generator)
+        params[f"{layer}.bias"] = torch.randn(4, generator=generator)
+    return params
+
+
+def baseline_conversion(params: dict) -> dict:
+    """
+    The surgery create_agent did inline before the converters
+    """
+    new_params = torch.cat((params[SHARED], torch.rand([params[SHARED].shape[0], 62]),
+                            params[SHARED][:, 76:107].repeat(1, 2)), dim=1)
+
+    return {
+        "actor.net.0.weight": new_params,
+        "critic.0.weight": new_params,
+        "actor.net.0.bias": params["mlp_extractor.shared_net.0.bias"],
+        "critic.0.bias": params["mlp_extractor.shared_net.0.bias"],
+        "actor.net.2.weight": params["mlp_extractor.shared_net.2.weight"],
+        "critic.2.weight": params["mlp_extractor.shared_net.2.weight"],
+        "actor.net.2.bias": params["mlp_extractor.shared_net.2.bias"],
+        "critic.2.bias": params["mlp_extractor.shared_net.2.bias"],
+        "actor.net.4.weight": params["mlp_extractor.policy_net.0.weight"],
+        "critic.4.weight": params["mlp_extractor.value_net.0.weight"],
+        "actor.net.4.bias": params["mlp_extractor.policy_net.0.bias"],
+        "critic.4.bias": params["mlp_extractor.value_net.0.bias"],
+        "actor.net.6.weight": params["mlp_extractor.policy_net.2.weight"],
+        "critic.6.weight": params["mlp_extractor.value_net.2.weight"],
+        "actor.net.6.bias": params["mlp_extractor.policy_net.2.bias"],
+        "critic.6.bias": params["mlp_extractor.value_net.2.bias"],
+        "actor.net.8.weight": params["mlp_extractor.policy_net.4.weight"],
+        "critic.8.weight": params["mlp_extractor.value_net.4.weight"],
+        "actor.net.8.bias": params["mlp_extractor.policy_net.4.bias"],
+        "critic.8.bias": params["mlp_extractor.value_net.4.bias"],
+        "actor.net.10.weight": params["action_net.weight"],
+        "critic.10.weight": params["value_net.weight"],
+        "actor.net.10.bias": params["action_net.bias"],
+        "critic.10.bias": params["value_net.bias"],
+    }
+
+
+def save_source(tmp_path, params: dict) -> str:
+    source = os.path.join(tmp_path, "policy.pth")
+    torch.save(params, source)
+    return source
+
+
+def test_matches_baseline_conversion():
+    params = sb3_params()
+    expected = baseline_conversion(params)
+    state_dict = SB3_TO_ROCKET_LEARN.convert(params)
+
+    assert state_dict.keys() == expected.keys()
+    # 107 columns of the 1v1 observation, 62 random ones, the opponent block twice
+    random_columns = slice(107, 169)
+    for key, values in expected.items():
+        if key in ("actor.net.0.weight", "critic.0.weight"):
+            assert state_dict[key].shape == (4, 231)
+            assert torch.equal(state_dict[key][:, :random_columns.start], values[:, :random_columns.start])
+            assert torch.equal(state_dict[key][:, random_columns.stop:], values[:, random_columns.stop:])
+        else:
+            assert torch.equal(state_dict[key], values)
+
+
+def test_random_columns_are_seeded():
+    first = SB3_TO_ROCKET_LEARN.convert(sb3_params())
+    second = SB3_TO_ROCKET_LEARN.convert(sb3_params())
+
+    assert torch.equal(first["actor.net.0.weight"], second["actor.net.0.weight"])
+
+
+def test_second_load_hits_the_cache(tmp_path, monkeypatch):
+    source = save_source(tmp_path, sb3_params())
+    cache = os.path.join(tmp_path, "converted")
+    converted = load_converted(source, SB3_TO_ROCKET_LEARN, cache)
+    assert len(os.listdir(cache)) == 1
+
+    def convert(params):
+        raise AssertionError("Converted again")
+
+    monkeypatch.setattr(SB3_TO_ROCKET_LEARN, "convert", convert)
+    cached = load_converted(source, SB3_TO_ROCKET_LEARN, cache)
+
+    assert cached.keys() == converted.keys()
+    for key, values in converted.items():
+        assert torch.equal(cached[key], values)
+
+
+def test_new_source_gives_a_new_cache_file(tmp_path):
+    cache = os.path.join(tmp_path, "converted")
+    load_converted(save_source(tmp_path, sb3_params(seed=0)), SB3_TO_ROCKET_LEARN, cache)
+    first = os.listdir(cache)
+
+    params = sb3_params(seed=1)
+    converted = load_converted(save_source(tmp_path, params), SB3_TO_ROCKET_LEARN, cache)
+    names = os.listdir(cache)
+
+    assert len(names) == 2 and first[0] in names
+    assert torch.equal(converted["actor.net.2.weight"], params["mlp_extractor.shared_net.2.weight"])
@@ -0,0 +1,89 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("rocket_learn")
+
+from models.networks import create_networks
+from models.sb3_conversion import SB3_TO_ROCKET_LEARN, SB3_TO_SHARED_TRUNK
+from obs.layout import ASTRA_LAYOUT
+
+# Layers of the exit_save policy, trained on the 1v1 observation (107 values)
+SB3_SHAPES = {
+    "mlp_extractor.shared_net.0": (512, 107),
+    "mlp_extractor.shared_net.2": (512, 512),
+    "mlp_extractor.policy_net.0": (256, 512),
+    "mlp_extractor.policy_net.2": (256, 256),
+    "mlp_extractor.policy_net.4": (256, 256),
+    "action_net": (21, 256),
+    "mlp_extractor.value_net.0": (256, 512),
+    "mlp_extractor.value_net.2": (256, 256),
+    "mlp_extractor.value_net.4": (256, 256),
+    "value_net": (1, 256),
+}
+
+
+def sb3_params(seed: int = 0) -> dict:
+    generator = torch.Generator().manual_seed(seed)
+    params = {}
+    for layer, (rows, columns) in SB3_SHAPES.items():
+        params[f"{layer}.weight"] = torch.randn(rows, columns, generator=generator) * 0.05
+        params[f"{layer}.bias"] = torch.randn(rows, generator=generator) * 0.05
+    return params
+
+
+def converted_networks(shared_trunk: bool):
+    actor, critic = create_networks(shared_trunk)
+    converter = SB3_TO_SHARED_TRUNK if shared_trunk else SB3_TO_ROCKET_LEARN
+    state_dict = converter.convert(sb3_params())
+
+    # Keys of ActorCriticAgent, every weight of both networks is converted
+    for prefix, net in (("actor.", actor), ("critic.", critic)):
+        net.load_state_dict({key[len(prefix):]: values for key, values in state_dict.items()
+                             if key.startswith(prefix)})
+    return actor, critic
+
+
+def test_shared_trunk_agent_matches_separate_agent():
+    actor, critic = converted_networks(shared_trunk=False)
+    shared_actor, shared_critic = converted_networks(shared_trunk=True)
+    obs = torch.randn(64, ASTRA_LAYOUT.size, generator=torch.Generator().manual_seed(1))
+
+    with torch.no_grad():
+        expected_logits = actor.get_action_distribution(obs).logits
+        expected_values = critic(obs)
+        # Actor then critic on the same tensor, like PPO: the critic reuses the trunk output
+        logits = shared_actor.get_action_distribution(obs).logits
+        values = shared_critic(obs)
+
+    finite = torch.isfinite(expected_logits)
+    assert torch.equal(finite, torch.isfinite(logits))
+    torch.testing.assert_close(logits[finite], expected_logits[finite], rtol=0, atol=1e-6)
+    torch.testing.assert_close(values, expected_values, rtol=0, atol=1e-6)
+
+
+def test_trunk_cache_misses_on_new_weights_and_observations():
+    torch.manual_seed(0)
+    _, critic = create_networks(shared_trunk=True)
+    trunk = critic[0]
+    optimizer = torch.optim.Adam(trunk.parameters(), lr=1e-3)
+    obs = torch.randn(8, ASTRA_LAYOUT.size)
+
+    output = trunk(obs)
+    assert trunk(obs) is output
+
+    # Same values in a new tensor
+    copy = trunk(obs.clone())
+    assert copy is not output
+    assert torch.equal(copy, output)
+
+    output = trunk(obs)
+    optimizer.zero_grad()
+    output.sum().backward()
+    optimizer.step()
+    stepped = trunk(obs)
+    assert stepped is not output
+    assert not torch.equal(stepped, output)
+
+    # Changed in place
+    obs.add_(1)
+    assert trunk(obs) is not stepped
@@ -1,5 +1,5 @@
 import os
-from typing import Any
+from typing import Any, List, Optional, Union
 
 import numpy
 import torch
@@ -12,9 +12,13 @@ from rlgym_tools.sb3_utils.sb3_log_reward import SB3CombinedLogReward
 from rocket_learn.rollout_generator.redis.redis_rollout_worker import RedisRolloutWorker
 
 from CustomStateSetter import *
+from models.compact_publish import CompactModelDecoder
+from models.frozen_actor import install_worker_inference
 from obs.AstraObs import AstraObs
-
-torch.set_num_threads(1)
+from obs.delta_stream import install_worker_encoding
+from obs.layout import ASTRA_LAYOUT
+from setters.curriculum import CurriculumScheduler, CurriculumTracker, RedisCurriculumStore, touch_rate
+from setters.state_bank import StateBank
 
 
 class ExpandAdvancedObs(AstraObs):
@@ -22,6 +26,37 @@ class ExpandAdvancedObs(AstraObs):
         obs = super(ExpandAdvancedObs, self).build_obs(player, state, previous_action)
         return numpy.expand_dims(obs, 0)
 
+    def build_obs_batch(self, state: GameState, previous_actions: numpy.ndarray) -> numpy.ndarray:
+        obs = super(ExpandAdvancedObs, self).build_obs_batch(state, previous_actions)
+        return numpy.expand_dims(obs, 1)
+
+
+class BatchedMatch(Match):
+    """
+    Match building all the observations of a step with a single build_obs_batch call when the obs builder has one
+    """
+
+    def build_observations(self, state) -> Union[Any, List]:
+        if not hasattr(self._obs_builder, "build_obs_batch"):
+            return super(BatchedMatch, self).build_observations(state)
+
+        self._obs_builder.pre_step(state)
+        observations = list(self._obs_builder.build_obs_batch(state, self._prev_actions))
+
+        if state.last_touch is None:
+            state.last_touch = self.last_touch
+        else:
+            self.last_touch = state.last_touch
+
+        if len(observations) == 1:
+            return observations[0]
+
+        return observations
+
+
+# Directory of the states saved with StateBank.save, relative to this file, None runs without a state bank
+STATE_BANK_PATH = None
+
 
 def print_worker(data):
     print(Fore.CYAN + "Worker : ", end="")
@@ -30,7 +65,17 @@ def print_worker(data):
 
 class Worker:
     def __init__(self, team_size, obs_builder, action_parser, state_setter, rewards, rewards_weights,
-                 terminal_conditions):
+                 terminal_conditions, delta_obs: bool = False,
+                 curriculum: Optional[CurriculumScheduler] = None, frozen_actor: bool = False,
+                 compact_models: bool = False):
+        """
+        :param delta_obs: Send delta encoded observations (see obs/delta_stream.py), the learner decodes them.
+        :param curriculum: Records the episodes of each scenario and re-weights them (see setters/curriculum.py),
+        the state setter must be a ProbabilisticStateSetter
+        :param frozen_actor: Runs the models received from the learner as frozen TorchScript (see models/frozen_actor.py)
+        :param compact_models: Decodes the fp16/int8 models of a learner with publish_dtype set
+        (see models/compact_publish.py), the pickled ones still work
+        """
         self.team_size = team_size
         self.obs_builder = obs_builder
         self.action_parser = action_parser
@@ -38,9 +83,19 @@ class Worker:
         self.rewards = rewards
         self.rewards_weights = rewards_weights
         self.terminal_conditions = terminal_conditions
+        self.delta_obs = delta_obs
+        self.curriculum = curriculum
+        self.frozen_actor = frozen_actor
+        self.compact_models = compact_models
 
     def match(self) -> Match:
-        return Match(
+        reward_function = SB3CombinedLogReward(
+            reward_functions=self.rewards,
+            reward_weights=self.rewards_weights)
+        if self.curriculum is not None:
+            reward_function = CurriculumTracker(reward_function, self.state_setter, self.curriculum)
+
+        return BatchedMatch(
             game_speed=100,
             spawn_opponents=True,
             team_size=3,
@@ -48,12 +103,21 @@ class Worker:
             obs_builder=self.obs_builder,
             action_parser=self.action_parser,
             terminal_conditions=self.terminal_conditions,
-            reward_function=SB3CombinedLogReward(
-                reward_functions=self.rewards,
-                reward_weights=self.rewards_weights)
+            reward_function=reward_function
         )
 
     def run(self, redis, name):
+        # Set here rather than at import, astra.py imports this module in the process starting the learner
+        torch.set_num_threads(1)
+
+        if self.delta_obs:
+            install_worker_encoding(getattr(self.obs_builder, "layout", ASTRA_LAYOUT))
+        # Before install_worker_inference, the decoded actors are frozen too
+        if self.compact_models:
+            CompactModelDecoder(redis).install()
+        if self.frozen_actor:
+            install_worker_inference()
+
         RedisRolloutWorker(redis, name, self.match(),
                            past_version_prob=.2,
                            evaluation_prob=0.01,
@@ -68,13 +132,22 @@ class Worker:
 
 
 if __name__ == "__main__":
+    state_bank = None
+    if STATE_BANK_PATH is not None:
+        # Warm start from the saved states, the bank refills itself in a thread
+        state_bank = StateBank(team_sizes=(3, 3))
+        state_bank.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), STATE_BANK_PATH))
+
+    redis = Redis(host="127.0.0.1", username="test-bot", password=os.environ["REDIS_PASSWORD"], port=6379, db=5)
+    state_setter = ProbabilisticStateSetter(bank=state_bank)
+
     Worker(
         team_size=3,
-        obs_builder=ExpandAdvancedObs(),
+        obs_builder=ExpandAdvancedObs(mirror_frames=True),
         action_parser=DiscreteAction(),
-        state_setter=ProbabilisticStateSetter(),
+        state_setter=state_setter,
         rewards=(),
         rewards_weights=(),
-        terminal_conditions=[GoalScoredCondition(), TimeoutCondition(2000)]
-    ).run(Redis(host="127.0.0.1", username="test-bot", password=os.environ["REDIS_PASSWORD"], port=6379,
-                db=5), "Normal-astra")
+        terminal_conditions=[GoalScoredCondition(), TimeoutCondition(2000)],
+        curriculum=CurriculumScheduler(RedisCurriculumStore(redis), state_setter.registry, score=touch_rate)
+    ).run(redis, "Normal-astra")